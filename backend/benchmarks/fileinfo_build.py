@@ -0,0 +1,140 @@
+"""
+文件信息构建基准测试
+
+生成合成路径，对比构建 BasicFileInfo 时原有的即时解析实现（普通实例 + 构造时解析剧集）
+与 __slots__ + 延迟解析实现的内存和耗时：
+- movie: 只构建并设置根目录，不访问剧集字段（电影任务）
+- series: 构建后访问全部剧集字段（剧集任务）
+
+    cd backend
+    python -m benchmarks.fileinfo_build --entries 100000
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from bonita.utils.fileinfo import BasicFileInfo
+from bonita.utils.regex import extractEpisodeNum, matchEpisodePart, matchSeason, matchSeries
+
+EPISODE_FIELDS = ('is_episode', 'original_episode_marker', 'season_number', 'episode_number', 'episode_special')
+
+
+class LegacyFileInfo():
+    """ 原有实现：普通实例，构造时解析剧集信息 """
+
+    def __init__(self, filepath):
+        self.full_path = filepath
+        self.parent_folder = os.path.dirname(self.full_path)
+        self.basefolder = os.path.basename(self.parent_folder)
+        self.filename = os.path.basename(self.full_path)
+        self.basename, self.file_extension = os.path.splitext(self.filename)
+        self.stat = None
+        self.sub_files = None
+        self.root_folder = ''
+        self.top_folder = ''
+        self.second_folder = ''
+        self.is_episode = False
+        self.original_episode_marker = ''
+        self.season_number = -1
+        self.episode_number = -1
+        self.episode_special = ''
+        tmp_season = matchSeason(self.basefolder)
+        if tmp_season:
+            self.season_number = tmp_season
+        self.parse_episode_info()
+
+    def set_root_folder(self, root_folder):
+        self.root_folder = root_folder
+        relative_path = os.path.dirname(self.full_path).replace(root_folder, '').lstrip('\\/')
+        segments = os.path.normpath(relative_path).split(os.path.sep)
+        self.top_folder = segments[0] if segments and segments[0] != '.' else ''
+        self.second_folder = segments[1] if len(segments) > 1 and segments[1] != '.' else ''
+        if self.top_folder == '' and self.second_folder == '':
+            self.is_episode = False
+            self.episode_number = -1
+            self.episode_special = ''
+
+    def parse_episode_info(self):
+        season, episode = matchSeries(self.basename)
+        if isinstance(season, int) and season > -1 and isinstance(episode, int) and episode > -1:
+            self.is_episode = True
+            self.season_number = season
+            self.episode_number = episode
+            self.original_episode_marker = 'Pass'
+            return
+        episode_marker = matchEpisodePart(self.basename)
+        if episode_marker:
+            episode_num, episode_modifier = extractEpisodeNum(episode_marker)
+            if episode_num > -1:
+                self.is_episode = True
+                self.episode_number = episode_num
+                self.original_episode_marker = episode_marker
+                if episode_modifier:
+                    self.episode_special = episode_modifier
+
+
+def synthetic_paths(count: int, root: str = '/media/source'):
+    """ 剧集、分季文件夹、电影和根目录文件混合的路径 """
+    paths = []
+    for i in range(count):
+        kind = i % 4
+        group = i // 50
+        if kind == 0:
+            paths.append(f"{root}/Show.{group:05d}.S01/Show.{group:05d}.S01E{i % 50 + 1:02d}.1080p.WEB-DL.mkv")
+        elif kind == 1:
+            paths.append(f"{root}/[Group] Anime {group:05d}/Season 2/[Group] Anime {group:05d} - {i % 50 + 1:02d} [1080p].mkv")
+        elif kind == 2:
+            paths.append(f"{root}/Movie.{group:05d}.2020.1080p.BluRay/Movie.{group:05d}.2020.1080p.BluRay.x264.mkv")
+        else:
+            paths.append(f"{root}/Loose.Video.{i:06d}.mp4")
+    return paths
+
+
+def build(cls, paths, root, access: bool):
+    """ 构建全部条目，返回 (条目列表, 耗时) """
+    start = time.perf_counter()
+    entries = []
+    for path in paths:
+        info = cls(path)
+        info.set_root_folder(root)
+        entries.append(info)
+    if access:
+        for info in entries:
+            for field in EPISODE_FIELDS:
+                getattr(info, field)
+    return entries, time.perf_counter() - start
+
+
+def measure(cls, paths, root, access: bool):
+    """ 返回 (耗时, 内存字节) """
+    gc.collect()
+    tracemalloc.start()
+    entries, elapsed = build(cls, paths, root, access)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    # tracemalloc 会拖慢构建，耗时单独测量
+    gc.collect()
+    _, elapsed = build(cls, paths, root, access)
+    return elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100000, help='条目数')
+    args = parser.parse_args()
+
+    root = '/media/source'
+    paths = synthetic_paths(args.entries, root)
+    print(f"entries: {len(paths)}")
+    print(f"{'case':<8} {'impl':<8} {'time(s)':>9} {'memory(MB)':>11} {'bytes/entry':>12}")
+    for case, access in (('movie', False), ('series', True)):
+        for name, cls in (('legacy', LegacyFileInfo), ('slots', BasicFileInfo)):
+            elapsed, memory = measure(cls, paths, root, access)
+            print(f"{case:<8} {name:<8} {elapsed:>9.3f} {memory / 1024 / 1024:>11.1f} {memory / len(paths):>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
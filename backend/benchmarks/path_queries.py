@@ -0,0 +1,124 @@
+"""
+路径查询基准测试
+
+在临时 SQLite 数据库中生成合成数据，对比建立索引前后热点路径查询的执行计划和耗时
+
+    cd backend
+    python -m benchmarks.path_queries --rows 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+
+from bonita.db import Base, prefix_range
+from bonita.db.models.downloads import Downloads
+from bonita.db.models.extrainfo import ExtraInfo
+from bonita.db.models.record import TransRecords
+
+# 本次迁移新增的索引
+PATH_INDEXES = {
+    'ix_transrecords_srcpath': 'CREATE INDEX ix_transrecords_srcpath ON transrecords (srcpath)',
+    'ix_transrecords_destpath': 'CREATE INDEX ix_transrecords_destpath ON transrecords (destpath)',
+    'ix_extrainfo_filepath': 'CREATE INDEX ix_extrainfo_filepath ON extrainfo (filepath)',
+    'ix_downloads_url': 'CREATE INDEX ix_downloads_url ON downloads (url)',
+}
+
+
+def build_database(path: str, rows: int):
+    """ 创建表结构（不含路径索引）并写入合成数据 """
+    engine = create_engine(f"sqlite:///{path}")
+    tables = [TransRecords.__table__, ExtraInfo.__table__, Downloads.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    for name in PATH_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    record_rows = []
+    extra_rows = []
+    download_rows = []
+    for i in range(rows):
+        folder = f"/media/source/Show.{i // 24:05d}.S01"
+        srcpath = f"{folder}/Show.{i // 24:05d}.S01E{i % 24 + 1:02d}.mkv"
+        destpath = f"/media/output/Show.{i // 24:05d}/Season 1/Show.{i // 24:05d}.S01E{i % 24 + 1:02d}.mkv"
+        record_rows.append((os.path.basename(srcpath), srcpath, folder, destpath))
+        extra_rows.append((srcpath, f"ABC-{i:06d}"))
+        download_rows.append((f"https://img.example.com/cover/{i:06d}.jpg", f"/data/cache/{i:06d}.jpg"))
+    conn.executemany("INSERT INTO transrecords (srcname, srcpath, srcfolder, destpath) VALUES (?, ?, ?, ?)", record_rows)
+    conn.executemany("INSERT INTO extrainfo (filepath, number) VALUES (?, ?)", extra_rows)
+    conn.executemany("INSERT INTO downloads (url, filepath) VALUES (?, ?)", download_rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return record_rows, download_rows
+
+
+def compile_sql(stmt) -> str:
+    """ 将 SQLAlchemy 语句编译为 SQLite 语句 """
+    engine = create_engine("sqlite://")
+    return str(stmt.compile(engine, compile_kwargs={"literal_binds": True}))
+
+
+def build_queries(record_rows, download_rows):
+    """ 与代码中热点查询一致的语句 """
+    srcname, srcpath, folder, destpath = random.choice(record_rows)
+    url = random.choice(download_rows)[0]
+    batch = [row[1] for row in random.sample(record_rows, 500)]
+    return [
+        ("transfer loop: srcpath ==", select(TransRecords).where(TransRecords.srcpath == srcpath)),
+        ("group prefetch: srcpath IN (500)", select(TransRecords).where(TransRecords.srcpath.in_(batch))),
+        ("output created: destpath ==", select(TransRecords).where(TransRecords.destpath == destpath)),
+        ("source deleted: LIKE startswith (old)", select(TransRecords).where(TransRecords.srcpath.startswith(folder))),
+        ("source deleted: prefix_range", select(TransRecords).where(prefix_range(TransRecords.srcpath, folder))),
+        ("output deleted: prefix_range", select(TransRecords).where(
+            prefix_range(TransRecords.destpath, os.path.dirname(destpath)))),
+        ("scraping: extrainfo.filepath ==", select(ExtraInfo).where(ExtraInfo.filepath == srcpath)),
+        ("image route: downloads.url ==", select(Downloads).where(Downloads.url == url)),
+    ]
+
+
+def run_queries(conn: sqlite3.Connection, queries, repeat: int):
+    """ 输出每个查询的执行计划和平均耗时 """
+    for label, stmt in queries:
+        sql = compile_sql(stmt)
+        plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql).fetchall()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f"  {label:<40} {elapsed:9.3f} ms  {plan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="路径查询索引基准测试")
+    parser.add_argument("--rows", type=int, default=100000, help="合成记录数")
+    parser.add_argument("--repeat", type=int, default=20, help="每个查询的执行次数")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "bench.sqlite3")
+        print(f"生成 {args.rows} 行合成数据: {path}")
+        record_rows, download_rows = build_database(path, args.rows)
+        queries = build_queries(record_rows, download_rows)
+
+        conn = sqlite3.connect(path)
+        print("\n[索引前]")
+        run_queries(conn, queries, args.repeat)
+
+        for ddl in PATH_INDEXES.values():
+            conn.execute(ddl)
+        conn.execute("ANALYZE")
+        conn.commit()
+        print("\n[索引后]")
+        run_queries(conn, queries, args.repeat)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+文件名解析基准测试
+
+语料由 bonita.utils.regex 的 doctest 样例和合成文件名组成，分别测量各解析函数的耗时：
+- matchSeason 按文件夹名调用，同一文件夹下的文件重复调用
+- matchSeries / matchEpisodePart / extractEpisodeNum / simpleMatchEp 按文件名调用
+指定 --baseline 时同时测量旧版本实现，并校验两者结果一致
+
+    cd backend
+    git show HEAD~1:backend/bonita/utils/regex.py > /tmp/regex_baseline.py
+    python -m benchmarks.regex_parse --names 100000 --baseline /tmp/regex_baseline.py
+"""
+import argparse
+import ast
+import doctest
+import importlib.util
+import time
+
+from bonita.utils import regex
+
+FUNCTIONS = ('matchSeason', 'matchSeries', 'matchEpisodePart', 'extractEpisodeNum', 'simpleMatchEp')
+
+TEMPLATES = (
+    "Show.{n:05d}.S{s:02d}E{e:02d}.1080p.WEB-DL.H264.AAC",
+    "[Group] Anime {n:05d} - {e:02d} [1080p][HEVC]",
+    "[Group][Anime {n:05d}][{e:02d}][BDRIP][1920X1080]",
+    "Movie.{n:05d}.2020.1080p.BluRay.x264.DTS",
+    "Documentary.{n:05d}.{e}of8.1080p.WEB-DL.AVC.AAC",
+    "Program {n:05d} 第{e}期 嘉宾",
+    "剧集{n:05d}.第{e:02d}集.WEB-DL.4k.H265",
+    "Series {n:05d} Season {s} Episode {e}",
+    "Story.{n:05d}.Part{e}.2016.1080p.Blu-ray",
+    "Show.{n:05d}.E{e:02d}v2.WEB-DL.4k",
+)
+
+FOLDER_TEMPLATES = (
+    "Show.{n:05d}.S{s:02d}.1080p.WEB-DL",
+    "Show.{n:05d}.Season.{s}",
+    "剧集{n:05d} 第{s}季",
+    "Movie.{n:05d}.2020.1080p.BluRay",
+    "Pack.{n:05d}.S01-S0{s}.COMPLETE",
+)
+
+
+def doctest_corpus():
+    """ doctest 样例中各函数的参数 """
+    corpus = {name: [] for name in FUNCTIONS}
+    for test in doctest.DocTestFinder().find(regex):
+        for example in test.examples:
+            for node in ast.walk(ast.parse(example.source)):
+                if isinstance(node, ast.Call) and getattr(node.func, 'id', None) in corpus:
+                    corpus[node.func.id].append(ast.literal_eval(node.args[0]))
+    return corpus
+
+
+def synthetic_corpus(count: int, per_folder: int = 25):
+    """ 合成文件名和文件夹名，每个文件夹包含 per_folder 个文件 """
+    names = []
+    folders = []
+    for i in range(count):
+        n = i // per_folder
+        s = n % 9 + 1
+        e = i % per_folder + 1
+        names.append(TEMPLATES[i % len(TEMPLATES)].format(n=n, s=s, e=e))
+        folders.append(FOLDER_TEMPLATES[n % len(FOLDER_TEMPLATES)].format(n=n, s=s))
+    return names, folders
+
+
+def load_baseline(path: str):
+    """ 从文件加载旧版本的 regex 模块 """
+    spec = importlib.util.spec_from_file_location('regex_baseline', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(module, name: str, inputs, repeat: int):
+    """ 返回 (结果列表, 耗时)，季度缓存清空后开始计时 """
+    cached = getattr(module, '_matchSeasonCached', None)
+    if cached is not None:
+        cached.cache_clear()
+    func = getattr(module, name)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [func(value) for value in inputs]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--names', type=int, default=100000, help='合成文件名数量')
+    parser.add_argument('--repeat', type=int, default=200, help='doctest 样例重复次数')
+    parser.add_argument('--baseline', help='旧版本 regex.py 路径')
+    args = parser.parse_args()
+
+    modules = [('current', regex)]
+    if args.baseline:
+        modules.insert(0, ('baseline', load_baseline(args.baseline)))
+
+    names, folders = synthetic_corpus(args.names)
+    cases = [('doctest', doctest_corpus(), args.repeat), ('synthetic', {
+        'matchSeason': folders,
+        'matchSeries': names,
+        'matchEpisodePart': names,
+        'extractEpisodeNum': [m for m in map(regex.matchEpisodePart, names) if m],
+        'simpleMatchEp': names,
+    }, 1)]
+
+    print(f"{'corpus':<10} {'function':<18} {'impl':<9} {'calls':>9} {'time(s)':>9} {'us/call':>9}")
+    for corpus, inputs, repeat in cases:
+        for name in FUNCTIONS:
+            expected = None
+            for impl, module in modules:
+                results, elapsed = run(module, name, inputs[name], repeat)
+                calls = len(inputs[name]) * repeat
+                print(f"{corpus:<10} {name:<18} {impl:<9} {calls:>9} {elapsed:>9.3f} "
+                      f"{elapsed / max(calls, 1) * 1e6:>9.2f}")
+                if expected is not None and results != expected:
+                    print(f"  mismatch: {sum(a != b for a, b in zip(results, expected))} results differ")
+                expected = results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+轮询快照扫描和比较基准测试
+
+在临时目录中生成文件树，分别测量旧的快照结构（每个文件一个 FileSnapshot 对象，按完整路径保存在字典中，
+通过 md5 哈希比较）和 IncrementalScanner 的紧凑快照表：
+- full: 列出全部目录并建立快照
+- rescan: 少量文件增删改后再次全量列出，并与上一次快照比较
+- memory: 快照常驻内存（tracemalloc）
+
+    cd backend
+    python -m benchmarks.snapshot_scan --files 200000
+"""
+import argparse
+import gc
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Dict
+
+from bonita.modules.monitor.scanner import IncrementalScanner
+from bonita.utils.filehelper import is_video_file
+
+
+@dataclass
+class FileSnapshot:
+    """旧版本的文件快照"""
+    path: str
+    size: int
+    mtime: float
+    is_directory: bool
+
+    def get_hash(self) -> str:
+        content = f"{self.path}:{self.size}:{self.mtime}:{self.is_directory}"
+        return hashlib.md5(content.encode()).hexdigest()
+
+
+class LegacyScanner:
+    """旧版本实现：全部文件快照保存在 路径 -> FileSnapshot 字典中，按哈希比较"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.snapshots: Dict[str, FileSnapshot] = {}
+
+    def scan(self):
+        current = {}
+        stack = [self.root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                        continue
+                    if not is_video_file(entry.name):
+                        continue
+                    st = entry.stat()
+                    current[entry.path] = FileSnapshot(entry.path, st.st_size, st.st_mtime, False)
+        old = self.snapshots
+        added = [current[path] for path in current.keys() - old.keys()]
+        removed = list(old.keys() - current.keys())
+        changed = [snapshot for path, snapshot in current.items()
+                   if path in old and old[path].get_hash() != snapshot.get_hash()]
+        self.snapshots = current
+        return len(added), len(changed), len(removed)
+
+
+class TableScanner:
+    """当前实现，每次列出全部目录以便与旧版本比较"""
+
+    def __init__(self, root: str):
+        self.scanner = IncrementalScanner(root, verify_interval=0)
+
+    def scan(self):
+        diff = self.scanner.scan()
+        return len(diff.added), len(diff.changed), len(diff.removed)
+
+
+def build_tree(root: str, count: int, per_dir: int):
+    """ 生成 count 个视频文件，每个目录 per_dir 个，另有同等数量的字幕文件 """
+    paths = []
+    for i in range(count):
+        folder = os.path.join(root, f"show{i // (per_dir * 20):04d}", f"season{i // per_dir % 20:02d}")
+        if i % per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"Show.S01E{i % per_dir:03d}.{i:07d}.1080p.WEB-DL.mkv")
+        open(path, 'wb').close()
+        open(path[:-4] + '.ass', 'wb').close()
+        paths.append(path)
+    return paths
+
+
+def mutate(paths, changes: int):
+    """ 删除、修改和新增各 changes 个文件 """
+    step = max(len(paths) // (changes * 3), 1)
+    targets = paths[::step][:changes * 3]
+    for path in targets[:changes]:
+        os.remove(path)
+    for path in targets[changes:changes * 2]:
+        with open(path, 'ab') as f:
+            f.write(b'x')
+    for path in targets[changes * 2:]:
+        open(path[:-4] + '.new.mkv', 'wb').close()
+
+
+def measure(impl, root: str, paths, changes: int):
+    # 常驻内存单独测量，tracemalloc 会拖慢计时
+    gc.collect()
+    tracemalloc.start()
+    scanner = impl(root)
+    scanner.scan()
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del scanner
+
+    scanner = impl(root)
+    start = time.perf_counter()
+    full = scanner.scan()
+    full_time = time.perf_counter() - start
+
+    mutate(paths, changes)
+    start = time.perf_counter()
+    diff = scanner.scan()
+    rescan_time = time.perf_counter() - start
+    return full, full_time, diff, rescan_time, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200000, help='视频文件数量')
+    parser.add_argument('--per-dir', type=int, default=50, help='每个目录的文件数量')
+    parser.add_argument('--changes', type=int, default=100, help='第二次扫描前删除、修改、新增的文件数量')
+    args = parser.parse_args()
+
+    print(f"{'impl':<8} {'files':>8} {'full(s)':>8} {'rescan(s)':>10} {'memory(MB)':>11} {'+/~/-':>14}")
+    for name, impl in (('legacy', LegacyScanner), ('table', TableScanner)):
+        root = tempfile.mkdtemp(prefix='bonita-bench-')
+        try:
+            paths = build_tree(root, args.files, args.per_dir)
+            full, full_time, diff, rescan_time, memory = measure(impl, root, paths, args.changes)
+            print(f"{name:<8} {full[0]:>8} {full_time:>8.2f} {rescan_time:>10.2f} {memory / 1048576:>11.1f} "
+                  f"{'/'.join(map(str, diff)):>14}")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
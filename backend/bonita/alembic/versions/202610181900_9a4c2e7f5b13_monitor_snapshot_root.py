@@ -0,0 +1,47 @@
+"""monitor snapshot per root
+
+Revision ID: 9a4c2e7f5b13
+Revises: 3f6d1b8e2a07
+Create Date: 2026-10-18 19:00:41.208317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e7f5b13'
+down_revision: Union[str, None] = '3f6d1b8e2a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 快照改为按监控文件夹保存，多个任务的同一文件夹会冲突，清空后第一次轮询重新建立基线
+    op.execute('DELETE FROM monitorsnapshot')
+    op.execute('DELETE FROM monitordirectory')
+    with op.batch_alter_table('monitorsnapshot', schema=None) as batch_op:
+        batch_op.drop_index('ix_monitorsnapshot_task_root_path')
+        batch_op.drop_column('task_id')
+        batch_op.create_index('ix_monitorsnapshot_root_path', ['root', 'path'], unique=True)
+
+    with op.batch_alter_table('monitordirectory', schema=None) as batch_op:
+        batch_op.drop_index('ix_monitordirectory_task_root_path')
+        batch_op.drop_column('task_id')
+        batch_op.create_index('ix_monitordirectory_root_path', ['root', 'path'], unique=True)
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM monitorsnapshot')
+    op.execute('DELETE FROM monitordirectory')
+    with op.batch_alter_table('monitordirectory', schema=None) as batch_op:
+        batch_op.drop_index('ix_monitordirectory_root_path')
+        batch_op.add_column(sa.Column('task_id', sa.Integer(), nullable=False, comment='任务ID'))
+        batch_op.create_index('ix_monitordirectory_task_root_path', ['task_id', 'root', 'path'], unique=True)
+
+    with op.batch_alter_table('monitorsnapshot', schema=None) as batch_op:
+        batch_op.drop_index('ix_monitorsnapshot_root_path')
+        batch_op.add_column(sa.Column('task_id', sa.Integer(), nullable=False, comment='任务ID'))
+        batch_op.create_index('ix_monitorsnapshot_task_root_path', ['task_id', 'root', 'path'], unique=True)
@@ -1,10 +1,12 @@
-from typing import Any
+from typing import Any, Optional
 from fastapi import APIRouter, HTTPException
 
 from bonita import schemas
 from bonita.api.deps import CurrentUser, SessionDep
 from bonita.db.models.task import TransferConfig
 from bonita.modules.monitor.monitor import MonitorService
+from bonita.services.manifest_service import ManifestService
+from bonita.services.plan_service import TransferPlanService
 
 router = APIRouter()
 
@@ -21,6 +23,14 @@ def get_all_task_configs(session: SessionDep, skip: int = 0, limit: int = 100) -
     return schemas.TransferConfigsPublic(data=config_list, count=count)
 
 
+@router.get("/monitor", response_model=schemas.Response)
+def get_monitor_status() -> Any:
+    """
+    获取文件监控状态，事件模式下包含各监听路径的 inotify watch 数
+    """
+    return schemas.Response(data=MonitorService().get_status())
+
+
 @router.post("/", response_model=schemas.TransferConfigPublic)
 def create_task_config(
     session: SessionDep, current_user: CurrentUser, config_in: schemas.TransferConfigCreate
@@ -41,6 +51,41 @@ def create_task_config(
     return task_config
 
 
+@router.post("/{id}/plan", response_model=schemas.TransferPlanPage)
+def plan_task_config(
+    session: SessionDep,
+    id: int,
+    plan_in: schemas.TransferPlanParam,
+) -> Any:
+    """
+    预览转移结果，不修改文件和记录
+    可临时覆盖任务规则，返回第一页结果，后续分页通过 plan_id 获取
+    """
+    task_config = session.get(TransferConfig, id)
+    if not task_config:
+        raise HTTPException(status_code=404, detail="任务配置未找到")
+    task_info = schemas.TransferConfigPublic.model_validate(task_config)
+    overrides = plan_in.model_dump(exclude_unset=True, exclude={'limit'})
+    if overrides:
+        task_info = task_info.model_copy(update=overrides)
+    try:
+        plan = TransferPlanService(session).plan(task_info)
+    except OSError as e:
+        raise HTTPException(status_code=400, detail=f"源文件夹无法读取: {e}")
+    return plan.page(0, plan_in.limit)
+
+
+@router.get("/plan/{plan_id}", response_model=schemas.TransferPlanPage)
+def get_task_config_plan(plan_id: str, skip: int = 0, limit: int = 100, status: Optional[str] = None) -> Any:
+    """
+    分页获取转移预览结果
+    """
+    plan = TransferPlanService.get(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="预览结果不存在或已过期")
+    return plan.page(skip, limit, status)
+
+
 @router.put("/{id}", response_model=schemas.TransferConfigPublic)
 def update_task_config(
     session: SessionDep,
@@ -57,6 +102,8 @@ def update_task_config(
     task_config.update(session, update_dict)
     session.commit()
     session.refresh(task_config)
+    # 配置变化后转移结果可能不同，清空转移清单
+    ManifestService(session).clear(task_config.id)
 
     if task_config.auto_watch:
         MonitorService().start_monitoring_directory(task_config.source_folder, task_config.id, "source")
@@ -81,5 +128,6 @@ def delete_task_config(
         MonitorService().stop_monitoring_directory(config.output_folder, config.id)
     session.delete(config)
     session.commit()
+    ManifestService(session).clear(id)
 
     return schemas.Response(success=True, message="任务配置删除成功")
@@ -9,6 +9,8 @@ from bonita.celery_tasks.tasks import celery_transfer_entry, celery_transfer_gro
 from bonita.services.celery_service import CeleryTaskService
 from bonita.core.enums import TaskStatusEnum
 from bonita.schemas.response import Response
+from bonita.utils.iosched import read_io_stats
+from bonita.utils.limiter import ConcurrencyLimiter
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -33,7 +35,7 @@ async def run_transfer_task(
         task_type = 'TransferGroup'
         detail = path_param.path.strip()
     else:
-        task = celery_transfer_entry.delay(task_dict)
+        task = celery_transfer_entry.delay(task_dict, path_param.force, path_param.clean_dry_run)
         task_type = 'TransferAll'
         detail = str(id)
 
@@ -48,6 +50,21 @@ async def run_transfer_task(
     )
 
 
+@router.get("/io", response_model=Response)
+def get_io_status() -> Any:
+    """ 获取 worker 各设备的 I/O 队列深度
+    """
+    return Response(data=read_io_stats())
+
+
+@router.get("/limiter", response_model=Response)
+def get_limiter_status() -> Any:
+    """ 获取各并发池的使用情况
+    使用 Redis 时为整个部署的使用情况，否则仅为当前进程
+    """
+    return Response(data=ConcurrencyLimiter().usage())
+
+
 @router.get("/status", response_model=list[schemas.TaskStatus])
 def get_all_tasks_status(
     session: SessionDep,
@@ -1,6 +1,7 @@
 from functools import wraps
 from typing import Callable
 import logging
+from celery.exceptions import Retry
 
 from bonita.core.enums import TaskStatusEnum
 from bonita.services.celery_service import CeleryTaskService
@@ -13,6 +14,7 @@ def manage_celery_task(task_type: str):
     """
     Celery任务管理装饰器
     自动创建任务记录、更新进度、处理异常
+    任务调用 self.retry 时不标记失败，重试沿用同一任务记录
 
     则在创建记录后检查父任务状态：若父任务已被清理（REVOKED），
     当前任务直接标记为 REVOKED 并跳过执行。
@@ -47,6 +49,12 @@ def manage_celery_task(task_type: str):
 
                 return result
 
+            except Retry:
+                # 交给 Celery 重试，任务记录保持进行中
+                with CeleryTaskService() as task_service:
+                    task_service.update_task_progress(task_id, 0.0, f"等待重试 ({self.request.retries + 1})")
+                raise
+
             except Exception as e:
                 # 标记任务失败
                 error_message = str(e)
@@ -1,11 +1,17 @@
 import os
+import json
+import queue
+import hashlib
 import logging
 import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 from urllib.parse import urlparse
 from celery import shared_task, group
+from celery.exceptions import TimeoutError as CeleryTimeoutError
 from celery.result import allow_join_result
-
-from multiprocessing import Semaphore
+from celery.utils.time import get_exponential_backoff_interval
 
 from bonita import schemas
 from bonita.core.config import settings
@@ -14,34 +20,50 @@ from bonita.db.models.extrainfo import ExtraInfo
 from bonita.db.models.metadata import Metadata
 from bonita.db.models.record import TransRecords
 from bonita.db.models.scraping import ScrapingConfig
+from bonita.db.models.task import TransferConfig
 from bonita.modules.scraping.number_parser import FileNumInfo
 from bonita.modules.scraping.scraping import add_mark, need_crop, process_nfo_file, process_cover, scraping, load_all_NFO_from_folder
 from bonita.utils.fileinfo import BasicFileInfo, TargetFileInfo
-from bonita.modules.transfer.transfer import transSingleFile, transferfile
+from bonita.modules.transfer.transfer import GroupNaming, execute_transferfile, transSingleFile
 from bonita.utils.downloader import process_cached_file, download_file, update_cache_from_local
-from bonita.utils.filehelper import cleanFolderWithoutSuffix, findAllFilesWithSuffix, video_type
+from bonita.utils.filecopy import isRetryableCopyError
+from bonita.utils.filehelper import OperationMethod
 from bonita.utils.http import get_active_proxy
+from bonita.utils.dircache import DirListingCache
+from bonita.utils.limiter import ConcurrencyLimiter, POOL_IMAGE, POOL_SCRAPING, POOL_TRANSFER
+from bonita.utils.locks import KeyedLock
 from bonita.modules.media_service.emby import EmbyService
 from bonita.modules.media_service.sync import sync_emby_history
 from bonita.celery_tasks.decorators import manage_celery_task
 from bonita.services.celery_service import TaskProgressTracker
+from bonita.services.clean_service import CleanService
+from bonita.services.fingerprint_service import DUPLICATE_LINK, DUPLICATE_SKIP, FingerprintService
+from bonita.services.inode_service import InodeIndex, LinkedTarget
+from bonita.services.journal_service import STEP_COVER, STEP_LINKED, STEP_SCRAPED, JournalEntry, TransferJournalService
+from bonita.services.manifest_service import ManifestService
+from bonita.services.plan_service import plan_group_target, scan_group_files
+from bonita.services.record_service import RecordService
+from bonita.services.run_service import RUN_HEARTBEAT_INTERVAL, TransferRunService
 from bonita.services.setting_service import SettingService
 
 
-# 创建信号量，最多允许X任务同时执行
-max_concurrent_tasks = settings.MAX_CONCURRENT_TASKS
-semaphore = Semaphore(max_concurrent_tasks)
-
 logger = logging.getLogger(__name__)
 
+# 文件组内每处理 N 个文件提交一次记录
+RECORD_COMMIT_BATCH = 100
+
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
              name='transfer:all')
 @manage_celery_task("TransferAll")
-def celery_transfer_entry(self, task_json):
+def celery_transfer_entry(self, task_json, force=False, clean_dry_run=False):
     """ 转移任务入口
+    根据转移清单仅处理新增或变化的文件，force 为 True 时全量重新扫描
+    clean_dry_run 为 True 时清理任务只生成报告，不删除文件
+    已完成的目标路径由各文件组直接写入运行结果表（以入口任务ID为运行ID），不经过结果后端汇总
     """
     task_id = self.request.id
+    run_id = task_id
     progress_tracker = TaskProgressTracker(task_id, 100)
     progress_tracker.set_progress(5, "初始化转移任务")
     task_info = schemas.TransferConfigPublic(**task_json)
@@ -49,15 +71,36 @@ def celery_transfer_entry(self, task_json):
 
     logger.info(f"## [转移任务] START - ID:{task_info.id} | 源:{task_info.source_folder} → 目标:{task_info.output_folder}")
 
-    # 获取 source 文件夹下所有顶层文件/文件夹
+    # 增量扫描 source 文件夹，对比转移清单
     progress_tracker.set_progress(15, "扫描源文件夹")
     escape_folders = set([fo.strip() for fo in task_info.escape_folder.split(',')] if task_info.escape_folder else [])
-    dirs = [entry for entry in os.scandir(task_info.source_folder) if entry.name not in escape_folders]
-    logger.info(f"  扫描到 {len(dirs)} 个顶层条目（已排除文件夹: {escape_folders}）")
+    escape_lits = [lit.strip() for lit in task_info.escape_literals.split(',') if lit.strip()] if task_info.escape_literals else []
+    min_size_bytes = task_info.escape_size * 1024 * 1024 if task_info.escape_size and task_info.escape_size > 0 else 0
+    with SessionFactory() as session:
+        manifest_service = ManifestService(session)
+        manifest = {} if force else manifest_service.load(task_info.id)
+        scan = manifest_service.scan(task_info.source_folder, manifest, escape_folders, escape_lits, min_size_bytes, force)
+        run_service = TransferRunService(session)
+        run_service.purge_expired()
+        TransferJournalService(session).purge_expired()
+        # 重试时重新统计
+        run_service.clear(run_id)
+        run_service.touch(run_id)
+        session.commit()
+    logger.info(f"  扫描到 {len(scan.changed)} 个需处理的顶层条目，跳过 {len(scan.unchanged)} 个未变化文件"
+                f"（已排除文件夹: {escape_folders}，全量: {force}）")
 
-    # 创建转移任务组
+    # 创建转移任务组，仅部分文件变化时只处理变化的文件
     progress_tracker.set_progress(25, "创建转移任务组")
-    transfer_group = group(celery_transfer_group.s(task_json, entry.path) for entry in dirs)
+    if settings.TRANSFER_BATCH_ENTRIES or settings.TRANSFER_BATCH_FILES:
+        # 多个顶层条目打包为一个任务，减少消息、任务记录和结果数量
+        batches = scan.batches(settings.TRANSFER_BATCH_ENTRIES, settings.TRANSFER_BATCH_FILES)
+        logger.info(f"  打包为 {len(batches)} 个批次")
+        transfer_group = group(celery_transfer_batch.s(task_json, batch, run_id) for batch in batches)
+    else:
+        transfer_group = group(
+            celery_transfer_group.s(task_json, path, False, None if path in scan.full_entries else files, run_id)
+            for path, files in scan.changed.items())
 
     # 先执行所有转移任务
     progress_tracker.set_progress(35, "执行转移任务")
@@ -69,29 +112,39 @@ def celery_transfer_entry(self, task_json):
     # 使用 allow_join_result 上下文管理器等待转移任务完成
     progress_tracker.set_progress(50, "等待转移任务完成")
     with allow_join_result():
-        done_list = transfer_result.get()
+        # 子任务仅返回处理数量
+        _wait_run(transfer_result, run_id)
         progress_tracker.set_progress(70, "处理转移结果")
-        if isinstance(done_list, list):
-            flat_done_list = []
-            for sublist in done_list:
-                if isinstance(sublist, list):
-                    flat_done_list.extend(sublist)
-                else:
-                    flat_done_list.append(sublist)
-            done_list = flat_done_list
-        # 剔除 done_list 中的重复项
-        if done_list:
-            done_list = list(set(done_list))
-        logger.info(f"  ✓ 转移完成 - 共处理 {len(done_list)} 个文件")
+        # 更新转移清单，未成功的文件下次重新处理
+        changed_files = [f for files in scan.changed.values() for f in files]
+        with SessionFactory() as session:
+            manifest_service = ManifestService(session)
+            processed, _ = manifest_service.processed_paths(changed_files)
+            scan.drop(task_info.source_folder, [f for f in changed_files if f not in processed])
+            manifest_service.replace(task_info.id, scan.entries)
+            run_service = TransferRunService(session)
+            # 未变化的文件同样属于本次结果，避免被清理
+            if task_info.clean_others and scan.unchanged:
+                _, destpaths = manifest_service.processed_paths(scan.unchanged)
+                run_service.add(run_id, destpaths.values())
+                session.commit()
+            done_count = run_service.count(run_id)
+            if task_info.clean_others:
+                # 清理任务读取运行结果前不会被当作中断的运行删除
+                run_service.touch(run_id)
+                session.commit()
+            else:
+                run_service.clear(run_id)
+        logger.info(f"  ✓ 转移完成 - 共处理 {done_count} 个文件")
 
         # 转移完成后，判断是否执行清理任务或扫描任务
         progress_tracker.set_progress(85, "执行后续任务")
         if task_info.clean_others:
             logger.info("  → 触发清理任务")
             if os.environ.get("MAX_CONCURRENCY") == "1":
-                celery_clean_others.apply(args=[task_info.output_folder, done_list])
+                celery_clean_others.apply(args=[task_info.output_folder, run_id, clean_dry_run])
             else:
-                celery_clean_others.apply_async(args=[task_info.output_folder, done_list])
+                celery_clean_others.apply_async(args=[task_info.output_folder, run_id, clean_dry_run])
         if task_info.auto_watch:
             logger.info("  → 触发媒体库扫描")
             if os.environ.get("MAX_CONCURRENCY") == "1":
@@ -105,258 +158,576 @@ def celery_transfer_entry(self, task_json):
     return True
 
 
+def _wait_run(result, run_id: str):
+    """ 等待转移子任务完成，期间定期记录运行活动，避免长时间的运行被其他入口任务当作中断清理 """
+    while True:
+        try:
+            return result.get(timeout=RUN_HEARTBEAT_INTERVAL)
+        except CeleryTimeoutError:
+            with SessionFactory() as session:
+                TransferRunService(session).touch(run_id)
+                session.commit()
+
+
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
              name='transfer:group')
 @manage_celery_task("TransferGroup")
-def celery_transfer_group(self, task_json, full_path, isEntry=False):
+def celery_transfer_group(self, task_json, full_path, isEntry=False, only_files=None, run_id=None):
     """ 对 group/folder 内所有关联文件进行转移
+    only_files 不为空时仍扫描整个文件组用于命名，但只转移其中列出的文件
+    run_id 不为空时目标路径写入运行结果表，仅返回处理数量
+    复制中断的文件通过任务重试从断点继续，重试时只处理这些文件
     """
-    with semaphore:
+    # 整个部署内同时执行的转移任务数受 transfer 池限制
+    with ConcurrencyLimiter().slot(POOL_TRANSFER):
         task_id = self.request.id
         progress_tracker = TaskProgressTracker(task_id, 100)
         progress_tracker.set_progress(5, "开始处理文件组")
         progress_tracker.update_detail(full_path)
 
-        logger.info(f"  ▸ [文件组] {full_path}")
-        if not os.path.exists(full_path):
-            logger.warning("    ✗ 路径不存在")
-            return []
-
         progress_tracker.set_progress(15, "解析任务配置")
         task_info = schemas.TransferConfigPublic(**task_json)
-        is_series = False
-        if task_info.content_type == 2:
-            is_series = True
+        try:
+            done_list = _transfer_group(task_info, full_path, only_files, progress_tracker, run_id)
+        except CopyInterrupted as e:
+            raise _retry_transfer(self, e.error, [task_json, full_path, isEntry, e.files, run_id])
+
+        progress_tracker.set_progress(95, "处理后续任务")
+        if isEntry and task_info.auto_watch:
+            try:
+                celery_emby_scan.apply(args=[task_json])
+            except Exception as e:
+                logger.error(f"    ✗ Emby 扫描失败: {e}")
+
+        progress_tracker.complete(f"文件组转移完成，处理了 {len(done_list)} 个文件")
+        logger.info(f"  ▸ [文件组] 完成 - {len(done_list)} 个文件")
+        if run_id:
+            return len(done_list)
+        return done_list
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
+             name='transfer:batch')
+@manage_celery_task("TransferBatch")
+def celery_transfer_batch(self, task_json, entries, run_id=None):
+    """ 在一个任务内依次转移多个顶层条目
+    entries: [(full_path, only_files), ...]
+    目标路径写入运行结果表，仅返回处理数量
+    复制中断的文件在其余条目完成后通过任务重试从断点继续
+    """
+    with ConcurrencyLimiter().slot(POOL_TRANSFER):
+        task_id = self.request.id
+        progress_tracker = TaskProgressTracker(task_id, 100)
+        progress_tracker.set_progress(5, "开始处理条目批次")
+        progress_tracker.update_detail(f"{len(entries)} 个条目: {entries[0][0] if entries else ''}")
+        task_info = schemas.TransferConfigPublic(**task_json)
+
+        logger.info(f"  ▸ [条目批次] {len(entries)} 个条目")
+        done_count = 0
+        interrupted = []
+        for idx, (full_path, only_files) in enumerate(entries):
+            progress_tracker.set_progress(5 + 90 * idx // len(entries), f"处理条目 {idx+1}/{len(entries)}: {full_path}")
+            try:
+                done_count += len(_transfer_group(task_info, full_path, only_files, run_id=run_id,
+                                                  copy_tracker=progress_tracker))
+            except CopyInterrupted as e:
+                interrupted.append((full_path, e))
+        if interrupted:
+            raise _retry_transfer(self, interrupted[0][1].error,
+                                  [task_json, [(full_path, e.files) for full_path, e in interrupted], run_id])
+
+        progress_tracker.complete(f"条目批次转移完成，处理了 {done_count} 个文件")
+        logger.info(f"  ▸ [条目批次] 完成 - {done_count} 个文件")
+        return done_count
 
+
+def _transfer_group(task_info: schemas.TransferConfigPublic, full_path: str, only_files=None,
+                    progress_tracker: Optional[TaskProgressTracker] = None, run_id: Optional[str] = None,
+                    copy_tracker: Optional[TaskProgressTracker] = None):
+    """ 转移单个文件组，返回目标路径列表
+    copy_tracker: 复制速率写入的任务进度，默认同 progress_tracker
+    复制模式下出现可重试的错误时，其余文件照常完成并提交，最后抛出 CopyInterrupted
+    """
+    copy_tracker = copy_tracker or progress_tracker
+    logger.info(f"  ▸ [文件组] {full_path}")
+    if not os.path.exists(full_path):
+        logger.warning("    ✗ 路径不存在")
+        return []
+
+    if progress_tracker:
         progress_tracker.set_progress(25, "扫描待处理文件")
-        waiting_list = []
-        if os.path.isdir(full_path):
-            escape_folders = [fo.strip() for fo in task_info.escape_folder.split(',')] if task_info.escape_folder else []
-            allvideo_list = findAllFilesWithSuffix(full_path, video_type, escape_folders)
-            for video in allvideo_list:
-                tf = BasicFileInfo(video)
-                tf.set_root_folder(task_info.source_folder)
-                waiting_list.append(tf)
-        else:
-            if os.path.splitext(full_path)[1].lower() not in video_type:
-                logger.warning("    ✗ 非视频文件，跳过")
-                return []
-            tf = BasicFileInfo(full_path)
-            tf.set_root_folder(task_info.source_folder)
-            waiting_list.append(tf)
-
-        # 排除文件名包含指定文字的文件
-        if task_info.escape_literals:
-            escape_lits = [lit.strip() for lit in task_info.escape_literals.split(',') if lit.strip()]
-            if escape_lits:
-                before_count = len(waiting_list)
-                waiting_list = [tf for tf in waiting_list if not any(lit in tf.filename for lit in escape_lits)]
-                logger.info(f"    排除含指定文字的文件: {before_count - len(waiting_list)} 个 (规则: {escape_lits})")
-
-        # 排除小于指定大小的文件（单位MB，0表示不排除）
-        if task_info.escape_size and task_info.escape_size > 0:
-            min_size_bytes = task_info.escape_size * 1024 * 1024
-            before_count = len(waiting_list)
-            waiting_list = [tf for tf in waiting_list if os.path.getsize(tf.full_path) >= min_size_bytes]
-            logger.info(f"    排除小于 {task_info.escape_size}MB 的文件: {before_count - len(waiting_list)} 个")
+    waiting_list = scan_group_files(task_info, full_path)
 
+    if only_files is not None:
+        only_set = set(only_files)
+        todo_list = [tf for tf in waiting_list if tf.full_path in only_set]
+        logger.info(f"    找到 {len(waiting_list)} 个文件，其中 {len(todo_list)} 个需要处理")
+    else:
+        todo_list = waiting_list
         logger.info(f"    找到 {len(waiting_list)} 个文件")
-        progress_tracker.set_progress(40, f"开始处理 {len(waiting_list)} 个文件")
-        try:
-            session = SessionFactory()
-            done_list = []
-            total_files = len(waiting_list)
-            for idx, original_file in enumerate(waiting_list):
-                # 更新当前文件处理进度
-                if total_files > 0:
-                    file_progress = 40 + (50 * idx // total_files)
-                    progress_tracker.set_progress(
-                        file_progress, f"处理文件 {idx+1}/{total_files}: {original_file.filename if hasattr(original_file, 'filename') else 'unknown'}")
-                if not isinstance(original_file, BasicFileInfo):
-                    continue
+    if progress_tracker:
+        progress_tracker.set_progress(40, f"开始处理 {len(todo_list)} 个文件")
+    done_list = []
+    # 刮削模式下与 done_list 对应的源路径，提交记录时删除其转移日志
+    done_srcpaths = []
+    # 已随记录提交的 done_list 长度
+    run_flushed = 0
+    # 复制中断、可重试的源文件及第一个错误
+    interrupted = []
+    interrupt_error = None
+    try:
+        # 记录批量提交，避免提交后逐条刷新
+        session = SessionFactory(expire_on_commit=False)
+        scraping_dict = None
+        if task_info.sc_enabled:
+            scraping_conf = session.query(ScrapingConfig).filter(ScrapingConfig.id == task_info.sc_id).first()
+            if scraping_conf:
+                scraping_dict = scraping_conf.to_dict()
 
-                logger.info(f"    [{idx+1}/{total_files}] {original_file.filename}")
-
-                record = session.query(TransRecords).filter(TransRecords.srcpath == original_file.full_path).first()
-                if not record:
-                    record = TransRecords()
-                    record.srcname = original_file.filename
-                    record.srcpath = original_file.full_path
-                    record.srcfolder = original_file.parent_folder
-                    record.create(session)
-                if record.srcdeleted:
-                    record.srcdeleted = False
-                if record.ignored:
-                    logger.info("      ⊘ 已忽略")
+        # 准备记录，TransRecords 只在当前线程读写
+        # 一次性预取文件组内所有记录，缺失的记录统一创建
+        todo_list = [tf for tf in todo_list if isinstance(tf, BasicFileInfo)]
+        records = RecordService(session).get_records_by_srcpaths([tf.full_path for tf in todo_list])
+        config_digest = _config_digest(task_info, scraping_dict)
+        # 硬链接按 inode 查表判断是否已链接，不再逐个 stat 目标
+        links = None
+        if task_info.operation == OperationMethod.HARD_LINK and not task_info.sc_enabled:
+            links = InodeIndex(session).load(tf.stat for tf in todo_list)
+        # 尚未转移的文件检查内容是否已在媒体库中
+        duplicates = {}
+        if settings.TRANSFER_DUPLICATES in (DUPLICATE_SKIP, DUPLICATE_LINK):
+            fresh = [tf for tf in todo_list
+                     if not (records.get(tf.full_path) and records[tf.full_path].destpath)]
+            if fresh:
+                duplicates = FingerprintService(session).find_duplicates(fresh, task_info.output_folder)
+        # 命名推断按整个文件组进行，文件组级别的信息只计算一次
+        naming = GroupNaming(waiting_list)
+        jobs = []
+        for original_file in todo_list:
+            record = records.get(original_file.full_path)
+            if not record:
+                record = TransRecords()
+                record.srcname = original_file.filename
+                record.srcpath = original_file.full_path
+                record.srcfolder = original_file.parent_folder
+                record.destpath = ''
+                session.add(record)
+                records[original_file.full_path] = record
+            if record.srcdeleted:
+                record.srcdeleted = False
+            if record.ignored:
+                logger.info(f"      ⊘ 已忽略 {original_file.filename}")
+                continue
+            record.task_id = task_info.id
+            record.success = None
+            existing = duplicates.get(original_file.full_path)
+            if existing:
+                logger.info(f"      ⊘ 内容重复，已存在 {existing}")
+                record.success = True
+                # 已有文件属于其他记录，不写入 destpath，避免之后作为旧目标被删除
+                record.duplicate_of = existing
+                if settings.TRANSFER_DUPLICATES == DUPLICATE_LINK:
+                    done_list.append(existing)
+                    if task_info.sc_enabled:
+                        done_srcpaths.append(original_file.full_path)
+                continue
+            if record.duplicate_of:
+                record.duplicate_of = ''
+            if task_info.sc_enabled:
+                if not scraping_dict:
+                    logger.error(f"      ✗ 刮削配置未找到 {original_file.filename}")
+                    record.success = False
                     continue
-                record.task_id = task_info.id
-                record.success = None
-                if task_info.sc_enabled:
-                    logger.info("      → 刮削模式")
-                    scraping_conf = session.query(ScrapingConfig).filter(ScrapingConfig.id == task_info.sc_id).first()
-                    if not scraping_conf:
-                        logger.error("      ✗ 刮削配置未找到")
-                        record.success = False
-                        continue
-                    scraping_task = celery_scrapping.apply(args=[original_file.full_path, scraping_conf.to_dict()])
-                    with allow_join_result():
-                        metabase_json = scraping_task.get()
-                    if not metabase_json:
-                        logger.error("      ✗ 刮削失败")
-                        record.success = False
-                        continue
-                    metamixed = schemas.MetadataMixed.model_validate(metabase_json)
-
-                    # 验证结果路径在 output_folder 下，例如：extra_folder 不能"/"开头导致join失败
-                    output_folder = os.path.abspath(os.path.join(task_info.output_folder, metamixed.extra_folder))
-                    base_output = os.path.abspath(task_info.output_folder)
-                    if not output_folder.startswith(base_output):
-                        logger.error("      ✗ 安全检查失败，使用基础目录")
-                        output_folder = base_output
-                    if not os.path.exists(output_folder):
-                        os.makedirs(output_folder)
-                    # 更新NFO文件/cover
-                    process_nfo_file(output_folder, metamixed.extra_filename, metamixed.__dict__)
-
-                    # 尝试下载封面，最多重试3次
-                    proxy = get_active_proxy(session)
-                    cache_cover_filepath = None
-                    cover_url = metamixed.cover
-                    retry_count = 0
-                    max_retries = 3
-                    used_sources = {metamixed.site} if metamixed.site else set()
-                    extrafanart_list = []
-
-                    # 收集首次刮削拿到的 extrafanart
-                    raw_ef = metamixed.extrafanart or ''
-                    if raw_ef:
-                        ef_items = raw_ef.split(',') if isinstance(raw_ef, str) else raw_ef
-                        extrafanart_list = [u.strip() for u in ef_items if u.strip()]
-
-                    while retry_count < max_retries:
-                        try:
-                            cache_cover_filepath = process_cached_file(session, metamixed.cover, metamixed.number)
-                            break
-                        except Exception as e:
-                            retry_count += 1
-                            logger.warning(f"      ✗ 封面下载失败 (尝试 {retry_count}/{max_retries}): {cover_url} — {e}")
-                            if retry_count >= max_retries:
-                                break
-                            # 用其他源重新刮削获取封面 URL
-                            all_sources = scraping_conf.scraping_sites.split(',') if scraping_conf.scraping_sites else []
-                            remaining_sources = [s.strip() for s in all_sources if s.strip() and s.strip() not in used_sources]
-                            if not remaining_sources:
-                                logger.warning("      ⊘ 没有可用源可继续尝试")
-                                break
-                            # 指定第一个未用过的源重新刮削
-                            fallback_json = scraping(
-                                metamixed.number,
-                                sources=','.join(remaining_sources[:1]),
-                                specifiedsource="",
-                                specifiedurl="",
-                                proxy=proxy
-                            )
-                            if fallback_json and fallback_json.get('cover'):
-                                new_site = fallback_json.get('source', '')
-                                if new_site:
-                                    used_sources.add(new_site)
-                                # 收集 extrafanart
-                                ef_raw = fallback_json.get('extrafanart')
-                                if ef_raw:
-                                    ef_items = ef_raw.split(',') if isinstance(ef_raw, str) else ef_raw
-                                    for u in ef_items:
-                                        u = u.strip()
-                                        if u and u not in extrafanart_list:
-                                            extrafanart_list.append(u)
-                                new_cover = fallback_json.get('cover')
-                                if new_cover and new_cover != cover_url:
-                                    cover_url = new_cover
-                                    continue
-                            break
-
-                    # 全部重试失败，降级到 extrafanart
-                    if cache_cover_filepath is None and extrafanart_list:
-                        ef_url = extrafanart_list[0]
-                        logger.info(f"      → 使用 extrafanart 作为封面: {ef_url}")
-                        try:
-                            cache_cover_filepath = download_file(ef_url, metamixed.number, proxy)
-                            cover_url = ef_url
-                        except Exception as e:
-                            logger.warning(f"      ⊘ extrafanart 下载失败: {e}")
-
-                    # 更新 metadata_mixed 中的 cover 为实际使用的 URL，同时回写数据库
-                    if cover_url:
-                        metamixed.cover = cover_url
-                        metadata_record = session.query(Metadata).filter(
-                            Metadata.number == metamixed.number
-                        ).order_by(Metadata.id.desc()).first()
-                        if metadata_record:
-                            metadata_record.cover = cover_url
-                            session.commit()
-
-                    # 有封面则处理封面图片，否则跳过
-                    pics = []
-                    if cache_cover_filepath:
-                        pics = process_cover(cache_cover_filepath, output_folder, metamixed.extra_filename, crop=metamixed.extra_crop)
-                        if scraping_conf.watermark_enabled:
-                            add_mark(pics, metamixed.tag, scraping_conf.watermark_location, scraping_conf.watermark_size)
+                # 同一番号的文件共享封面等缓存，串行处理
+                lane = FileNumInfo(original_file.full_path).num or original_file.full_path
+                jobs.append(_TransferJob(original_file, record, None, lane, record.destpath,
+                                         _job_signature(config_digest, original_file)))
+            else:
+                # 命名按文件组顺序计算，实际转移并发执行
+                # 多个源文件命名到同一目标时在同一 lane 内依次转移，避免检查、删除和链接同一目标时相互竞争
+                target_file = plan_group_target(task_info, original_file, record, naming)
+                linked, renamed = links.resolve(original_file.full_path, original_file.stat, target_file.full_path,
+                                                task_info.output_folder) if links else (False, None)
+                jobs.append(_TransferJob(original_file, record, target_file, target_file.full_path, record.destpath,
+                                         linked=linked, renamed=renamed))
+
+        session.commit()
+
+        # 旧目标仍被其他记录使用时只转移，不删除旧目标
+        shared = RecordService(session).get_shared_destpaths([job.record for job in jobs])
+        if shared:
+            jobs = [job._replace(old_destpath='') if job.old_destpath in shared else job for job in jobs]
+
+        # 刮削模式下上次中断的文件从第一个未完成的步骤继续
+        # 直接转移只有一步，不写转移日志，避免逐个文件提交
+        journal = TransferJournalService(session).load(
+            task_info.id, {job.original_file.full_path: job.signature for job in jobs if job.signature})
+        if journal:
+            logger.info(f"    {len(journal)} 个文件从上次中断处继续")
+            jobs = [job._replace(resume=journal.get(job.original_file.full_path)) for job in jobs]
+
+        # 按 threads_num 并发处理，同一 lane 内保持顺序
+        lanes = {}
+        for job in jobs:
+            lanes.setdefault(job.lane, []).append(job)
+        threads_num = max(1, min(task_info.threads_num or 1, len(lanes) or 1))
+        folder_locks = KeyedLock()
+        # 文件组范围的目录列表缓存，列目录次数与目录数而非文件数相关
+        listing = DirListingCache()
+        results = queue.Queue()
+
+        def run_lane(lane_jobs):
+            for job in lane_jobs:
+                error = None
+                try:
+                    if job.target_file is None:
+                        result = _transfer_scraping_file(job, task_info, scraping_dict, folder_locks, listing,
+                                                         copy_tracker)
                     else:
-                        logger.warning("      ⊘ 封面获取失败，跳过封面图片处理")
-                    # 移动
-                    destpath = transSingleFile(original_file, output_folder,
-                                               metamixed.extra_filename, task_info.operation)
-                    done_list.append(destpath)
-                    if record.destpath != destpath:
-                        # 如果新的路径和之前不同，则删除之前的文件
-                        if os.path.exists(record.destpath):
-                            os.remove(record.destpath)
-                    # 更新
-                    record.destpath = destpath
-                    logger.info("      ✓ 刮削转移完成")
-                else:
-                    logger.info("      → 直接转移")
-                    target_file = TargetFileInfo(task_info.output_folder)
-                    if record.top_folder:
-                        target_file.force_update_top_folder(record.top_folder)
-                    # 如果 record 中定义了剧集信息，则使用 record 中的信息
-                    if record.isepisode:
-                        target_file.force_update_episode(record.isepisode, record.season, record.episode)
-                    # 开始转移
-                    target_file = transferfile(original_file, target_file,
-                                               optimize_name_tag=task_info.optimize_name, series_tag=is_series,
-                                               file_list=waiting_list, linktype=task_info.operation)
-                    done_list.append(target_file.full_path)
-                    if record.destpath != target_file.full_path:
-                        # 如果新的路径和之前不同，则删除之前的文件
-                        if os.path.exists(record.destpath):
-                            os.remove(record.destpath)
-                    # 更新
-                    record.isepisode = target_file.is_episode
-                    record.season = target_file.season_number
-                    record.episode = target_file.episode_number
-                    record.top_folder = target_file.top_folder
-                    record.second_folder = target_file.second_folder
-                    record.destpath = target_file.full_path
-                    logger.info("      ✓ 直接转移完成")
+                        result = _transfer_direct_file(job, task_info, folder_locks, listing, copy_tracker)
+                except Exception as e:
+                    logger.error(f"      ✗ 转移失败 {job.original_file.filename}: {e}")
+                    result = None
+                    if task_info.operation == OperationMethod.COPY and isRetryableCopyError(e):
+                        error = e
+                results.put((job, result, error))
+
+        total_files = len(jobs)
+        logger.info(f"    使用 {threads_num} 个线程处理 {total_files} 个文件")
+        with ThreadPoolExecutor(max_workers=threads_num, thread_name_prefix="transfer") as executor:
+            for lane_jobs in lanes.values():
+                executor.submit(contextvars.copy_context().run, run_lane, lane_jobs)
+            for idx in range(total_files):
+                job, result, error = results.get()
+                record = job.record
+                # 更新当前文件处理进度
+                if progress_tracker:
+                    file_progress = 40 + (50 * (idx + 1) // total_files)
+                    progress_tracker.set_progress(
+                        file_progress, f"处理文件 {idx+1}/{total_files}: {job.original_file.filename}")
+                if not result:
+                    record.success = False
+                    if error is not None:
+                        interrupted.append(job.original_file.full_path)
+                        interrupt_error = interrupt_error or error
+                    continue
+                done_list.append(result['destpath'])
+                if job.signature:
+                    done_srcpaths.append(job.original_file.full_path)
+                record.update(session, result)
+                if job.renamed and job.renamed.record_id != record.id:
+                    # 重命名前的记录不再持有目标路径，避免清理时删除
+                    session.query(TransRecords).filter(TransRecords.id == job.renamed.record_id).update(
+                        {TransRecords.destpath: '', TransRecords.srcdeleted: True}, synchronize_session=False)
                 # 更新 record 状态
                 record.deleted = False
                 record.success = True
-        except Exception as e:
-            logger.error(e)
-        finally:
+                if (idx + 1) % RECORD_COMMIT_BATCH == 0:
+                    _flush_done(session, task_info.id, run_id, done_list, done_srcpaths, run_flushed)
+                    run_flushed = len(done_list)
+                    session.commit()
+        logger.debug(f"    目录列表 {listing.listings} 次")
+    except Exception as e:
+        logger.error(e)
+    finally:
+        _flush_done(session, task_info.id, run_id, done_list, done_srcpaths, run_flushed)
+        session.commit()
+        session.close()
+    if interrupted:
+        logger.warning(f"    {len(interrupted)} 个文件复制中断，等待重试")
+        raise CopyInterrupted(interrupted, interrupt_error)
+    return done_list
+
+
+class CopyInterrupted(Exception):
+    """ 文件组内的复制因可重试的错误中断，已完成的文件已提交 """
+
+    def __init__(self, files: list, error: BaseException):
+        super().__init__(f"{len(files)} files interrupted: {error}")
+        # 需重试的源文件
+        self.files = files
+        self.error = error
+
+
+def _retry_transfer(task, error: BaseException, args: list):
+    """ 只带中断的文件重试任务，间隔与 retry_backoff 一致；超过重试次数时抛出 error """
+    countdown = get_exponential_backoff_interval(factor=1, retries=task.request.retries, maximum=600,
+                                                 full_jitter=True)
+    logger.info(f"  ↻ {countdown} 秒后重试中断的复制")
+    return task.retry(args=args, exc=error, countdown=countdown)
+
+
+def _flush_done(session, task_id: int, run_id: Optional[str], done_list: list, done_srcpaths: list, start: int):
+    """ 将 done_list[start:] 写入运行结果表并删除对应的转移日志，随记录一同提交 """
+    if len(done_list) <= start:
+        return
+    if run_id:
+        TransferRunService(session).add(run_id, done_list[start:])
+    TransferJournalService(session).complete(task_id, done_srcpaths[start:])
+
+
+def _config_digest(task_info: schemas.TransferConfigPublic, scraping_dict: Optional[dict]) -> str:
+    """ 影响转移结果的配置摘要 """
+    config = [task_info.output_folder, task_info.operation.value, task_info.content_type, task_info.optimize_name,
+              scraping_dict]
+    return hashlib.md5(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _job_signature(config_digest: str, original_file: BasicFileInfo) -> str:
+    """ 转移日志摘要：配置、源文件大小和修改时间 """
+    st = original_file.stat or os.stat(original_file.full_path)
+    key = f"{config_digest}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def _journal_step(task_info: schemas.TransferConfigPublic, job: '_TransferJob', step: int, data: dict):
+    """ 立即提交已完成的步骤，写入失败不影响转移 """
+    try:
+        with SessionFactory() as session:
+            TransferJournalService(session).save(task_info.id, job.original_file.full_path, job.signature, step, data)
             session.commit()
-            session.close()
+    except Exception as e:
+        logger.warning(f"      ⊘ 转移日志写入失败 {job.original_file.filename}: {e}")
 
-        progress_tracker.set_progress(95, "处理后续任务")
-        if isEntry and task_info.auto_watch:
+
+class _TransferJob(NamedTuple):
+    """ 文件组内单个文件的转移任务 """
+    original_file: BasicFileInfo
+    record: TransRecords
+    # 直接转移模式下预先计算的目标，刮削模式为空
+    target_file: Optional[TargetFileInfo]
+    # 同一 lane 的任务按顺序执行
+    lane: str
+    # 记录中原有的目标路径
+    old_destpath: str
+    # 转移日志摘要，仅刮削模式
+    signature: str = ''
+    # 上次中断时已完成的步骤
+    resume: Optional[JournalEntry] = None
+    # 按 inode 索引确认已链接到目标路径
+    linked: bool = False
+    # 同一 inode 重命名前的源文件记录
+    renamed: Optional[LinkedTarget] = None
+
+
+def _remove_old_destpath(old_destpath: str, destpath: str, listing: Optional[DirListingCache] = None):
+    """ 如果新的路径和之前不同，则删除之前的文件 """
+    if old_destpath and old_destpath != destpath and os.path.exists(old_destpath):
+        os.remove(old_destpath)
+        if listing is not None:
+            listing.removed(old_destpath)
+
+
+def _move_renamed_link(old_destpath: str, destpath: str, listing: Optional[DirListingCache] = None) -> bool:
+    """ 源文件重命名后，将已有的链接移动到新的目标路径，失败时返回 False 并重新链接 """
+    try:
+        os.makedirs(os.path.dirname(destpath), exist_ok=True)
+        os.rename(old_destpath, destpath)
+    except OSError as e:
+        logger.debug(f"[!] move renamed link failed: {e}")
+        return False
+    if listing is not None:
+        listing.removed(old_destpath)
+        listing.added(destpath)
+    logger.info(f"      ↻ 源文件已重命名，移动已有链接 {old_destpath}")
+    return True
+
+
+def _copy_progress(task_info: schemas.TransferConfigPublic, progress_tracker: Optional[TaskProgressTracker],
+                   filename: str):
+    """ 复制模式下将复制进度和速率写入任务步骤，返回 linkFile 使用的回调 """
+    if not progress_tracker or task_info.operation != OperationMethod.COPY:
+        return None
+
+    def report(copied: int, total: int, rate: float):
+        progress_tracker.set_step(f"复制 {filename}: {copied / 1024**3:.1f}/{total / 1024**3:.1f} GB, "
+                                  f"{rate / 1024**2:.1f} MB/s")
+    return report
+
+
+def _transfer_direct_file(job: _TransferJob, task_info: schemas.TransferConfigPublic, folder_locks: KeyedLock,
+                          listing: Optional[DirListingCache] = None,
+                          progress_tracker: Optional[TaskProgressTracker] = None):
+    """ 直接转移单个文件，返回需要更新到记录的字段
+    """
+    logger.info(f"      → 直接转移 {job.original_file.filename}")
+    linked = job.linked
+    if job.renamed and job.renamed.destpath != job.target_file.full_path:
+        if linked:
+            _remove_old_destpath(job.renamed.destpath, job.target_file.full_path, listing)
+        else:
+            linked = _move_renamed_link(job.renamed.destpath, job.target_file.full_path, listing)
+    folder_lock = folder_locks.get(os.path.dirname(job.target_file.full_path))
+    target_file = execute_transferfile(job.original_file, job.target_file, task_info.operation, folder_lock, listing,
+                                       _copy_progress(task_info, progress_tracker, job.original_file.filename), linked)
+    _remove_old_destpath(job.old_destpath, target_file.full_path, listing)
+    logger.info(f"      ✓ 直接转移完成 {job.original_file.filename}")
+    result = {
+        'isepisode': target_file.is_episode,
+        'season': target_file.season_number,
+        'episode': target_file.episode_number,
+        'top_folder': target_file.top_folder,
+        'second_folder': target_file.second_folder,
+        'destpath': target_file.full_path,
+    }
+    if task_info.operation == OperationMethod.HARD_LINK and job.original_file.stat is not None:
+        result['st_dev'] = job.original_file.stat.st_dev
+        result['st_ino'] = job.original_file.stat.st_ino
+    return result
+
+
+def _transfer_scraping_file(job: _TransferJob, task_info: schemas.TransferConfigPublic, scraping_dict: dict,
+                            folder_locks: KeyedLock, listing: Optional[DirListingCache] = None,
+                            progress_tracker: Optional[TaskProgressTracker] = None):
+    """ 刮削并转移单个文件，返回需要更新到记录的字段，失败返回 None
+    刮削、封面、链接每步完成后写入转移日志，中断后从第一个未完成的步骤继续
+    """
+    original_file = job.original_file
+    step = job.resume.step if job.resume else 0
+    state = dict(job.resume.data) if job.resume else {}
+    if step >= STEP_LINKED and os.path.exists(state['destpath']):
+        logger.info(f"      ✓ 已转移，沿用上次结果 {original_file.filename}")
+        return {'destpath': state['destpath']}
+
+    scraping_conf = schemas.ScrapingConfigPublic(**scraping_dict)
+    if step >= STEP_SCRAPED:
+        logger.info(f"      → 刮削模式，沿用上次刮削结果 {original_file.filename}")
+        metabase_json = state['metadata']
+    else:
+        logger.info(f"      → 刮削模式 {original_file.filename}")
+        scraping_task = celery_scrapping.apply(args=[original_file.full_path, scraping_dict])
+        # 本地执行的结果，不会阻塞等待其他 worker
+        metabase_json = scraping_task.get(disable_sync_subtasks=False)
+        if not metabase_json:
+            logger.error(f"      ✗ 刮削失败 {original_file.filename}")
+            return None
+    metamixed = schemas.MetadataMixed.model_validate(metabase_json)
+    if step < STEP_SCRAPED:
+        # 保存可序列化的刮削结果，续传时通过 model_validate 重建
+        state['metadata'] = metamixed.model_dump(mode='json')
+        _journal_step(task_info, job, STEP_SCRAPED, state)
+
+    # 验证结果路径在 output_folder 下，例如：extra_folder 不能"/"开头导致join失败
+    output_folder = os.path.abspath(os.path.join(task_info.output_folder, metamixed.extra_folder))
+    base_output = os.path.abspath(task_info.output_folder)
+    if not output_folder.startswith(base_output):
+        logger.error("      ✗ 安全检查失败，使用基础目录")
+        output_folder = base_output
+    os.makedirs(output_folder, exist_ok=True)
+    if step < STEP_COVER:
+        _process_scraping_artwork(metamixed, scraping_conf, output_folder)
+        # 封面处理可能更新了封面地址
+        state['metadata'] = metamixed.model_dump(mode='json')
+        _journal_step(task_info, job, STEP_COVER, state)
+
+    # 移动
+    destpath = transSingleFile(original_file, output_folder, metamixed.extra_filename, task_info.operation,
+                               folder_locks.get(output_folder), listing,
+                               _copy_progress(task_info, progress_tracker, original_file.filename))
+    _remove_old_destpath(job.old_destpath, destpath, listing)
+    state['destpath'] = destpath
+    _journal_step(task_info, job, STEP_LINKED, state)
+    logger.info(f"      ✓ 刮削转移完成 {original_file.filename}")
+    return {'destpath': destpath}
+
+
+def _process_scraping_artwork(metamixed: schemas.MetadataMixed, scraping_conf: schemas.ScrapingConfigPublic,
+                              output_folder: str):
+    """ 写入 NFO，下载并处理封面图片，封面失败时尝试其他源和 extrafanart
+    """
+    # 更新NFO文件/cover
+    process_nfo_file(output_folder, metamixed.extra_filename, metamixed.__dict__)
+
+    with SessionFactory() as session:
+        # 尝试下载封面，最多重试3次
+        proxy = get_active_proxy(session)
+        cache_cover_filepath = None
+        cover_url = metamixed.cover
+        retry_count = 0
+        max_retries = 3
+        used_sources = {metamixed.site} if metamixed.site else set()
+        extrafanart_list = []
+
+        # 收集首次刮削拿到的 extrafanart
+        raw_ef = metamixed.extrafanart or ''
+        if raw_ef:
+            ef_items = raw_ef.split(',') if isinstance(raw_ef, str) else raw_ef
+            extrafanart_list = [u.strip() for u in ef_items if u.strip()]
+
+        while retry_count < max_retries:
             try:
-                celery_emby_scan.apply(args=[task_json])
+                with ConcurrencyLimiter().slot(POOL_IMAGE):
+                    cache_cover_filepath = process_cached_file(session, metamixed.cover, metamixed.number)
+                break
             except Exception as e:
-                logger.error(f"    ✗ Emby 扫描失败: {e}")
+                retry_count += 1
+                logger.warning(f"      ✗ 封面下载失败 (尝试 {retry_count}/{max_retries}): {cover_url} — {e}")
+                if retry_count >= max_retries:
+                    break
+                # 用其他源重新刮削获取封面 URL
+                all_sources = scraping_conf.scraping_sites.split(',') if scraping_conf.scraping_sites else []
+                remaining_sources = [s.strip() for s in all_sources if s.strip() and s.strip() not in used_sources]
+                if not remaining_sources:
+                    logger.warning("      ⊘ 没有可用源可继续尝试")
+                    break
+                # 指定第一个未用过的源重新刮削
+                with ConcurrencyLimiter().slot(POOL_SCRAPING):
+                    fallback_json = scraping(
+                        metamixed.number,
+                        sources=','.join(remaining_sources[:1]),
+                        specifiedsource="",
+                        specifiedurl="",
+                        proxy=proxy
+                    )
+                if fallback_json and fallback_json.get('cover'):
+                    new_site = fallback_json.get('source', '')
+                    if new_site:
+                        used_sources.add(new_site)
+                    # 收集 extrafanart
+                    ef_raw = fallback_json.get('extrafanart')
+                    if ef_raw:
+                        ef_items = ef_raw.split(',') if isinstance(ef_raw, str) else ef_raw
+                        for u in ef_items:
+                            u = u.strip()
+                            if u and u not in extrafanart_list:
+                                extrafanart_list.append(u)
+                    new_cover = fallback_json.get('cover')
+                    if new_cover and new_cover != cover_url:
+                        cover_url = new_cover
+                        continue
+                break
 
-        progress_tracker.complete(f"文件组转移完成，处理了 {len(done_list)} 个文件")
-        logger.info(f"  ▸ [文件组] 完成 - {len(done_list)} 个文件")
-        return done_list
+        # 全部重试失败，降级到 extrafanart
+        if cache_cover_filepath is None and extrafanart_list:
+            ef_url = extrafanart_list[0]
+            logger.info(f"      → 使用 extrafanart 作为封面: {ef_url}")
+            try:
+                with ConcurrencyLimiter().slot(POOL_IMAGE):
+                    cache_cover_filepath = download_file(ef_url, metamixed.number, proxy)
+                cover_url = ef_url
+            except Exception as e:
+                logger.warning(f"      ⊘ extrafanart 下载失败: {e}")
+
+        # 更新 metadata_mixed 中的 cover 为实际使用的 URL，同时回写数据库
+        if cover_url:
+            metamixed.cover = cover_url
+            metadata_record = session.query(Metadata).filter(
+                Metadata.number == metamixed.number
+            ).order_by(Metadata.id.desc()).first()
+            if metadata_record:
+                metadata_record.cover = cover_url
+                session.commit()
+
+    # 有封面则处理封面图片，否则跳过
+    pics = []
+    if cache_cover_filepath:
+        with ConcurrencyLimiter().slot(POOL_IMAGE):
+            pics = process_cover(cache_cover_filepath, output_folder, metamixed.extra_filename,
+                                 crop=metamixed.extra_crop)
+            if scraping_conf.watermark_enabled:
+                add_mark(pics, metamixed.tag, scraping_conf.watermark_location, scraping_conf.watermark_size)
+    else:
+        logger.warning("      ⊘ 封面获取失败，跳过封面图片处理")
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
@@ -403,12 +774,13 @@ def celery_scrapping(self, file_path, scraping_dict):
             # 如果没有找到任何记录，则从网络抓取
             logger.info(f"      → 网络抓取: {extrainfo.number}")
             proxy = get_active_proxy(session)
-            json_data = scraping(extrainfo.number,
-                                 scraping_conf.scraping_sites,
-                                 extrainfo.specifiedsource,
-                                 extrainfo.specifiedurl,
-                                 proxy
-                                 )
+            with ConcurrencyLimiter().slot(POOL_SCRAPING):
+                json_data = scraping(extrainfo.number,
+                                     scraping_conf.scraping_sites,
+                                     extrainfo.specifiedsource,
+                                     extrainfo.specifiedurl,
+                                     proxy
+                                     )
             # Return if blank dict returned (data not found)
             if not json_data:
                 logger.error("      ✗ 抓取失败")
@@ -476,21 +848,47 @@ def celery_scrapping(self, file_path, scraping_dict):
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
              name='clean:clean_others')
-def celery_clean_others(self, root_path, done_list):
-    logger.info(f"## [清理任务] START - {root_path}")
-
-    cleaned_files = []
-    dest_list = findAllFilesWithSuffix(root_path, video_type)
-    for dest in dest_list:
-        if dest not in done_list:
-            cleaned_files.append(dest)
-    for torm in cleaned_files:
-        logger.info(f"  ✗ 删除: {os.path.basename(torm)}")
-        os.remove(torm)
-    cleanFolderWithoutSuffix(root_path, video_type)
-
-    logger.info(f"## [清理任务] END - 删除 {len(cleaned_files)} 个文件")
-    return cleaned_files
+def celery_clean_others(self, root_path, run_id, dry_run=False):
+    """ 清理目标文件夹中不属于本次运行结果的视频文件
+    run_id: 转移运行ID，根据转移记录和运行结果计算需清理的文件，只检查涉及的目录
+    dry_run: 仅返回清理报告，不删除文件
+    """
+    logger.info(f"## [清理任务] START - {root_path}{' (dry run)' if dry_run else ''}")
+
+    with SessionFactory() as session:
+        clean_service = CleanService(session)
+        report = clean_service.plan(root_path, run_id)
+        report.dry_run = dry_run
+        if dry_run:
+            for path in report.orphans:
+                logger.info(f"  ✗ 待删除: {os.path.basename(path)}")
+            for folder in report.folders:
+                logger.info(f"  ✗ 待删除文件夹: {folder}")
+        else:
+            clean_service.execute(report)
+        TransferRunService(session).clear(run_id)
+
+    logger.info(f"## [清理任务] END - {'待' if dry_run else ''}删除 {len(report.orphans)} 个文件, "
+                f"{len(report.folders)} 个文件夹, 检查 {report.scanned_dirs} 个目录")
+    return report.to_dict()
+
+
+@shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
+             name='clean:partials')
+def celery_clean_partials(self, dry_run=False):
+    """ 清理复制模式任务目标文件夹中过期的复制临时文件和断点
+    dry_run: 仅返回待删除的文件
+    """
+    logger.info(f"## [临时文件清理] START{' (dry run)' if dry_run else ''}")
+    with SessionFactory() as session:
+        folders = {row.output_folder for row in session.query(TransferConfig.output_folder).filter(
+            TransferConfig.operation == OperationMethod.COPY)}
+        clean_service = CleanService(session)
+        removed = []
+        for folder in sorted(folders):
+            removed.extend(clean_service.sweep_partials(folder, dry_run))
+    logger.info(f"## [临时文件清理] END - {'待' if dry_run else ''}删除 {len(removed)} 个文件")
+    return removed
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=True, retry_kwargs={"max_retries": 3},
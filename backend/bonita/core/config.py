@@ -60,8 +60,30 @@ class Settings(BaseSettings):
     # CELERY
     CELERY_BROKER_URL: str = os.environ.get("CELERY_BROKER_URL", f"sqla+sqlite:///{DATABASE_LOCATION}")
     CELERY_RESULT_BACKEND: str = os.environ.get("CELERY_RESULT_BACKEND", f"db+sqlite:///{DATABASE_LOCATION}")
-    # 最大并发任务数, 受 worker 数量影响
+    # 最大并发任务数, 受 worker 数量影响；同时作为 transfer 并发池的默认上限
     MAX_CONCURRENT_TASKS: int = os.environ.get("MAX_CONCURRENT_TASKS", 5)
+    # 分布式并发限制：Redis 地址（为空时使用 redis:// 形式的 broker，均不可用时仅限制当前进程）
+    LIMITER_REDIS_URL: str = ""
+    # 各命名池在整个部署内的并发上限，未配置的池使用 MAX_CONCURRENT_TASKS
+    LIMITER_POOLS: dict = {"scraping": 2, "image": 2}
+    # 并发租约有效期（秒），worker 异常退出后额度在此时间后释放
+    LIMITER_LEASE_SECONDS: int = 60
+    # 转移任务分批分发：每批最多包含的顶层条目数 / 预估文件数，均为 0 时每个顶层条目单独分发
+    TRANSFER_BATCH_ENTRIES: int = 50
+    TRANSFER_BATCH_FILES: int = 200
+    # 按设备调度文件 I/O：每个设备的并发数 / 字节速率（0 表示不限制）
+    IO_DEVICE_CONCURRENCY: int = 2
+    IO_DEVICE_BYTES_PER_SEC: int = 0
+    # 指定路径所在设备的限制，例如 {"/media/hdd": {"concurrency": 1, "bytes_per_sec": 104857600}}
+    IO_DEVICE_LIMITS: dict = {}
+    # worker 写入设备队列快照的位置，每个进程写入 <文件名>.<主机名>-<pid>.json，为空时不写入
+    IO_STATS_LOCATION: str = "./data/iostats.json"
+    # 重复内容检测：大小相同时比较首尾内容指纹，识别已在媒体库中的文件
+    # "" 关闭；"skip" 跳过重复文件；"link" 记录直接指向已有的目标文件，不再刮削和转移
+    TRANSFER_DUPLICATES: str = ""
+    # 指纹读取文件首尾各 N MB；安装 xxhash 时使用 xxh3，否则使用 blake2b
+    FINGERPRINT_SAMPLE_MB: int = 4
+    FINGERPRINT_THREADS: int = 4
     # 日志
     LOGGING_FORMAT: str = "[%(asctime)s] %(levelname)s in %(module)s: PID:%(process)d TID:%(thread)d [%(task_id)s] %(message)s"
     LOGGING_LOCATION: str = "./data/bonita.log"
@@ -84,6 +106,16 @@ class Settings(BaseSettings):
     MONITOR_USE_POLLING: bool = False
     # 轮询间隔（秒）
     MONITOR_POLLING_INTERVAL: int = 30
+    # 轮询只重新列出修改时间变化的目录，每隔多少秒全量校验一次，0 表示每次全量扫描
+    MONITOR_POLLING_VERIFY_INTERVAL: int = 3600
+    # 单次轮询扫描的超时时间（秒），超时或失败后按轮询间隔指数退避，0 表示不限制
+    MONITOR_POLLING_TIMEOUT: int = 600
+    # 退避后的最长轮询间隔（秒）
+    MONITOR_POLLING_MAX_BACKOFF: int = 900
+    # 同一任务同一顶层文件夹的新文件事件合并：最后一个事件后静默多少秒再转移，0 表示不合并
+    MONITOR_DEBOUNCE_QUIET: float = 10
+    # 合并窗口的最长等待时间（秒），持续有事件时也按此间隔转移
+    MONITOR_DEBOUNCE_MAX_DELAY: float = 120
 
     @classmethod
     def settings_customise_sources(
@@ -1,6 +1,6 @@
 
 from typing import Generator
-from sqlalchemy import create_engine, inspect, event
+from sqlalchemy import and_, create_engine, inspect, event
 from sqlalchemy.orm import sessionmaker, Session, declared_attr, as_declarative
 
 from bonita.core.config import settings
@@ -35,6 +35,18 @@ def set_sqlite_pragma(dbapi_conn, connection_record):
 SessionFactory = sessionmaker(bind=engine, autoflush=False)
 
 
+def prefix_range(column, prefix: str):
+    """
+    前缀匹配条件，等价于 column.startswith(prefix)
+    SQLite 的 LIKE 默认不区分大小写，无法使用普通索引，且路径中的 `_` `%` 会被当作通配符；
+    改为范围比较 [prefix, prefix 末字符+1) 以便使用索引
+    """
+    if not prefix or ord(prefix[-1]) >= 0x10FFFF:
+        return column.startswith(prefix, autoescape=True)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
 def get_db() -> Generator:
     """
     获取数据库会话, 用于WEB请求
@@ -8,3 +8,8 @@ from .downloads import Downloads
 from .setting import SystemSetting
 from .watch_history import WatchHistory
 from .mediaitem import MediaItem
+from .manifest import TransferManifest
+from .run import TransferRun, TransferRunPath
+from .journal import TransferJournal
+from .fingerprint import FileFingerprint
+from .snapshot import MonitorSnapshot, MonitorDirectory
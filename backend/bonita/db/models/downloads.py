@@ -9,6 +9,6 @@ class Downloads(Base):
     """ 下载的文件
     """
     id = Column(Integer, primary_key=True, index=True)
-    url = Column(String, nullable=False, comment="下载链接")
+    url = Column(String, nullable=False, index=True, comment="下载链接")
     filepath = Column(String, nullable=False, comment="文件路径")
     updatetime = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
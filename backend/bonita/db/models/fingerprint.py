@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index
+
+from bonita.db import Base
+
+
+class FileFingerprint(Base):
+    """ 文件内容指纹缓存
+    键: (st_dev, st_ino)，size 和 mtime 变化时失效
+    指纹为大小加首尾部分内容的摘要，用于识别不同路径下的重复内容
+    """
+    __table_args__ = (
+        Index('ix_filefingerprint_dev_ino', 'st_dev', 'st_ino', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    st_dev = Column(Integer, nullable=False, comment='设备号')
+    st_ino = Column(Integer, nullable=False, comment='inode')
+    size = Column(Integer, default=0, comment='文件大小')
+    mtime = Column(Float, default=0.0, comment='修改时间')
+    fingerprint = Column(String, nullable=False, comment='内容指纹')
+    updatetime = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
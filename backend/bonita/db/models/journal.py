@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+
+from bonita.db import Base
+
+
+class TransferJournal(Base):
+    """ 转移日志
+    逐文件记录已完成的步骤（刮削、封面、链接），每步完成后立即提交；
+    转移记录提交时同一事务内删除，中断后重试从第一个未完成的步骤继续
+    signature: 配置、源文件 stat 和目标的摘要，不一致时日志作废
+    """
+    __table_args__ = (
+        Index('ix_transferjournal_task_path', 'task_id', 'srcpath', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False, comment='任务ID')
+    srcpath = Column(String, nullable=False, comment='源路径')
+    signature = Column(String, nullable=False, comment='配置和源文件摘要')
+    step = Column(Integer, default=0, comment='已完成的步骤')
+    data = Column(Text, default='{}', comment='步骤结果 JSON')
+    updatetime = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True, comment="更新时间")
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Index
+
+from bonita.db import Base
+
+
+class TransferManifest(Base):
+    """ 转移清单
+    记录每个转移任务上次成功处理时源文件/文件夹的 stat 信息
+    键: (path, st_dev, st_ino, size, mtime)，用于增量转移时跳过未变化的内容
+    """
+    __table_args__ = (
+        Index('ix_transfermanifest_task_path', 'task_id', 'path', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False, comment='任务ID')
+    path = Column(String, nullable=False, comment='源路径')
+    is_dir = Column(Boolean, default=False, comment='是否为文件夹')
+    st_dev = Column(Integer, default=0, comment='设备号')
+    st_ino = Column(Integer, default=0, comment='inode')
+    size = Column(Integer, default=0, index=True, comment='文件大小')
+    mtime = Column(Float, default=0.0, comment='修改时间')
+    updatetime = Column(DateTime, default=datetime.now, onupdate=datetime.now, comment="更新时间")
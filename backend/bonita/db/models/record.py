@@ -12,7 +12,7 @@ class TransRecords(Base):
     """
     id = Column(Integer, primary_key=True)
     srcname = Column(String, default='')
-    srcpath = Column(String, default='')
+    srcpath = Column(String, default='', index=True)
     srcfolder = Column(String, default='')
     task_id = Column(Integer, default=0, server_default='0', comment='任务ID')
 
@@ -32,7 +32,12 @@ class TransRecords(Base):
     episode = Column(Integer, default=-1)
     # 链接使用的地址，可能与docker内地址不同
     linkpath = Column(String, default='')
-    destpath = Column(String, default='')
+    destpath = Column(String, default='', index=True)
+    # 内容与媒体库中已有文件重复时，已有文件的目标路径，该文件属于其他记录
+    duplicate_of = Column(String, default='', server_default='', comment='重复内容的已有目标路径')
+    # 硬链接时目标与源文件共享的 inode，用于判断是否已链接和识别源文件重命名
+    st_dev = Column(Integer, default=0, server_default='0', comment='设备号')
+    st_ino = Column(Integer, default=0, server_default='0', index=True, comment='inode')
     # 完全删除时间，包括源文件和目标路径文件
     deadtime = Column(DateTime, default=None, comment='time to delete files')
 
@@ -0,0 +1,30 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index
+
+from bonita.db import Base
+
+
+class TransferRun(Base):
+    """ 转移运行
+    运行开始、写入结果和等待子任务时更新 updatetime，长时间没有更新的运行视为已中断
+    运行结果清理后删除
+    """
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False, unique=True, comment='运行ID')
+    createtime = Column(DateTime, default=datetime.now, comment="创建时间")
+    updatetime = Column(DateTime, default=datetime.now, index=True, comment="最后活动时间")
+
+
+class TransferRunPath(Base):
+    """ 转移运行结果
+    记录单次转移运行（入口任务ID）已完成的目标路径，供清理任务按批读取
+    运行结束后删除，运行中断时按 TransferRun 的最后活动时间清理
+    """
+    __table_args__ = (
+        Index('ix_transferrunpath_run_path', 'run_id', 'path', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False, comment='运行ID')
+    path = Column(String, nullable=False, comment='目标路径')
+    createtime = Column(DateTime, default=datetime.now, index=True, comment="创建时间")
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Float, Index
+
+from bonita.db import Base
+
+
+class MonitorSnapshot(Base):
+    """ 轮询监控的文件快照
+    按监控文件夹保存，监控同一文件夹的任务共用
+    每次轮询后按变化写入，重启后与当前扫描比较，离线期间新增和删除的文件同样触发事件
+    仍在写入(未稳定)的文件不写入，重启后重新检查稳定性
+    """
+    __table_args__ = (
+        Index('ix_monitorsnapshot_root_path', 'root', 'path', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    root = Column(String, nullable=False, comment='监控文件夹')
+    path = Column(String, nullable=False, comment='文件路径')
+    size = Column(Integer, comment='文件大小')
+    mtime = Column(Float, comment='修改时间')
+
+
+class MonitorDirectory(Base):
+    """ 轮询监控的目录状态
+    重启后修改时间未变化的目录沿用快照，不再列出
+    """
+    __table_args__ = (
+        Index('ix_monitordirectory_root_path', 'root', 'path', unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    root = Column(String, nullable=False, comment='监控文件夹')
+    path = Column(String, nullable=False, comment='目录路径')
+    mtime_ns = Column(Integer, comment='修改时间(纳秒)，0 表示需要重新列出')
+    listed_ns = Column(Integer, comment='列出时间(纳秒)')
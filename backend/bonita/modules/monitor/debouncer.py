@@ -0,0 +1,109 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from threading import Condition, Thread
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingBatch:
+    """等待合并的事件"""
+    first: float
+    last: float
+    # 有序去重
+    items: Dict[str, None] = field(default_factory=dict)
+
+    def deadline(self, quiet_period: float, max_delay: float) -> float:
+        """静默期结束或达到最长等待时间"""
+        return min(self.last + quiet_period, self.first + max_delay)
+
+
+class EventDebouncer:
+    """
+    按键合并短时间内的事件：同一个键在静默期内没有新事件，或距第一个事件超过最长等待时间后，
+    将期间的全部事件一次交给回调；回调在后台线程中执行，停止时立即处理未完成的批次
+    """
+
+    def __init__(self, callback: Callable[[Hashable, List[str]], None], quiet_period: float, max_delay: float):
+        """
+        Args:
+            callback: 回调函数 callback(key, items)
+            quiet_period: 静默期（秒），不大于 0 时不合并，事件直接回调
+            max_delay: 最长等待时间（秒）
+        """
+        self._callback = callback
+        self._quiet_period = quiet_period
+        self._max_delay = max(max_delay, quiet_period)
+        self._pending: Dict[Hashable, PendingBatch] = {}
+        self._cond = Condition()
+        self._is_running = False
+        self._thread: Optional[Thread] = None
+
+    def start(self) -> None:
+        with self._cond:
+            if self._is_running:
+                return
+            self._is_running = True
+        self._thread = Thread(target=self._run, name="event-debouncer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止并处理全部未完成的批次"""
+        with self._cond:
+            if not self._is_running:
+                return
+            self._is_running = False
+            self._cond.notify()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=30)
+
+    def add(self, key: Hashable, item: str) -> None:
+        """加入事件，同一批次内重复的事件只保留一个"""
+        if self._quiet_period <= 0 or not self._is_running:
+            self._dispatch(key, [item])
+            return
+        now = time.monotonic()
+        with self._cond:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = PendingBatch(first=now, last=now)
+            batch.items[item] = None
+            batch.last = now
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """等待中的批次数"""
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                due = self._wait_due()
+                stopping = not self._is_running
+            for key, batch in due:
+                self._dispatch(key, list(batch.items))
+            if stopping:
+                return
+
+    def _wait_due(self) -> List[Tuple[Hashable, PendingBatch]]:
+        """等待到期的批次，停止时返回全部批次，需持有锁"""
+        while self._is_running:
+            now = time.monotonic()
+            deadlines = {key: batch.deadline(self._quiet_period, self._max_delay)
+                         for key, batch in self._pending.items()}
+            due = [key for key, deadline in deadlines.items() if deadline <= now]
+            if due:
+                return [(key, self._pending.pop(key)) for key in due]
+            self._cond.wait(min(deadlines.values()) - now if deadlines else None)
+        due = list(self._pending.items())
+        self._pending.clear()
+        return due
+
+    def _dispatch(self, key: Hashable, items: List[str]) -> None:
+        try:
+            self._callback(key, items)
+        except Exception as e:
+            logger.error(f"Debounced callback failed for {key}: {e}", exc_info=True)
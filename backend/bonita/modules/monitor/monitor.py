@@ -3,18 +3,19 @@ import os
 from datetime import datetime, timedelta
 from threading import Lock
 from pathlib import Path
-from typing import Dict, Literal, Optional
+from typing import Dict, List, Literal, Optional, Tuple
 from watchdog.events import FileSystemEvent
-from watchdog.observers import Observer, ObserverType
 
 from bonita.core.config import settings
-from bonita.db import SessionFactory
+from bonita.db import SessionFactory, prefix_range
 from bonita.db.models.record import TransRecords
 from bonita.db.models.task import TransferConfig
 from bonita.utils.filehelper import is_video_file
 from bonita.utils.singleton import Singleton
+from bonita.modules.monitor.debouncer import EventDebouncer
 from bonita.modules.monitor.event_handler import FileEventHandler
 from bonita.modules.monitor.polling_handler import PollingHandler
+from bonita.modules.monitor.watcher import SharedObserver
 from bonita.celery_tasks.tasks import celery_transfer_group
 
 logger = logging.getLogger(__name__)
@@ -27,23 +28,39 @@ class MonitorService(metaclass=Singleton):
 
     For SMB/CIFS network drives, use polling mode by setting:
     MONITOR_USE_POLLING=true in environment or settings
+
+    New source files are coalesced per task and top-level entry, see MONITOR_DEBOUNCE_QUIET
+    and MONITOR_DEBOUNCE_MAX_DELAY
+
+    In event mode all tasks share one observer, each physical path is watched once
     """
 
     def __init__(self):
-        self._monitors: Dict[str, Dict[str, ObserverType]] = {}
         self._is_running: bool = False
         self._lock = Lock()
 
+        # 任务的源文件夹，用于确定新文件所属的顶层条目
+        self._source_folders: Dict[str, str] = {}
+        # 同一任务同一顶层条目的新文件合并为一次文件组转移
+        self._debouncer = EventDebouncer(self._dispatch_transfer,
+                                         quiet_period=settings.MONITOR_DEBOUNCE_QUIET,
+                                         max_delay=settings.MONITOR_DEBOUNCE_MAX_DELAY)
+
         # 检查是否使用轮询模式（适用于网络挂载文件夹）
         self._use_polling = settings.MONITOR_USE_POLLING
         self._polling_interval = settings.MONITOR_POLLING_INTERVAL
         self._polling_handler: Optional[PollingHandler] = None
+        self._observer: Optional[SharedObserver] = None
 
         if self._use_polling:
             logger.info(f"MonitorService will use POLLING mode (interval: {self._polling_interval}s)")
-            self._polling_handler = PollingHandler(polling_interval=self._polling_interval)
+            self._polling_handler = PollingHandler(polling_interval=self._polling_interval,
+                                                   verify_interval=settings.MONITOR_POLLING_VERIFY_INTERVAL,
+                                                   timeout=settings.MONITOR_POLLING_TIMEOUT,
+                                                   max_backoff=settings.MONITOR_POLLING_MAX_BACKOFF)
         else:
             logger.info("MonitorService will use EVENT-BASED mode (watchdog)")
+            self._observer = SharedObserver()
 
     def start(self) -> None:
         """Start the monitoring service - can be called from FastAPI startup event"""
@@ -53,11 +70,13 @@ class MonitorService(metaclass=Singleton):
                 return
             self._is_running = True
 
+        self._debouncer.start()
         if self._use_polling:
             # 使用轮询模式
             self._polling_handler.start()
         else:
             # 使用事件监听模式
+            self._observer.start()
             logger.info("MonitorService started (event-based)")
 
         # 统一加载监控配置
@@ -73,10 +92,10 @@ class MonitorService(metaclass=Singleton):
             self._polling_handler.stop()
         else:
             # 停止事件监听服务
-            for folder_path in list(self._monitors.keys()):
-                for task_id in list(self._monitors[folder_path].keys()):
-                    self._stop_monitoring(folder_path, task_id)
+            self._observer.stop()
 
+        # 不再有新事件后，立即转移合并中的文件
+        self._debouncer.stop()
         self._is_running = False
         logger.info("MonitorService stopped")
 
@@ -99,6 +118,9 @@ class MonitorService(metaclass=Singleton):
             logger.warning("Cannot add directory - MonitorService is not running")
             return
 
+        if folder_type == "source":
+            self._source_folders[task_id] = folder_path
+
         if self._use_polling:
             # 使用轮询模式，传递回调函数
             self._polling_handler.start_monitoring_directory(
@@ -114,20 +136,9 @@ class MonitorService(metaclass=Singleton):
             logger.error(f"Directory not found: {folder_path}")
             return
 
-        if folder_path not in self._monitors:
-            self._monitors[folder_path] = {}
-
-        if task_id in self._monitors[folder_path]:
-            logger.debug(f"Task {task_id} is already monitoring {folder_path}")
-            return
-
         event_handler = FileEventHandler(callback_func=self.handle_file_event, task_id=task_id, folder_type=folder_type)
-        observer = Observer()
-        observer.schedule(event_handler, folder_path, recursive=True)
-        observer.start()
-
-        self._monitors[folder_path][task_id] = observer
-        logger.info(f"Added monitoring for {folder_path} with task {task_id} as {folder_type} folder")
+        if self._observer.subscribe(folder_path, task_id, event_handler):
+            logger.info(f"Added monitoring for {folder_path} with task {task_id} as {folder_type} folder")
 
     def stop_monitoring_directory(self, folder_path: str, task_id: str) -> None:
         """Remove a directory from monitoring for a specific task"""
@@ -135,24 +146,23 @@ class MonitorService(metaclass=Singleton):
             logger.warning("Cannot remove directory - MonitorService is not running")
             return
 
+        if self._source_folders.get(task_id) == folder_path:
+            del self._source_folders[task_id]
+
         if self._use_polling:
             # 使用轮询模式
             self._polling_handler.stop_monitoring_directory(folder_path, task_id)
             return
 
         # 使用事件监听模式
-        self._stop_monitoring(folder_path, task_id)
-
-    def _stop_monitoring(self, folder_path: str, task_id: str) -> None:
-        """Stop an observer and clean up"""
-        if folder_path in self._monitors and task_id in self._monitors[folder_path]:
-            observer = self._monitors[folder_path].pop(task_id)
-            observer.stop()
-            observer.join()
+        if self._observer.unsubscribe(folder_path, task_id):
             logger.info(f"Stopped monitoring {folder_path} for task {task_id}")
 
-            if not self._monitors[folder_path]:
-                del self._monitors[folder_path]
+    def get_status(self) -> dict:
+        """Monitoring status: per-folder polling state, or watched paths and inotify watch counts"""
+        if self._use_polling:
+            return {'mode': 'polling', 'folders': self._polling_handler.get_status()}
+        return {'mode': 'event', **self._observer.get_status()}
 
     def handle_file_event(self, event: FileSystemEvent, task_id: str, filepath: str, folder_type: Literal["source", "output"]) -> None:
         """Execute task based on file system event"""
@@ -179,57 +189,91 @@ class MonitorService(metaclass=Singleton):
             logger.error(f"Task execution failed: {e}")
 
     def _trigger_transfer_task(self, filepath: str, task_id: str) -> None:
-        """Execute the task's main logic"""
+        """Queue the file, files under the same top-level entry are transferred together"""
+        entry = self._top_entry(filepath, self._source_folders.get(task_id))
+        logger.info(f"Queue file for transfer: {filepath}, task_id: {task_id}, entry: {entry}")
+        self._debouncer.add((task_id, entry), filepath)
+
+    @staticmethod
+    def _top_entry(filepath: str, source_folder: Optional[str]) -> str:
+        """源文件夹下的顶层条目，文件直接位于源文件夹时为文件本身"""
+        if source_folder:
+            try:
+                relative = Path(filepath).relative_to(source_folder)
+                if len(relative.parts) > 1:
+                    return os.path.join(source_folder, relative.parts[0])
+            except ValueError:
+                pass
+        return filepath
+
+    def _dispatch_transfer(self, key: Tuple[str, str], filepaths: List[str]) -> None:
+        """Execute the task's main logic for coalesced files of one top-level entry"""
+        task_id, entry = key
         try:
-            logger.info(f"Trigger task for file: {filepath}, task_id: {task_id}")
+            logger.info(f"Trigger task for {len(filepaths)} file(s) in: {entry}, task_id: {task_id}")
             with SessionFactory() as session:
                 task_info = session.query(TransferConfig).filter(TransferConfig.id == task_id).first()
                 if not task_info:
                     logger.warning(f"No task config found for task_id: {task_id}")
                     return
 
-                filename = os.path.basename(filepath)
-
                 # 检查 escape_folder：仅判断 source 目录的直接下一级目录名
                 if task_info.escape_folder:
                     escape_folders = {fo.strip() for fo in task_info.escape_folder.split(',') if fo.strip()}
                     try:
-                        relative = Path(filepath).relative_to(task_info.source_folder)
+                        relative = Path(filepaths[0]).relative_to(task_info.source_folder)
                         top_dir = relative.parts[0] if len(relative.parts) > 1 else None
                         if top_dir and top_dir in escape_folders:
-                            logger.info(f"  ⊘ 文件在排除文件夹 [{top_dir}] 中，跳过: {filepath}")
+                            logger.info(f"  ⊘ 文件在排除文件夹 [{top_dir}] 中，跳过: {entry}")
                             return
                     except ValueError:
                         pass
 
-                # 检查 escape_literals：文件名是否包含排除文字
-                if task_info.escape_literals:
-                    escape_lits = [lit.strip() for lit in task_info.escape_literals.split(',') if lit.strip()]
-                    if any(lit in filename for lit in escape_lits):
-                        logger.info(f"  ⊘ 文件名包含排除文字，跳过: {filepath}")
-                        return
-
-                # 检查 escape_size：文件是否小于指定大小（单位 MB，0 表示不排除）
-                if task_info.escape_size and task_info.escape_size > 0:
-                    min_size_bytes = task_info.escape_size * 1024 * 1024
-                    if os.path.getsize(filepath) < min_size_bytes:
-                        logger.info(f"  ⊘ 文件小于 {task_info.escape_size}MB，跳过: {filepath}")
-                        return
+                filepaths = [filepath for filepath in filepaths if self._accept_file(task_info, filepath)]
+                if not filepaths:
+                    return
 
                 # TODO: 环境不同可能存在丢失情况...
                 if not celery_transfer_group.app.conf.broker_url:
                     celery_transfer_group.app.conf.broker_url = settings.CELERY_BROKER_URL
                     logger.info(f"Set broker_url to: {celery_transfer_group.app.conf.broker_url}")
-                celery_transfer_group.delay(task_info.to_dict(), filepath, True)
+                # 文件组整体扫描用于命名，只转移合并的文件，完成后扫描一次媒体库
+                only_files = None if entry in filepaths else filepaths
+                celery_transfer_group.delay(task_info.to_dict(), entry, True, only_files)
         except Exception as e:
             logger.error(f"Task execution failed: {e}")
 
+    @staticmethod
+    def _accept_file(task_info: TransferConfig, filepath: str) -> bool:
+        """按任务的排除规则检查文件"""
+        filename = os.path.basename(filepath)
+
+        # 检查 escape_literals：文件名是否包含排除文字
+        if task_info.escape_literals:
+            escape_lits = [lit.strip() for lit in task_info.escape_literals.split(',') if lit.strip()]
+            if any(lit in filename for lit in escape_lits):
+                logger.info(f"  ⊘ 文件名包含排除文字，跳过: {filepath}")
+                return False
+
+        # 检查 escape_size：文件是否小于指定大小（单位 MB，0 表示不排除）
+        if task_info.escape_size and task_info.escape_size > 0:
+            min_size_bytes = task_info.escape_size * 1024 * 1024
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                logger.info(f"  ⊘ 文件已不存在，跳过: {filepath}")
+                return False
+            if size < min_size_bytes:
+                logger.info(f"  ⊘ 文件小于 {task_info.escape_size}MB，跳过: {filepath}")
+                return False
+        return True
+
     def _update_deleted_records(self, path: str) -> None:
         """Update records for deleted files in source folder"""
         try:
             with SessionFactory() as session:
                 # 删除可能是文件夹
-                records = session.query(TransRecords).filter(TransRecords.srcpath.startswith(path)).all()
+                records = session.query(TransRecords).filter(prefix_range(TransRecords.srcpath, path)).all()
                 for record in records:
                     logger.info(f"Updating deleted source record: {record.srcpath}")
                     record.srcdeleted = True
@@ -257,7 +301,7 @@ class MonitorService(metaclass=Singleton):
         try:
             with SessionFactory() as session:
                 # 删除可能是文件夹
-                records = session.query(TransRecords).filter(TransRecords.destpath.startswith(path)).all()
+                records = session.query(TransRecords).filter(prefix_range(TransRecords.destpath, path)).all()
                 for record in records:
                     logger.info(f"Setting deadtime for record: {record.destpath}")
                     record.deadtime = datetime.now() + timedelta(days=7)
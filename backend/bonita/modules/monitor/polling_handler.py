@@ -1,12 +1,15 @@
+import os
+import time
 import logging
-import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Literal, Optional, Callable
+from typing import Dict, List, Literal, Optional, Callable
 from threading import Thread, Lock, Event
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
-from bonita.utils.filehelper import is_video_file
+from bonita.db import SessionFactory
+from bonita.modules.monitor.scanner import IncrementalScanner, ScanDiff, ScanTimeout, Snapshot
+from bonita.services.snapshot_service import MonitorSnapshotService
 from bonita.utils.singleton import Singleton
 
 logger = logging.getLogger(__name__)
@@ -20,20 +23,6 @@ class PollingFileEvent:
     is_directory: bool
 
 
-@dataclass
-class FileSnapshot:
-    """文件快照信息"""
-    path: str
-    size: int
-    mtime: float
-    is_directory: bool
-
-    def get_hash(self) -> str:
-        """生成文件快照的哈希值"""
-        content = f"{self.path}:{self.size}:{self.mtime}:{self.is_directory}"
-        return hashlib.md5(content.encode()).hexdigest()
-
-
 @dataclass
 class MonitorTask:
     """监控任务配置"""
@@ -41,35 +30,58 @@ class MonitorTask:
     folder_path: str
     folder_type: Literal["source", "output"]
     callback_func: Callable
-    last_scan: Optional[datetime] = None
-    file_snapshots: Dict[str, FileSnapshot] = None
-    unstable_files: Dict[str, FileSnapshot] = None
+    # 轮询间隔（秒），为空时使用默认间隔
+    interval: Optional[float] = None
+
 
-    def __post_init__(self):
-        if self.file_snapshots is None:
-            self.file_snapshots = {}
-        if self.unstable_files is None:
-            self.unstable_files = {}
+@dataclass
+class PolledRoot:
+    """
+    轮询的文件夹，由独立的工作线程按自己的间隔扫描
+    监控同一文件夹的全部任务（如一个任务的源文件夹和另一个任务的输出文件夹）共用一次扫描，事件分发给每个任务
+    """
+    folder_path: str
+    scanner: IncrementalScanner
+    # task_id -> 监控任务
+    tasks: Dict[str, MonitorTask] = field(default_factory=dict)
+    last_scan: Optional[datetime] = None
+    # 未稳定文件的 (大小, 修改时间)
+    unstable_files: Dict[str, Snapshot] = field(default_factory=dict)
+    # 连续失败（含超时）次数，用于退避
+    failures: int = 0
+    # 最近一次扫描耗时（秒）
+    last_duration: float = 0
+    # 下一次轮询时间（time.monotonic）
+    next_poll: float = 0
+    worker: Optional[Thread] = None
+    # 停止监控该文件夹时设置
+    stopped: Event = field(default_factory=Event)
 
 
 class PollingHandler(metaclass=Singleton):
     """
     基于轮询的文件监控服务，适用于 SMB/CIFS 等网络挂载文件夹
+    每个文件夹由独立的线程轮询，一个挂载点缓慢或无响应不影响其他文件夹
     """
 
-    def __init__(self, polling_interval: int = 10):
+    def __init__(self, polling_interval: int = 10, verify_interval: int = 3600,
+                 timeout: int = 600, max_backoff: int = 900):
         """
         初始化轮询监控服务
 
         Args:
-            polling_interval: 轮询间隔（秒），默认 10 秒
+            polling_interval: 默认轮询间隔（秒），默认 10 秒
+            verify_interval: 增量扫描的全量校验间隔（秒），默认 1 小时
+            timeout: 单次扫描超时时间（秒），不大于 0 时不限制
+            max_backoff: 失败退避后的最长轮询间隔（秒）
         """
-        self._monitor_tasks: Dict[str, MonitorTask] = {}  # key: f"{folder_path}:{task_id}"
+        self._roots: Dict[str, PolledRoot] = {}  # key: 规范化的 folder_path
         self._is_running: bool = False
         self._lock = Lock()
-        self._polling_thread: Optional[Thread] = None
-        self._stop_event = Event()
         self._polling_interval = polling_interval
+        self._verify_interval = verify_interval
+        self._timeout = timeout
+        self._max_backoff = max_backoff
 
     def start(self) -> None:
         """启动监控服务"""
@@ -78,13 +90,9 @@ class PollingHandler(metaclass=Singleton):
                 logger.warning("PollingMonitorService is already running")
                 return
             self._is_running = True
-            self._stop_event.clear()
-        
-        logger.info("PollingMonitorService started")
-        
-        # 启动轮询线程
-        self._polling_thread = Thread(target=self._polling_loop, daemon=True)
-        self._polling_thread.start()
+
+        logger.info(f"PollingMonitorService started with interval: {self._polling_interval}s, "
+                    f"timeout: {self._timeout}s")
 
     def stop(self) -> None:
         """停止监控服务"""
@@ -93,57 +101,68 @@ class PollingHandler(metaclass=Singleton):
 
         logger.info("Stopping PollingMonitorService...")
         self._is_running = False
-        self._stop_event.set()
-
-        if self._polling_thread and self._polling_thread.is_alive():
-            self._polling_thread.join(timeout=5)
 
         with self._lock:
-            self._monitor_tasks.clear()
+            roots = list(self._roots.values())
+            self._roots.clear()
+        for root in roots:
+            root.stopped.set()
+        # 无响应的挂载点上的扫描无法中断，工作线程为守护线程，不再等待
+        for root in roots:
+            if root.worker and root.worker.is_alive():
+                root.worker.join(timeout=5)
 
         logger.info("PollingMonitorService stopped")
 
     def start_monitoring_directory(
-        self, 
-        folder_path: str, 
-        task_id: str, 
+        self,
+        folder_path: str,
+        task_id: str,
         folder_type: Literal["source", "output"],
-        callback_func: Callable
+        callback_func: Callable,
+        interval: Optional[float] = None
     ) -> None:
-        """添加目录到监控列表"""
+        """添加目录到监控列表，已被其他任务监控的目录共用扫描"""
         if not self._is_running:
             logger.warning("Cannot add directory - PollingMonitorService is not running")
             return
-            
+
         path = Path(folder_path)
         if not path.exists():
             logger.error(f"Directory not found: {folder_path}")
             return
-            
+
         if not path.is_dir():
             logger.error(f"Path is not a directory: {folder_path}")
             return
-            
-        key = self._get_task_key(folder_path, task_id)
-        
+
+        key = self._get_root_key(folder_path)
+        monitor_task = MonitorTask(
+            task_id=task_id,
+            folder_path=folder_path,
+            folder_type=folder_type,
+            callback_func=callback_func,
+            interval=interval
+        )
+
         with self._lock:
-            if key in self._monitor_tasks:
-                logger.debug(f"Task {task_id} is already monitoring {folder_path}")
+            root = self._roots.get(key)
+            if root is not None:
+                if task_id in root.tasks:
+                    logger.debug(f"Task {task_id} is already monitoring {folder_path}")
+                    return
+                root.tasks[task_id] = monitor_task
+                logger.info(f"Task {task_id} shares polling of {key} as {folder_type} folder "
+                            f"with tasks {[t for t in root.tasks if t != task_id]}")
                 return
-                
-            monitor_task = MonitorTask(
-                task_id=task_id,
-                folder_path=folder_path,
-                folder_type=folder_type,
-                callback_func=callback_func
-            )
 
-            # 不在注册时做全量扫描，留空快照，第一次轮询时建立基线
+            # 不在注册时做全量扫描，由工作线程在第一次轮询时建立基线
             # 避免文件数量大时阻塞 FastAPI 启动
-            monitor_task.file_snapshots = {}
-            monitor_task.last_scan = None
-
-            self._monitor_tasks[key] = monitor_task
+            root = PolledRoot(folder_path=key, scanner=IncrementalScanner(key, self._verify_interval))
+            root.tasks[task_id] = monitor_task
+            root.worker = Thread(target=self._polling_loop, args=(root,), name=f"polling-{key}", daemon=True)
+            self._roots[key] = root
+        root.worker.start()
 
         logger.info(
             f"Added polling monitor for {folder_path} with task {task_id} as {folder_type} folder "
@@ -151,137 +170,183 @@ class PollingHandler(metaclass=Singleton):
         )
 
     def stop_monitoring_directory(self, folder_path: str, task_id: str) -> None:
-        """停止监控指定目录"""
-        key = self._get_task_key(folder_path, task_id)
+        """停止监控指定目录，没有任务监控时停止轮询该目录"""
+        key = self._get_root_key(folder_path)
 
         with self._lock:
-            if key in self._monitor_tasks:
-                del self._monitor_tasks[key]
-                logger.info(f"Stopped monitoring {folder_path} for task {task_id}")
-
-    def _get_task_key(self, folder_path: str, task_id: str) -> str:
-        """生成监控任务的唯一键"""
-        return f"{folder_path}:{task_id}"
+            root = self._roots.get(key)
+            if root is None or root.tasks.pop(task_id, None) is None:
+                return
+            logger.info(f"Stopped monitoring {folder_path} for task {task_id}")
+            if root.tasks:
+                return
+            del self._roots[key]
+        root.stopped.set()
 
-    def _polling_loop(self) -> None:
-        """轮询循环"""
-        logger.info(f"Polling loop started with interval: {self._polling_interval}s")
+        # 不再监控的文件夹删除保存的快照，重新监控时建立新的基线
+        try:
+            with SessionFactory() as session:
+                MonitorSnapshotService(session).delete(key)
+        except Exception as e:
+            logger.error(f"Failed to delete snapshots of {key}: {e}")
 
-        while self._is_running and not self._stop_event.is_set():
+    def get_status(self) -> List[dict]:
+        """各轮询文件夹的状态"""
+        now = time.monotonic()
+        with self._lock:
+            roots = list(self._roots.values())
+        return [{
+            'folder_path': root.folder_path,
+            'tasks': sorted(root.tasks),
+            'interval': self._interval(root),
+            'failures': root.failures,
+            'last_scan': root.last_scan,
+            'last_duration': root.last_duration,
+            'next_poll_in': max(root.next_poll - now, 0),
+            'files': len(root.scanner),
+            'unstable_files': len(root.unstable_files),
+        } for root in roots]
+
+    @staticmethod
+    def _get_root_key(folder_path: str) -> str:
+        """轮询文件夹的唯一键"""
+        return os.path.normpath(folder_path)
+
+    def _interval(self, root: PolledRoot) -> float:
+        """文件夹的轮询间隔，取各任务间隔的最小值"""
+        intervals = [task.interval for task in list(root.tasks.values()) if task.interval]
+        return min(intervals) if intervals else self._polling_interval
+
+    def _backoff(self, root: PolledRoot) -> float:
+        """连续失败后按轮询间隔指数退避"""
+        interval = self._interval(root)
+        if not root.failures:
+            return interval
+        return min(interval * 2 ** min(root.failures, 16), max(self._max_backoff, interval))
+
+    def _polling_loop(self, root: PolledRoot) -> None:
+        """单个文件夹的轮询循环"""
+        logger.info(f"Polling loop started for {root.folder_path}")
+
+        while self._is_running and not root.stopped.is_set():
+            start = time.monotonic()
+            deadline = start + self._timeout if self._timeout > 0 else None
             try:
-                self._check_all_directories()
+                self._check_directory(root, deadline)
+                root.failures = 0
+            except ScanTimeout as e:
+                root.failures += 1
+                logger.warning(f"{e}, retry in {self._backoff(root):.0f}s")
             except Exception as e:
-                logger.error(f"Error in polling loop: {e}", exc_info=True)
+                root.failures += 1
+                logger.error(f"Error checking directory {root.folder_path}, retry in {self._backoff(root):.0f}s: {e}",
+                             exc_info=True)
+            root.last_duration = time.monotonic() - start
+            wait = self._backoff(root)
+            root.next_poll = time.monotonic() + wait
 
             # 等待下一次轮询
-            self._stop_event.wait(timeout=self._polling_interval)
+            root.stopped.wait(timeout=wait)
 
-        logger.info("Polling loop stopped")
+        logger.info(f"Polling loop stopped for {root.folder_path}")
 
-    def _check_all_directories(self) -> None:
-        """检查所有监控的目录"""
-        with self._lock:
-            tasks = list(self._monitor_tasks.values())
-
-        for task in tasks:
-            try:
-                self._check_directory(task)
-            except Exception as e:
-                logger.error(f"Error checking directory {task.folder_path}: {e}", exc_info=True)
-
-    def _check_directory(self, task: MonitorTask) -> None:
+    def _check_directory(self, root: PolledRoot, deadline: Optional[float] = None) -> None:
         """检查单个目录的变化"""
-        current_snapshots = self._scan_directory(task.folder_path)
+        # 第一次轮询：恢复上次保存的快照，与当前扫描比较，离线期间的变化同样触发事件
+        if root.last_scan is None:
+            self._restore_snapshots(root)
+
+        unstable_before = set(root.unstable_files)
+        diff = root.scanner.scan(refresh=root.unstable_files, deadline=deadline)
 
-        # 第一次轮询：仅建立基线快照，不触发任何事件
-        if task.last_scan is None:
-            task.file_snapshots = current_snapshots
-            task.last_scan = datetime.now()
+        # 没有保存的快照：仅建立基线快照，不触发任何事件
+        if root.last_scan is None:
+            root.last_scan = datetime.now()
+            self._save_snapshots(root, diff, unstable_before)
             logger.info(
-                f"Initial scan complete for {task.folder_path}: {len(current_snapshots)} files indexed"
+                f"Initial scan complete for {root.folder_path}: {len(diff.added)} files indexed"
             )
             return
 
-        old_snapshots = task.file_snapshots
-
-        # 检测新增和变化的文件
-        for filepath, snapshot in current_snapshots.items():
-            if filepath not in old_snapshots:
-                # 新文件 - 加入稳定性检查队列（首次发现直接进入不稳定队列）
-                if self._is_file_stable(filepath, snapshot, task.unstable_files):
-                    # 极少数情况：首次发现就已稳定（_unstable_files 被外部预热时），直接触发
-                    self._handle_file_created(task, snapshot)
-            elif filepath in task.unstable_files:
-                # 文件在不稳定列表中，继续检查是否已稳定
-                if self._is_file_stable(filepath, snapshot, task.unstable_files):
-                    self._handle_file_created(task, snapshot)
-        
+        removed = set(diff.removed)
+        # 不稳定列表中的文件，继续检查是否已稳定
+        for filepath in unstable_before:
+            if filepath in removed:
+                continue
+            snapshot = root.scanner.lookup(filepath)
+            if snapshot is None:
+                root.unstable_files.pop(filepath, None)
+            elif self._is_file_stable(filepath, snapshot, root.unstable_files):
+                self._handle_file_created(root, filepath)
+
+        # 新文件 - 加入稳定性检查队列（首次发现直接进入不稳定队列）
+        for filepath, size, mtime in diff.added:
+            if self._is_file_stable(filepath, (size, mtime), root.unstable_files):
+                self._handle_file_created(root, filepath)
+
         # 检测删除的文件
-        for filepath in old_snapshots:
-            if filepath not in current_snapshots:
-                self._handle_file_deleted(task, old_snapshots[filepath])
-                task.unstable_files.pop(filepath, None)
-        
+        for filepath in diff.removed:
+            self._handle_file_deleted(root, filepath)
+            root.unstable_files.pop(filepath, None)
+
         # 更新快照
-        task.file_snapshots = current_snapshots
-        task.last_scan = datetime.now()
+        self._save_snapshots(root, diff, unstable_before)
+        root.last_scan = datetime.now()
 
-    def _scan_directory(self, folder_path: str) -> Dict[str, FileSnapshot]:
-        """扫描目录并生成文件快照（仅扫描视频文件）"""
-        snapshots = {}
-        
+    def _restore_snapshots(self, root: PolledRoot) -> None:
+        """恢复保存的快照和目录状态，修改时间未变化的目录不再列出"""
         try:
-            path = Path(folder_path)
-            if not path.exists():
-                logger.warning(f"Directory not found during scan: {folder_path}")
-                return snapshots
-            
-            # 递归扫描所有文件
-            for item in path.rglob('*'):
-                try:
-                    # 跳过目录，只处理文件
-                    if item.is_dir():
-                        continue
-                    
-                    # 只扫描视频文件
-                    if not is_video_file(str(item)):
-                        continue
-                    
-                    stat = item.stat()
-                    snapshot = FileSnapshot(
-                        path=str(item),
-                        size=stat.st_size,
-                        mtime=stat.st_mtime,
-                        is_directory=False  # 已经确定是文件
-                    )
-                    snapshots[str(item)] = snapshot
-                except (OSError, PermissionError) as e:
-                    logger.debug(f"Cannot access {item}: {e}")
-                    continue
-                    
+            with SessionFactory() as session:
+                files, dirs = MonitorSnapshotService(session).load(root.folder_path)
         except Exception as e:
-            logger.error(f"Error scanning directory {folder_path}: {e}")
-            
-        return snapshots
+            logger.error(f"Failed to load snapshots of {root.folder_path}: {e}")
+            return
+        if not dirs:
+            return
+        root.scanner.restore(dirs, files)
+        root.last_scan = datetime.now()
+        logger.info(f"Restored snapshots for {root.folder_path}: {len(files)} files, {len(dirs)} dirs")
 
-    def _is_file_stable(
-        self,
-        filepath: str,
-        snapshot: FileSnapshot,
-        unstable_files: Dict[str, FileSnapshot],
-    ) -> bool:
+    def _save_snapshots(self, root: PolledRoot, diff: ScanDiff, unstable_before: set) -> None:
+        """写入本次轮询的快照变化
+        未稳定的文件不写入，所在目录标记为需要重新列出，重启后重新检查稳定性
+        """
+        unstable = root.unstable_files
+        files = {filepath: (filepath, size, mtime) for filepath, size, mtime in diff.added + diff.changed
+                 if filepath not in unstable}
+        # 本次轮询中稳定的文件
+        for filepath in unstable_before:
+            if filepath not in unstable and filepath not in files:
+                snapshot = root.scanner.lookup(filepath)
+                if snapshot is not None:
+                    files[filepath] = (filepath, *snapshot)
+
+        unstable_dirs = {os.path.dirname(filepath) for filepath in unstable}
+        dirty = set(root.scanner.listed_dirs) | unstable_dirs | {os.path.dirname(filepath) for filepath in unstable_before}
+        dirs = {}
+        for path in dirty:
+            state = root.scanner.dir_state(path)
+            if state is not None:
+                dirs[path] = (0, state[1]) if path in unstable_dirs else state
+        # 已停止监控的文件夹不再写入，避免覆盖删除快照
+        if root.stopped.is_set() or not (files or diff.removed or dirs or root.scanner.removed_dirs):
+            return
+        try:
+            with SessionFactory() as session:
+                MonitorSnapshotService(session).save(root.folder_path, files.values(), diff.removed,
+                                                     dirs, root.scanner.removed_dirs)
+        except Exception as e:
+            logger.error(f"Failed to save snapshots of {root.folder_path}: {e}")
+
+    def _is_file_stable(self, filepath: str, snapshot: Snapshot, unstable_files: Dict[str, Snapshot]) -> bool:
         """
         检查文件是否稳定（已完成写入）
 
         通过比较连续多次扫描，如果文件大小和修改时间保持不变，则认为稳定。
-        unstable_files 由调用方（MonitorTask）持有，各 Task 互不干扰。
+        unstable_files 由调用方（PolledRoot）持有，各文件夹互不干扰。
         """
-        if snapshot.is_directory:
-            return True  # 目录总是稳定的
-
         if filepath in unstable_files:
-            old_snapshot = unstable_files[filepath]
-            if old_snapshot.get_hash() == snapshot.get_hash():
+            if unstable_files[filepath] == snapshot:
                 # 文件在两次扫描间保持不变，认为稳定
                 del unstable_files[filepath]
                 return True
@@ -294,32 +359,33 @@ class PollingHandler(metaclass=Singleton):
             unstable_files[filepath] = snapshot
             return False
 
-    def _handle_file_created(self, task: MonitorTask, snapshot: FileSnapshot) -> None:
+    def _handle_file_created(self, root: PolledRoot, filepath: str) -> None:
         """处理文件创建事件"""
         # 创建事件对象
         event = PollingFileEvent(
             event_type="created",
-            src_path=snapshot.path,
-            is_directory=snapshot.is_directory
+            src_path=filepath,
+            is_directory=False
         )
-        
-        # 调用回调函数
-        try:
-            task.callback_func(event, task.task_id, snapshot.path, task.folder_type)
-        except Exception as e:
-            logger.error(f"Callback function failed: {e}", exc_info=True)
+        self._dispatch(root, event)
 
-    def _handle_file_deleted(self, task: MonitorTask, snapshot: FileSnapshot) -> None:
+    def _handle_file_deleted(self, root: PolledRoot, filepath: str) -> None:
         """处理文件删除事件"""
         # 创建事件对象
         event = PollingFileEvent(
             event_type="deleted",
-            src_path=snapshot.path,
-            is_directory=snapshot.is_directory
+            src_path=filepath,
+            is_directory=False
         )
-        
-        # 调用回调函数
-        try:
-            task.callback_func(event, task.task_id, snapshot.path, task.folder_type)
-        except Exception as e:
-            logger.error(f"Callback function failed: {e}", exc_info=True)
+        self._dispatch(root, event)
+
+    def _dispatch(self, root: PolledRoot, event: PollingFileEvent) -> None:
+        """将事件分发给监控该文件夹的每个任务"""
+        with self._lock:
+            tasks = list(root.tasks.values())
+        for task in tasks:
+            # 调用回调函数
+            try:
+                task.callback_func(event, task.task_id, event.src_path, task.folder_type)
+            except Exception as e:
+                logger.error(f"Callback function failed: {e}", exc_info=True)
@@ -0,0 +1,282 @@
+import os
+import sys
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bonita.utils.filehelper import is_video_file
+
+logger = logging.getLogger(__name__)
+
+# 文件系统时间戳精度（纳秒），FAT/SMB 上可能为 2 秒；目录修改时间距列出时间小于该值时，
+# 同一时间戳内可能还有未列出的变化，下次扫描重新列出
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+# 文件快照 (大小, 修改时间)
+Snapshot = Tuple[int, float]
+
+
+class DirState:
+    """已列出的目录
+    文件名有序保存并驻留，大小和修改时间分别保存在紧凑数组中，不再为每个文件创建对象
+    """
+    __slots__ = ('mtime_ns', 'listed_ns', 'names', 'sizes', 'mtimes', 'subdirs')
+
+    def __init__(self, mtime_ns: int, listed_ns: int):
+        self.mtime_ns = mtime_ns
+        # 列出前的时间，用于判断修改时间是否可信
+        self.listed_ns = listed_ns
+        # 视频文件名，有序
+        self.names: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        # 子目录路径，不包含指向目录的符号链接
+        self.subdirs: List[str] = []
+
+    def unchanged(self, st: os.stat_result) -> bool:
+        return st.st_mtime_ns == self.mtime_ns and self.mtime_ns + MTIME_GRANULARITY_NS < self.listed_ns
+
+    def find(self, name: str) -> int:
+        """文件名的位置，不存在时返回 -1"""
+        i = bisect_left(self.names, name)
+        return i if i < len(self.names) and self.names[i] == name else -1
+
+    def fill(self, files: Iterable[Tuple[str, int, float]]) -> None:
+        """按文件名排序后写入 (文件名, 大小, 修改时间)"""
+        for name, size, mtime in sorted(files):
+            self.names.append(sys.intern(name))
+            self.sizes.append(size)
+            self.mtimes.append(mtime)
+
+    def remove(self, i: int) -> None:
+        del self.names[i]
+        del self.sizes[i]
+        del self.mtimes[i]
+
+
+class ScanTimeout(TimeoutError):
+    """扫描超过截止时间，本次扫描结果全部丢弃，快照保持不变"""
+
+
+@dataclass
+class ScanDiff:
+    """与上一次扫描相比的文件变化"""
+    # (路径, 大小, 修改时间)
+    added: List[Tuple[str, int, float]] = field(default_factory=list)
+    changed: List[Tuple[str, int, float]] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ScanStats:
+    """单次扫描统计"""
+    dirs: int = 0
+    files: int = 0
+    listed: int = 0
+    refreshed: int = 0
+    full: bool = False
+
+
+class IncrementalScanner:
+    """
+    增量目录扫描，适用于 SMB/CIFS 等元数据操作较慢的文件夹
+
+    保存每个目录的修改时间和其下文件的快照，修改时间未变化的目录不再列出，沿用已有快照，
+    每次扫描只需对目录 stat，变化只在重新列出的目录内比较；目录修改时间只反映条目增删，
+    写入中的文件由调用方通过 refresh 重新 stat。
+    部分网络文件系统不能可靠地更新目录修改时间，每隔 verify_interval 秒重新列出全部目录
+    """
+
+    def __init__(self, root: str, verify_interval: int = 3600):
+        """
+        Args:
+            root: 扫描的根目录
+            verify_interval: 全量校验间隔（秒），不大于 0 时每次都列出全部目录
+        """
+        self.root = root
+        self._verify_interval = verify_interval
+        self._dirs: Dict[str, DirState] = {}
+        self._last_verify: Optional[float] = None
+        self.last_stats = ScanStats()
+        # 最近一次扫描中重新列出和已不存在的目录
+        self.listed_dirs: List[str] = []
+        self.removed_dirs: List[str] = []
+
+    def restore(self, dirs: Dict[str, Tuple[int, int]], files: Iterable[Tuple[str, int, float]]) -> None:
+        """恢复保存的目录状态和文件快照，下次扫描只列出修改时间变化的目录
+
+        Args:
+            dirs: 目录路径 -> (修改时间, 列出时间)，修改时间为 0 的目录重新列出
+            files: (文件路径, 大小, 修改时间)
+        """
+        states = {sys.intern(path): DirState(mtime_ns, listed_ns) for path, (mtime_ns, listed_ns) in dirs.items()}
+        for path in states:
+            parent = states.get(os.path.dirname(path))
+            if parent is not None and path != self.root:
+                parent.subdirs.append(path)
+        grouped: Dict[str, list] = {}
+        for path, size, mtime in files:
+            parent, name = os.path.split(path)
+            if parent in states:
+                grouped.setdefault(parent, []).append((name, size, mtime))
+        for parent, entries in grouped.items():
+            states[parent].fill(entries)
+        self._dirs = states
+        # 恢复的状态视为已校验，全量校验按间隔进行
+        self._last_verify = time.monotonic() if states else None
+
+    def dir_state(self, path: str) -> Optional[Tuple[int, int]]:
+        """目录的 (修改时间, 列出时间)"""
+        state = self._dirs.get(path)
+        return (state.mtime_ns, state.listed_ns) if state is not None else None
+
+    def lookup(self, path: str) -> Optional[Snapshot]:
+        """文件在最近一次扫描中的 (大小, 修改时间)"""
+        parent, name = os.path.split(path)
+        state = self._dirs.get(parent)
+        if state is None:
+            return None
+        i = state.find(name)
+        return (state.sizes[i], state.mtimes[i]) if i >= 0 else None
+
+    def files(self) -> Iterator[Tuple[str, int, float]]:
+        """最近一次扫描的全部文件 (路径, 大小, 修改时间)"""
+        for path, state in self._dirs.items():
+            for name, size, mtime in zip(state.names, state.sizes, state.mtimes):
+                yield os.path.join(path, name), size, mtime
+
+    def __len__(self) -> int:
+        return sum(len(state.names) for state in self._dirs.values())
+
+    def scan(self, refresh: Iterable[str] = (), deadline: Optional[float] = None) -> ScanDiff:
+        """扫描根目录下的视频文件
+
+        Args:
+            refresh: 需要重新 stat 的文件，如仍在写入的文件
+            deadline: 截止时间（time.monotonic），每个目录前检查，超过时抛出 ScanTimeout
+
+        Returns:
+            ScanDiff: 与上一次扫描相比的变化，第一次扫描时全部文件为新增
+        """
+        stats = ScanStats()
+        diff = ScanDiff()
+        if not os.path.isdir(self.root):
+            logger.warning(f"Directory not found during scan: {self.root}")
+            self.listed_dirs = []
+            for path, state in self._dirs.items():
+                diff.removed.extend(os.path.join(path, name) for name in state.names)
+            self.removed_dirs = list(self._dirs)
+            self._dirs = {}
+            self.last_stats = stats
+            return diff
+
+        now = time.monotonic()
+        stats.full = (self._verify_interval <= 0 or self._last_verify is None
+                      or now - self._last_verify >= self._verify_interval)
+        dirs: Dict[str, DirState] = {}
+        listed_dirs: List[str] = []
+        stack = [self.root]
+        while stack:
+            if deadline is not None and time.monotonic() > deadline:
+                raise ScanTimeout(f"Scan of {self.root} timed out after {len(dirs)} dirs")
+            path = stack.pop()
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                logger.debug(f"Cannot access {path}: {e}")
+                continue
+            old = self._dirs.get(path)
+            if not stats.full and old is not None and old.unchanged(st):
+                state = old
+            else:
+                state = self._list(path, st)
+                listed_dirs.append(path)
+                self._diff_dir(path, old, state, diff)
+            dirs[path] = state
+            stack.extend(state.subdirs)
+
+        self.listed_dirs = listed_dirs
+        self.removed_dirs = [path for path in self._dirs if path not in dirs]
+        for path in self.removed_dirs:
+            diff.removed.extend(os.path.join(path, name) for name in self._dirs[path].names)
+
+        # 未重新列出的目录中的文件沿用旧快照，写入中的文件需重新 stat
+        listed = set(listed_dirs)
+        for filepath in refresh:
+            parent, name = os.path.split(filepath)
+            state = dirs.get(parent)
+            if state is None or parent in listed:
+                continue
+            i = state.find(name)
+            if i < 0:
+                continue
+            stats.refreshed += 1
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                state.remove(i)
+                diff.removed.append(filepath)
+                continue
+            if st.st_size != state.sizes[i] or st.st_mtime != state.mtimes[i]:
+                state.sizes[i] = st.st_size
+                state.mtimes[i] = st.st_mtime
+                diff.changed.append((filepath, st.st_size, st.st_mtime))
+
+        self._dirs = dirs
+        if stats.full:
+            self._last_verify = now
+        stats.dirs = len(dirs)
+        stats.files = len(self)
+        stats.listed = len(self.listed_dirs)
+        self.last_stats = stats
+        logger.debug(f"Scanned {self.root}: {stats.files} files, {stats.dirs} dirs, {stats.listed} listed, "
+                     f"{stats.refreshed} refreshed, full={stats.full}, +{len(diff.added)} -{len(diff.removed)}")
+        return diff
+
+    @staticmethod
+    def _diff_dir(path: str, old: Optional[DirState], new: DirState, diff: ScanDiff) -> None:
+        """按有序文件名比较重新列出的目录"""
+        if old is None:
+            diff.added.extend((os.path.join(path, name), size, mtime)
+                              for name, size, mtime in zip(new.names, new.sizes, new.mtimes))
+            return
+        i = j = 0
+        while i < len(old.names) or j < len(new.names):
+            if j >= len(new.names) or (i < len(old.names) and old.names[i] < new.names[j]):
+                diff.removed.append(os.path.join(path, old.names[i]))
+                i += 1
+            elif i >= len(old.names) or new.names[j] < old.names[i]:
+                diff.added.append((os.path.join(path, new.names[j]), new.sizes[j], new.mtimes[j]))
+                j += 1
+            else:
+                if old.sizes[i] != new.sizes[j] or old.mtimes[i] != new.mtimes[j]:
+                    diff.changed.append((os.path.join(path, new.names[j]), new.sizes[j], new.mtimes[j]))
+                i += 1
+                j += 1
+
+    def _list(self, path: str, st: os.stat_result) -> DirState:
+        """列出目录，记录视频文件快照和子目录"""
+        state = DirState(st.st_mtime_ns, time.time_ns())
+        files = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            # 与 rglob 一致，不进入指向目录的符号链接
+                            if not entry.is_symlink():
+                                state.subdirs.append(sys.intern(entry.path))
+                            continue
+                        if not is_video_file(entry.name):
+                            continue
+                        est = entry.stat()
+                        files.append((entry.name, est.st_size, est.st_mtime))
+                    except OSError as e:
+                        logger.debug(f"Cannot access {entry.path}: {e}")
+        except OSError as e:
+            logger.debug(f"Cannot list {path}: {e}")
+        state.fill(files)
+        return state
@@ -0,0 +1,229 @@
+import os
+import logging
+from dataclasses import dataclass, replace
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer, ObserverType
+from watchdog.observers.api import ObservedWatch
+
+logger = logging.getLogger(__name__)
+
+# inotify 每个用户的 watch 上限
+MAX_USER_WATCHES_PATH = '/proc/sys/fs/inotify/max_user_watches'
+
+
+def _is_within(path: str, root: str) -> bool:
+    """path 是否为 root 本身或位于 root 之下"""
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _count_dirs(path: str) -> int:
+    """目录数，inotify 递归监听时每个目录占用一个 watch"""
+    return sum(1 for _ in os.walk(path))
+
+
+@dataclass
+class Subscription:
+    """任务对文件夹的监听"""
+    task_id: str
+    # 任务配置的文件夹
+    folder_path: str
+    # 解析符号链接后的路径
+    real_path: str
+    handler: FileSystemEventHandler
+    # 覆盖该文件夹的监听路径，未能监听时为空
+    watch_path: Optional[str] = None
+
+
+@dataclass
+class WatchedPath:
+    """实际注册到 observer 的路径"""
+    path: str
+    watch: ObservedWatch
+    # 递归监听的目录数，按目录创建和删除事件更新，为近似值
+    dirs: int
+
+
+class _FanoutHandler(FileSystemEventHandler):
+    """监听路径的事件处理，交给 SharedObserver 分发"""
+
+    def __init__(self, observer: 'SharedObserver', path: str):
+        super().__init__()
+        self._observer = observer
+        self._path = path
+
+    def dispatch(self, event: FileSystemEvent) -> None:
+        self._observer._fan_out(self._path, event)
+
+
+class SharedObserver:
+    """
+    全部任务共用一个 watchdog observer
+
+    每个实际路径只注册一次递归监听：多个任务监听同一文件夹，或一个文件夹位于另一个被监听的文件夹之下时，
+    共用上层文件夹的监听，事件按路径分发给订阅的任务。符号链接解析后比较，事件路径转换回任务配置的路径
+    """
+
+    def __init__(self):
+        self._observer: Optional[ObserverType] = None
+        self._lock = RLock()
+        # (folder_path, task_id) -> 订阅
+        self._subscriptions: Dict[Tuple[str, str], Subscription] = {}
+        # 实际路径 -> 监听
+        self._watches: Dict[str, WatchedPath] = {}
+
+    def start(self) -> None:
+        with self._lock:
+            if self._observer is not None:
+                return
+            self._observer = Observer()
+            self._observer.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            observer = self._observer
+            self._observer = None
+            self._subscriptions.clear()
+            self._watches.clear()
+        if observer is not None:
+            observer.stop()
+            observer.join()
+
+    def subscribe(self, folder_path: str, task_id: str, handler: FileSystemEventHandler) -> bool:
+        """订阅文件夹的事件
+
+        Returns:
+            bool: 是否新增订阅，已订阅时返回 False
+        """
+        key = (folder_path, task_id)
+        with self._lock:
+            if self._observer is None:
+                logger.warning("Cannot subscribe - shared observer is not running")
+                return False
+            if key in self._subscriptions:
+                logger.debug(f"Task {task_id} is already monitoring {folder_path}")
+                return False
+            self._subscriptions[key] = Subscription(task_id=task_id, folder_path=os.path.normpath(folder_path),
+                                                    real_path=os.path.realpath(folder_path), handler=handler)
+            self._rebalance()
+            return True
+
+    def unsubscribe(self, folder_path: str, task_id: str) -> bool:
+        """取消订阅，没有任务需要的监听随之注销"""
+        with self._lock:
+            if self._subscriptions.pop((folder_path, task_id), None) is None:
+                return False
+            self._rebalance()
+            return True
+
+    def watch_counts(self) -> Dict[str, int]:
+        """各监听路径占用的 inotify watch 数"""
+        with self._lock:
+            return {path: watched.dirs for path, watched in self._watches.items()}
+
+    def get_status(self) -> dict:
+        """监听状态，用于确定 fs.inotify.max_user_watches"""
+        with self._lock:
+            watches = [{
+                'path': path,
+                'watches': watched.dirs,
+                'subscriptions': [{'task_id': sub.task_id, 'folder_path': sub.folder_path}
+                                  for sub in self._subscriptions.values() if sub.watch_path == path],
+            } for path, watched in self._watches.items()]
+            unwatched = [{'task_id': sub.task_id, 'folder_path': sub.folder_path}
+                         for sub in self._subscriptions.values() if sub.watch_path is None]
+        return {
+            'watches': watches,
+            'unwatched': unwatched,
+            'total_watches': sum(watch['watches'] for watch in watches),
+            'max_user_watches': self.max_user_watches(),
+        }
+
+    @staticmethod
+    def max_user_watches() -> Optional[int]:
+        """系统的 inotify watch 上限，非 Linux 时为空"""
+        try:
+            with open(MAX_USER_WATCHES_PATH) as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def _rebalance(self) -> None:
+        """按当前订阅调整监听：只监听不在其他订阅路径之下的路径，需持有锁
+        先注册新的上层路径再注销被覆盖的路径，切换期间不丢失事件，按订阅所属的监听分发也不会重复
+        上层路径注册失败时不计入，其下的订阅路径各自注册监听
+        """
+        desired: List[str] = []
+        for path in sorted({sub.real_path for sub in self._subscriptions.values()}):
+            if any(_is_within(path, root) for root in desired):
+                continue
+            if path not in self._watches:
+                self._schedule(path)
+            if path in self._watches:
+                desired.append(path)
+
+        for sub in self._subscriptions.values():
+            sub.watch_path = next((root for root in desired if _is_within(sub.real_path, root)), None)
+
+        for path in [path for path in self._watches if path not in desired]:
+            watched = self._watches.pop(path)
+            try:
+                self._observer.unschedule(watched.watch)
+            except Exception as e:
+                logger.error(f"Failed to unschedule watch for {path}: {e}")
+            logger.info(f"Removed watch for {path} ({watched.dirs} dirs)")
+
+    def _schedule(self, path: str) -> None:
+        """注册递归监听，失败时（路径不存在、达到 max_user_watches 等）记录错误，下次调整时重试"""
+        try:
+            watch = self._observer.schedule(_FanoutHandler(self, path), path, recursive=True)
+        except OSError as e:
+            logger.error(f"Failed to watch {path}: {e}")
+            return
+        watched = WatchedPath(path=path, watch=watch, dirs=_count_dirs(path))
+        self._watches[path] = watched
+        total = sum(w.dirs for w in self._watches.values())
+        limit = self.max_user_watches()
+        logger.info(f"Added watch for {path} ({watched.dirs} dirs, {total} total)")
+        if limit and total > limit * 0.9:
+            logger.warning(f"inotify watches ({total}) are close to fs.inotify.max_user_watches ({limit})")
+
+    def _fan_out(self, watch_path: str, event: FileSystemEvent) -> None:
+        """将监听路径的事件分发给其下的订阅，在 observer 线程中执行
+        observer 分发事件时持有其内部锁，而注册和注销监听时在持有 self._lock 的情况下获取该锁，
+        这里不能获取 self._lock，只读取字典的副本
+        """
+        watched = self._watches.get(watch_path)
+        if watched is None:
+            return
+        if event.is_directory:
+            # 只在 observer 线程中更新
+            if event.event_type == 'created':
+                watched.dirs += 1
+            elif event.event_type == 'deleted':
+                watched.dirs = max(watched.dirs - 1, 0)
+        subscriptions = [sub for sub in list(self._subscriptions.values()) if sub.watch_path == watch_path]
+
+        # 移动事件按目标路径判断，与 FileEventHandler 一致
+        path = os.fsdecode(event.dest_path if event.event_type == 'moved' else event.src_path)
+        for sub in subscriptions:
+            if not _is_within(path, sub.real_path):
+                continue
+            try:
+                sub.handler.dispatch(self._translate(event, sub))
+            except Exception as e:
+                logger.error(f"Event handler failed for task {sub.task_id}: {e}", exc_info=True)
+
+    @staticmethod
+    def _translate(event: FileSystemEvent, sub: Subscription) -> FileSystemEvent:
+        """将事件路径转换为任务配置的文件夹下的路径"""
+        if sub.folder_path == sub.real_path:
+            return event
+
+        def convert(path):
+            path = os.fsdecode(path)
+            if path and _is_within(path, sub.real_path):
+                return sub.folder_path + path[len(sub.real_path):]
+            return path
+        return replace(event, src_path=convert(event.src_path), dest_path=convert(event.dest_path))
@@ -3,32 +3,17 @@
 '''
 import os
 import logging
+from contextlib import nullcontext
 
+from bonita.utils.dircache import DirListingCache
 from bonita.utils.fileinfo import BasicFileInfo, TargetFileInfo
 from bonita.utils.regex import matchSeason, simpleMatchEp
 from bonita.utils.filehelper import OperationMethod, linkFile, video_type, subext_type, replaceRegex, replaceCJK, cleanFilebyNameSuffix, moveSubs
 
 logger = logging.getLogger(__name__)
 
-
-def _handle_group_naming(original_file: BasicFileInfo, target_file: TargetFileInfo, file_list: list):
-    """处理特殊组的视频文件命名
-    :param original_file: 当前处理的文件信息
-    :param target_file: 输出文件信息
-    :param file_list: 所有待处理的文件列表
-    """
-    # CMCT组视频文件命名通常比文件夹命名更规范
-    if 'CMCT' not in original_file.top_folder:
-        return
-    epfiles = [x for x in file_list if x.is_episode]
-    if epfiles:
-        # 如果有剧集标记则返回
-        return
-    namingfiles = [x for x in file_list if 'CMCT' in x.basename]
-    if len(namingfiles) == 1:
-        # 非剧集情况下使用文件名作为文件夹名
-        target_file.top_folder = namingfiles[0].basename
-        logger.debug(f"[-] handling cmct midfolder [{target_file.top_folder}]")
+# 可能为特典的二级目录标记
+SPECIAL_TAGS = ['花絮', '特典', '特辑', '特典', 'extra', 'special', '[sp]']
 
 
 def _simplify_folder_name(original: str):
@@ -51,48 +36,101 @@ def _simplify_folder_name(original: str):
     return original
 
 
-def _fix_series_naming(original_file: BasicFileInfo, target_file: TargetFileInfo):
-    """ 修正剧集命名
-    处理季数和集数的命名规范化
+def _infer_series(original_file: BasicFileInfo, season: int, episode: int, folder_season: int):
+    """ 推断单个文件的季数、集数和文件名
+    季数最重要，季数涉及到中间的文件夹，集数可以使用自身的名称
     :param original_file: 原始文件信息
-    :param target_file: 目标文件信息
+    :param season: 季数，未知为 -1
+    :param episode: 集数，未知为 -1
+    :param folder_season: 按二级目录推断的默认季数，无法推断为 -1
+    :return: (季数, 集数, 文件名)
     """
-    logger.debug("[-] fix series name")
-    tmp_season = target_file.season_number if target_file.forced_season else original_file.season_number
-    tmp_episode = target_file.episode_number if target_file.forced_episode else original_file.episode_number
-    tmp_secondfolder = original_file.second_folder
-    tmp_filename = original_file.basename
-    tmp_original_marker = original_file.original_episode_marker
-    tmp_episode_special = original_file.episode_special
+    filename = original_file.basename
+    original_marker = original_file.original_episode_marker
+    episode_special = original_file.episode_special
     # 如果已有有效的季数和集数记录，直接使用
-    if tmp_season > -1 and tmp_episode > -1:
-        marker = f"S{tmp_season:02d}E{tmp_episode:02d}"
-        if marker not in tmp_filename:
-            if tmp_episode_special:
-                tmp_filename = marker + "(" + tmp_episode_special + ")"
+    if season > -1 and episode > -1:
+        marker = f"S{season:02d}E{episode:02d}"
+        if marker not in filename:
+            if episode_special:
+                filename = marker + "(" + episode_special + ")"
             else:
-                tmp_filename = marker
+                filename = marker
     # 没有完整的季数和集数
-    # 季数最重要，季数涉及到中间的文件夹，集数可以使用自身的名称
-    elif tmp_season > -1 and tmp_episode == -1:
-        tmp_filename, tmp_episode = fix_episode_name(tmp_filename, tmp_season, tmp_episode, tmp_original_marker, tmp_episode_special)
-    else:
-        # 父级未发现season标记，二级目录为空则可能为单季，默认第一季
-        if tmp_secondfolder == '':
-            tmp_season = 1
-            tmp_filename, tmp_episode = fix_episode_name(tmp_filename, tmp_season, tmp_episode, tmp_original_marker, tmp_episode_special)
-        else:
-            # 存在一些特殊标记，可能为特典
-            special_tags = ['花絮', '特典', '特辑', '特典', 'extra', 'special', '[sp]']
-            if any(x in tmp_secondfolder for x in special_tags):
-                tmp_season = 0
-                tmp_filename, tmp_episode = fix_episode_name(
-                    tmp_filename, tmp_season, tmp_episode, tmp_original_marker, tmp_episode_special)
+    elif season > -1 and episode == -1:
+        filename, episode = fix_episode_name(filename, season, episode, original_marker, episode_special)
+    elif folder_season > -1:
+        # 父级未发现season标记，使用二级目录推断的季数
+        season = folder_season
+        filename, episode = fix_episode_name(filename, season, episode, original_marker, episode_special)
+    return season, episode, filename
+
+
+class GroupNaming():
+    """ 文件组命名推断
+    文件组级别的信息(特殊组命名、简化后的文件夹名、二级目录的默认季数)只计算一次，
+    每个文件按文件夹查表，不再逐个扫描文件组；电影任务不访问剧集信息，不触发剧集解析
+    文件名中的季数和集数标记各不相同，仍按文件解析，同一文件夹的季数标记由 BasicFileInfo 缓存
+    """
+
+    def __init__(self, file_list: list):
+        self.file_list = file_list
+        self._group_name = None
+        self._top_folders = {}
+        self._folder_seasons = {}
+
+    def group_name(self) -> str:
+        """ CMCT组视频文件命名通常比文件夹命名更规范
+        文件组内没有剧集且只有一个CMCT命名的文件时，返回该文件名，否则返回空
+        """
+        if self._group_name is None:
+            self._group_name = ''
+            if not any(x.is_episode for x in self.file_list):
+                namingfiles = [x.basename for x in self.file_list if 'CMCT' in x.basename]
+                if len(namingfiles) == 1:
+                    self._group_name = namingfiles[0]
+        return self._group_name
 
-    target_file.season_number = tmp_season
-    target_file.episode_number = tmp_episode
-    target_file.second_folder = "Specials" if tmp_season == 0 else f"Season {tmp_season}"
-    target_file.basename = tmp_filename
+    def top_folder(self, original_file: BasicFileInfo, target_file: TargetFileInfo):
+        """ 处理特殊组命名并简化顶层文件夹名 """
+        if 'CMCT' in original_file.top_folder and self.group_name():
+            # 非剧集情况下使用文件名作为文件夹名
+            target_file.top_folder = self.group_name()
+            logger.debug(f"[-] handling cmct midfolder [{target_file.top_folder}]")
+        folder = self._top_folders.get(original_file.top_folder)
+        if folder is None:
+            folder = self._top_folders[original_file.top_folder] = _simplify_folder_name(original_file.top_folder)
+        target_file.top_folder = folder
+
+    def folder_season(self, second_folder: str) -> int:
+        """ 文件名和父级都没有季数标记时，按二级目录推断的默认季数
+        二级目录为空则可能为单季，默认第一季；存在特典标记时为第 0 季；否则为 -1
+        """
+        season = self._folder_seasons.get(second_folder)
+        if season is None:
+            if second_folder == '':
+                season = 1
+            elif any(x in second_folder for x in SPECIAL_TAGS):
+                season = 0
+            else:
+                season = -1
+            self._folder_seasons[second_folder] = season
+        return season
+
+    def series(self, original_file: BasicFileInfo, target_file: TargetFileInfo):
+        """ 修正剧集命名
+        处理季数和集数的命名规范化，record 中强制指定的季数和集数优先
+        """
+        logger.debug("[-] fix series name")
+        season = target_file.season_number if target_file.forced_season else original_file.season_number
+        episode = target_file.episode_number if target_file.forced_episode else original_file.episode_number
+        season, episode, filename = _infer_series(original_file, season, episode,
+                                                  self.folder_season(original_file.second_folder))
+
+        target_file.season_number = season
+        target_file.episode_number = episode
+        target_file.second_folder = "Specials" if season == 0 else f"Season {season}"
+        target_file.basename = filename
 
 
 def fix_episode_name(name: str, season: int, episode: int, original_marker: str, episode_special: str):
@@ -140,13 +178,16 @@ def fix_episode_name(name: str, season: int, episode: int, original_marker: str,
         return newname, episode
 
 
-def transferfile(original_file: BasicFileInfo,
-                 target_file: TargetFileInfo,
-                 optimize_name_tag: bool, series_tag: bool,
-                 file_list: list, linktype: OperationMethod):
+def plan_transferfile(original_file: BasicFileInfo,
+                      target_file: TargetFileInfo,
+                      optimize_name_tag: bool, series_tag: bool,
+                      file_list: list = None, naming: GroupNaming = None):
     """
-    转移文件
+    计算转移目标路径，不操作文件
+    :param naming: 文件组命名推断，同一文件组的多个文件应共用，未指定时按 file_list 创建
     """
+    if naming is None:
+        naming = GroupNaming(file_list if file_list is not None else [original_file])
     target_file.second_folder = original_file.second_folder
     target_file.basename = original_file.basename
     target_file.file_extension = original_file.file_extension
@@ -154,30 +195,62 @@ def transferfile(original_file: BasicFileInfo,
     if not target_file.forced_top_folder:
         target_file.top_folder = original_file.top_folder
         if optimize_name_tag:
-            _handle_group_naming(original_file, target_file, file_list)
-            target_file.top_folder = _simplify_folder_name(original_file.top_folder)
+            naming.top_folder(original_file, target_file)
 
     # 当前设置类型是剧集
     if series_tag and (target_file.is_episode or original_file.is_episode):
-        _fix_series_naming(original_file, target_file)
+        naming.series(original_file, target_file)
 
     target_file.filename = target_file.basename + target_file.file_extension
+    target_file.full_path = os.path.join(target_file.root_folder, target_file.top_folder,
+                                         target_file.second_folder, target_file.filename)
+    return target_file
 
-    folder_path = os.path.join(target_file.root_folder, target_file.top_folder, target_file.second_folder)
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
-    cleanFilebyNameSuffix(folder_path, target_file.basename, subext_type)
-    target_file.full_path = transSingleFile(original_file, folder_path, target_file.basename, linktype)
+def execute_transferfile(original_file: BasicFileInfo, target_file: TargetFileInfo,
+                         linktype: OperationMethod, lock=None, listing: DirListingCache = None, progress=None,
+                         linked: bool = False):
+    """
+    按已计算的目标执行转移
+    :param lock: 目标文件夹锁，并发转移时保护字幕清理和复制
+    :param listing: 目录列表缓存，同一文件夹内的多个文件只列出一次
+    :param progress: 复制进度回调
+    :param linked: 转移记录显示目标是源文件的链接，目标仍存在时跳过链接
+    """
+    folder_path = os.path.dirname(target_file.full_path)
+    os.makedirs(folder_path, exist_ok=True)
+
+    with lock or nullcontext():
+        cleanFilebyNameSuffix(folder_path, target_file.basename, subext_type, listing)
+    target_file.full_path = transSingleFile(original_file, folder_path, target_file.basename, linktype, lock, listing,
+                                            progress, linked)
 
     return target_file
 
 
-def transSingleFile(original_file: BasicFileInfo, output_folder, target_filename, linktype: OperationMethod):
+def transSingleFile(original_file: BasicFileInfo, output_folder, target_filename, linktype: OperationMethod, lock=None,
+                    listing: DirListingCache = None, progress=None, linked: bool = False):
     """ 转移单个文件
+    :param lock: 目标文件夹锁，并发转移时保护字幕复制
+    :param listing: 目录列表缓存
+    :param progress: 复制进度回调
+    :param linked: 转移记录显示目标是源文件的链接，目标仍存在时跳过链接
     """
     dest_path = os.path.join(output_folder, target_filename + original_file.file_extension)
-    linkFile(original_file.full_path, dest_path, linktype)
-    moveSubs(original_file.parent_folder, output_folder, original_file.basename, target_filename)
+    if linked and not (listing.exists(dest_path) if listing is not None else os.path.lexists(dest_path)):
+        # 目标在程序外被删除，重新链接
+        logger.info(f"[!] linked target missing, relink [{dest_path}]")
+        linked = False
+    if linked:
+        logger.debug(f"[-] already linked [{dest_path}]")
+    else:
+        linkFile(original_file.full_path, dest_path, linktype, original_file.stat, progress)
+    if listing is not None:
+        listing.added(dest_path)
+        if linktype == OperationMethod.MOVE:
+            listing.removed(original_file.full_path)
+    with lock or nullcontext():
+        moveSubs(original_file.parent_folder, output_folder, original_file.basename, target_filename,
+                 sub_files=original_file.sub_files, listing=listing)
 
     return dest_path
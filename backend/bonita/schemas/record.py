@@ -28,6 +28,7 @@ class TransferRecordBase(BaseModel):
     episode: Optional[int] = -1
     linkpath: Optional[str] = None
     destpath: Optional[str] = None
+    duplicate_of: Optional[str] = None
 
     updatetime: Optional[datetime] = None
     deadtime: Optional[datetime] = None
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, Field
@@ -66,6 +66,41 @@ class TransferConfigCreate(TransferConfigBase):
 
 class TaskPathParam(BaseModel):
     path: Optional[str] = None
+    # 忽略转移清单，强制全量重新扫描
+    force: bool = False
+    # 清理任务仅生成报告，不删除文件
+    clean_dry_run: bool = False
+
+
+class TransferPlanParam(BaseModel):
+    """
+    转移预览参数，未设置的规则使用任务当前配置
+    """
+    content_type: Optional[int] = None
+    optimize_name: Optional[bool] = None
+    output_folder: Optional[str] = None
+    escape_folder: Optional[str] = None
+    escape_literals: Optional[str] = None
+    escape_size: Optional[int] = None
+    limit: int = 100
+
+
+class TransferPlanItem(BaseModel):
+    srcpath: str
+    # 按规则计算的目标路径
+    destpath: str
+    # 转移记录中的目标路径
+    current: str
+    # new / changed / unchanged / ignored / scraping / removed
+    status: str
+
+
+class TransferPlanPage(BaseModel):
+    plan_id: str
+    task_id: int
+    counts: Dict[str, int]
+    total: int
+    data: List[TransferPlanItem]
 
 
 class ToolArgsParam(BaseModel):
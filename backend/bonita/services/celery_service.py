@@ -26,7 +26,13 @@ class CeleryTaskService:
             self.session.close()
 
     def create_task(self, task_id: str, task_type: str) -> CeleryTask:
-        """创建新任务记录"""
+        """创建新任务记录，任务重试时重置已有记录"""
+        task = self.get_task(task_id)
+        if task:
+            task.status = TaskStatusEnum.PENDING
+            task.progress = 0.0
+            self.session.commit()
+            return task
         task = CeleryTask(
             task_id=task_id,
             task_type=task_type,
@@ -155,19 +161,26 @@ class TaskProgressTracker:
         self.task_id = task_id
         self.total_steps = total_steps
         self.current_step = 0
+        self.progress = 0.0
 
     def update(self, step: str, increment: int = 1):
         """更新进度"""
         self.current_step += increment
-        progress = min((self.current_step / self.total_steps) * 100, 100)
-        CeleryTaskService.update_progress(self.task_id, progress, step)
+        self.progress = min((self.current_step / self.total_steps) * 100, 100)
+        CeleryTaskService.update_progress(self.task_id, self.progress, step)
 
     def set_progress(self, progress: float, step: str):
         """直接设置进度"""
+        self.progress = progress
         CeleryTaskService.update_progress(self.task_id, progress, step)
 
+    def set_step(self, step: str):
+        """仅更新步骤描述，保持当前进度"""
+        CeleryTaskService.update_progress(self.task_id, self.progress, step)
+
     def complete(self, step: str = "任务完成"):
         """完成任务"""
+        self.progress = 100.0
         CeleryTaskService.update_progress(self.task_id, 100.0, step)
 
     def update_detail(self, detail: str):
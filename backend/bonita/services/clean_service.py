@@ -0,0 +1,208 @@
+import os
+import time
+import shutil
+import logging
+from dataclasses import dataclass, field, asdict
+from datetime import timedelta
+from typing import Dict, List, Set
+from sqlalchemy.orm import Session
+
+from bonita.db import prefix_range
+from bonita.db.models.record import TransRecords
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+from bonita.services.run_service import TransferRunService
+from bonita.utils.filecopy import PARTIAL_SUFFIXES
+from bonita.utils.filehelper import video_type
+
+logger = logging.getLogger(__name__)
+
+# 复制临时文件超过该时间未更新时视为已放弃，不再续传
+PARTIAL_RETENTION = timedelta(days=7)
+
+
+@dataclass
+class CleanReport:
+    """ 清理报告
+    orphans: 需删除的视频文件
+    folders: 删除视频后不再包含视频的文件夹
+    records: 目标路径已失效的转移记录ID
+    scanned_dirs: 实际列出的目录数
+    """
+    root: str
+    dry_run: bool = False
+    orphans: List[str] = field(default_factory=list)
+    folders: List[str] = field(default_factory=list)
+    records: List[int] = field(default_factory=list)
+    scanned_dirs: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class CleanService:
+    """清理服务，根据转移记录和运行结果清理目标文件夹中的多余文件"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.escape_folders = {'@eaDir'}
+        self.escape_files = {'.DS_Store', '.drive_sync'}
+
+    def plan(self, root: str, run_id: str) -> CleanReport:
+        """计算需要清理的内容，不修改文件
+
+        仅检查本次运行写入过的目录，以及转移记录中目标路径已不属于本次结果的目录，
+        不再遍历整个目标文件夹
+
+        Args:
+            root: 目标文件夹
+            run_id: 转移运行ID
+
+        Returns:
+            CleanReport: 清理报告
+        """
+        root = os.path.normpath(root)
+        report = CleanReport(root=root)
+        done = set(TransferRunService(self.session).iter_paths(run_id))
+        touched: Set[str] = {os.path.dirname(path) for path in done}
+
+        # 目标路径不在本次结果中的记录
+        query = self.session.query(TransRecords.id, TransRecords.destpath).filter(
+            prefix_range(TransRecords.destpath, root + os.sep),
+            TransRecords.deleted.isnot(True)).yield_per(QUERY_CHUNK_SIZE)
+        for row in query:
+            if row.destpath not in done:
+                report.records.append(row.id)
+                touched.add(os.path.dirname(row.destpath))
+
+        orphans = set()
+        for folder in touched:
+            if not self._is_under(folder, root):
+                continue
+            try:
+                entries = list(os.scandir(folder))
+            except OSError:
+                continue
+            report.scanned_dirs += 1
+            for entry in entries:
+                if entry.name in self.escape_files or not entry.is_file():
+                    continue
+                if os.path.splitext(entry.name)[1].lower() in video_type and entry.path not in done:
+                    orphans.add(entry.path)
+        report.orphans = sorted(orphans)
+        report.folders = self._empty_folders(root, orphans)
+        return report
+
+    def execute(self, report: CleanReport) -> CleanReport:
+        """按清理报告删除文件和文件夹，并标记失效的转移记录
+
+        Args:
+            report: plan 生成的清理报告
+
+        Returns:
+            CleanReport: 清理报告
+        """
+        # 删除只修改元数据，不占用设备 I/O 槽位，避免排在大文件复制之后
+        for path in report.orphans:
+            logger.info(f"  ✗ 删除: {os.path.basename(path)}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        for folder in report.folders:
+            logger.info(f"Removing folder without target suffixes: {folder}")
+            shutil.rmtree(folder, ignore_errors=True)
+        for i in range(0, len(report.records), QUERY_CHUNK_SIZE):
+            chunk = report.records[i:i + QUERY_CHUNK_SIZE]
+            self.session.query(TransRecords).filter(TransRecords.id.in_(chunk)).update(
+                {TransRecords.deleted: True}, synchronize_session=False)
+        self.session.commit()
+        return report
+
+    def sweep_partials(self, root: str, dry_run: bool = False) -> List[str]:
+        """删除目标文件夹中过期的复制临时文件和断点
+
+        复制中断后源文件被删除或改名时，临时文件不会再被续传，按修改时间判断，
+        正在复制的文件会持续更新修改时间，不会被删除
+
+        Args:
+            root: 目标文件夹
+            dry_run: 仅返回待删除的文件
+
+        Returns:
+            List[str]: 删除的文件
+        """
+        expired = time.time() - PARTIAL_RETENTION.total_seconds()
+        stale = []
+        for path, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d not in self.escape_folders]
+            for name in files:
+                if not name.endswith(PARTIAL_SUFFIXES):
+                    continue
+                filepath = os.path.join(path, name)
+                try:
+                    if os.lstat(filepath).st_mtime < expired:
+                        stale.append(filepath)
+                except OSError:
+                    continue
+        if dry_run:
+            return stale
+        for filepath in stale:
+            logger.info(f"  ✗ 删除过期临时文件: {filepath}")
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+        return stale
+
+    def _empty_folders(self, root: str, orphans: Set[str]) -> List[str]:
+        """ 删除 orphans 后不再包含视频文件的最上层文件夹，不包含 root 本身
+        """
+        cache: Dict[str, bool] = {}
+        result = set()
+        for folder in {os.path.dirname(path) for path in orphans}:
+            top = None
+            while folder != root and self._is_under(folder, root):
+                if self._has_videos(folder, orphans, cache):
+                    break
+                top = folder
+                folder = os.path.dirname(folder)
+            if top:
+                result.add(top)
+        # 上层文件夹已包含的子文件夹无需重复删除
+        return sorted(f for f in result if not self._has_ancestor(f, root, result))
+
+    def _has_videos(self, folder: str, orphans: Set[str], cache: Dict[str, bool]) -> bool:
+        """ 文件夹内除 orphans 外是否还有视频文件，出错时视为有以防止误删
+        """
+        if folder in cache:
+            return cache[folder]
+        found = False
+        try:
+            for path, dirs, files in os.walk(folder):
+                dirs[:] = [d for d in dirs if d not in self.escape_folders]
+                for name in files:
+                    if name in self.escape_files:
+                        continue
+                    filepath = os.path.join(path, name)
+                    if os.path.splitext(name)[1].lower() in video_type and filepath not in orphans:
+                        found = True
+                        break
+                if found:
+                    break
+        except OSError:
+            found = True
+        cache[folder] = found
+        return found
+
+    @staticmethod
+    def _has_ancestor(folder: str, root: str, folders: Set[str]) -> bool:
+        parent = os.path.dirname(folder)
+        while parent != root and parent != folder and len(parent) > len(root):
+            if parent in folders:
+                return True
+            folder, parent = parent, os.path.dirname(parent)
+        return False
+
+    @staticmethod
+    def _is_under(path: str, root: str) -> bool:
+        return path == root or path.startswith(root + os.sep)
@@ -0,0 +1,165 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from bonita.core.config import settings
+from bonita.db import prefix_range
+from bonita.db.models.fingerprint import FileFingerprint
+from bonita.db.models.manifest import TransferManifest
+from bonita.db.models.record import TransRecords
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+from bonita.utils.fileinfo import BasicFileInfo
+from bonita.utils.fingerprint import FINGERPRINT_ALGO, fileFingerprint
+
+logger = logging.getLogger(__name__)
+
+# 重复内容处理方式
+DUPLICATE_SKIP = 'skip'
+DUPLICATE_LINK = 'link'
+
+
+class FingerprintService:
+    """内容指纹服务，识别已在媒体库中的重复内容
+
+    先按文件大小从转移清单中筛选候选，仅对大小相同的源文件和已有目标文件计算指纹；
+    指纹按 inode 缓存，大小、修改时间或摘要算法变化时重新计算
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def fingerprints(self, items: Iterable[Tuple[str, os.stat_result]]) -> Dict[str, str]:
+        """计算文件指纹，优先使用缓存，新结果写入缓存，需由调用方提交
+
+        Args:
+            items: (路径, stat)
+
+        Returns:
+            Dict[str, str]: 路径 -> 指纹，读取失败的文件不包含在内
+        """
+        items = list(items)
+        cached = self._load_cache(st for _, st in items)
+        result = {}
+        missing = []
+        algo_prefix = FINGERPRINT_ALGO + ':'
+        for path, st in items:
+            row = cached.get((st.st_dev, st.st_ino))
+            # 其他算法计算的缓存与当前指纹不可比较
+            if row is not None and row.size == st.st_size and row.mtime == st.st_mtime \
+                    and row.fingerprint.startswith(algo_prefix):
+                result[path] = row.fingerprint
+            else:
+                missing.append((path, st))
+        if not missing:
+            return result
+
+        sample_bytes = max(1, settings.FINGERPRINT_SAMPLE_MB) * 1024 * 1024
+
+        def compute(item) -> Optional[str]:
+            path, st = item
+            try:
+                return fileFingerprint(path, st.st_size, sample_bytes)
+            except OSError as e:
+                logger.warning(f"[!] fingerprint failed {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, settings.FINGERPRINT_THREADS),
+                                thread_name_prefix="fingerprint") as executor:
+            computed = list(executor.map(compute, missing))
+        now = datetime.now()
+        rows = {}
+        for (path, st), fingerprint in zip(missing, computed):
+            if fingerprint is None:
+                continue
+            result[path] = fingerprint
+            rows[(st.st_dev, st.st_ino)] = {'st_dev': st.st_dev, 'st_ino': st.st_ino, 'size': st.st_size,
+                                            'mtime': st.st_mtime, 'fingerprint': fingerprint, 'updatetime': now}
+        if rows:
+            stmt = insert(FileFingerprint)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['st_dev', 'st_ino'],
+                set_={k: stmt.excluded[k] for k in ('size', 'mtime', 'fingerprint', 'updatetime')})
+            self.session.execute(stmt, list(rows.values()))
+        logger.debug(f"[-] fingerprints: {len(items) - len(missing)} cached, {len(rows)} computed")
+        return result
+
+    def find_duplicates(self, files: List[BasicFileInfo], output_folder: str) -> Dict[str, str]:
+        """查找内容已在目标文件夹中的源文件
+
+        Args:
+            files: 待转移的源文件
+            output_folder: 任务目标文件夹
+
+        Returns:
+            Dict[str, str]: 源路径 -> 已有的目标路径
+        """
+        files = [tf for tf in files if tf.stat is not None]
+        own = {tf.full_path for tf in files}
+        candidates = self._size_candidates({tf.stat.st_size for tf in files}, output_folder, own)
+        if not candidates:
+            return {}
+
+        todo = [(tf.full_path, tf.stat) for tf in files if tf.stat.st_size in candidates]
+        for size, destpaths in candidates.items():
+            for destpath in destpaths:
+                try:
+                    st = os.stat(destpath)
+                except OSError:
+                    continue
+                if st.st_size == size:
+                    todo.append((destpath, st))
+        fingerprints = self.fingerprints(todo)
+
+        existing = {}
+        for size, destpaths in candidates.items():
+            for destpath in destpaths:
+                fingerprint = fingerprints.get(destpath)
+                if fingerprint:
+                    existing.setdefault(fingerprint, destpath)
+        duplicates = {}
+        for tf in files:
+            fingerprint = fingerprints.get(tf.full_path)
+            destpath = existing.get(fingerprint) if fingerprint else None
+            if destpath:
+                duplicates[tf.full_path] = destpath
+        return duplicates
+
+    def _size_candidates(self, sizes: Iterable[int], output_folder: str, exclude: set) -> Dict[int, List[str]]:
+        """ 转移清单中大小相同且已成功转移到目标文件夹的其他源文件 -> 目标路径 """
+        sizes = sorted(s for s in sizes if s)
+        output_prefix = os.path.join(os.path.normpath(output_folder), '')
+        candidates: Dict[int, List[str]] = {}
+        for i in range(0, len(sizes), QUERY_CHUNK_SIZE):
+            chunk = sizes[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(TransferManifest.size, TransferManifest.path, TransRecords.destpath).join(
+                TransRecords, TransRecords.srcpath == TransferManifest.path
+            ).filter(
+                TransferManifest.size.in_(chunk),
+                TransferManifest.is_dir.isnot(True),
+                TransRecords.success == True,
+                TransRecords.ignored.isnot(True),
+                TransRecords.deleted.isnot(True),
+                prefix_range(TransRecords.destpath, output_prefix)
+            ).all()
+            for row in rows:
+                if row.path in exclude:
+                    continue
+                destpaths = candidates.setdefault(row.size, [])
+                if row.destpath not in destpaths:
+                    destpaths.append(row.destpath)
+        return candidates
+
+    def _load_cache(self, stats: Iterable[os.stat_result]) -> Dict[Tuple[int, int], FileFingerprint]:
+        keys = {(st.st_dev, st.st_ino) for st in stats}
+        inos = sorted({ino for _, ino in keys})
+        cached = {}
+        for i in range(0, len(inos), QUERY_CHUNK_SIZE):
+            chunk = inos[i:i + QUERY_CHUNK_SIZE]
+            for row in self.session.query(FileFingerprint).filter(FileFingerprint.st_ino.in_(chunk)).all():
+                if (row.st_dev, row.st_ino) in keys:
+                    cached[(row.st_dev, row.st_ino)] = row
+        return cached
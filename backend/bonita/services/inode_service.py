@@ -0,0 +1,86 @@
+import os
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from bonita.db.models.record import TransRecords
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class LinkedTarget(NamedTuple):
+    """ 已链接到同一 inode 的转移记录 """
+    record_id: int
+    srcpath: str
+    destpath: str
+
+
+class InodeIndex:
+    """硬链接索引 (st_dev, st_ino) -> 已链接的目标路径
+
+    硬链接的目标与源文件共享 inode，转移成功时将扫描得到的 st_dev/st_ino 写入记录；
+    按文件组批量读取后，判断是否已链接只需查表，不再对目标 stat
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self._index: Dict[Tuple[int, int], List[LinkedTarget]] = {}
+
+    def load(self, stats: Iterable[Optional[os.stat_result]]) -> 'InodeIndex':
+        """读取源文件 inode 对应的有效转移记录
+
+        Args:
+            stats: 源文件 stat
+
+        Returns:
+            InodeIndex: self
+        """
+        keys = {(st.st_dev, st.st_ino) for st in stats if st is not None}
+        inos = sorted({ino for _, ino in keys})
+        for i in range(0, len(inos), QUERY_CHUNK_SIZE):
+            chunk = inos[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(
+                TransRecords.id, TransRecords.srcpath, TransRecords.destpath, TransRecords.st_dev, TransRecords.st_ino
+            ).filter(
+                TransRecords.st_ino.in_(chunk),
+                TransRecords.destpath != '',
+                TransRecords.deleted.isnot(True)
+            ).all()
+            for row in rows:
+                key = (row.st_dev, row.st_ino)
+                if key in keys:
+                    self._index.setdefault(key, []).append(LinkedTarget(row.id, row.srcpath, row.destpath))
+        return self
+
+    def lookup(self, st: Optional[os.stat_result]) -> List[LinkedTarget]:
+        """ 已链接到该 inode 的目标 """
+        if st is None:
+            return []
+        return self._index.get((st.st_dev, st.st_ino), [])
+
+    def resolve(self, srcpath: str, st: Optional[os.stat_result], destpath: str,
+                output_folder: str) -> Tuple[bool, Optional[LinkedTarget]]:
+        """判断源文件是否已链接到目标路径，以及是否由重命名前的源文件链接
+
+        Args:
+            srcpath: 源文件路径
+            st: 源文件 stat
+            destpath: 预期的目标路径
+            output_folder: 任务目标文件夹，其他文件夹中的链接不处理
+
+        Returns:
+            Tuple[bool, Optional[LinkedTarget]]: 是否已在目标路径, 重命名前源文件的记录
+        """
+        linked = False
+        renamed = None
+        output_prefix = os.path.join(os.path.normpath(output_folder), '')
+        for target in self.lookup(st):
+            if not target.destpath.startswith(output_prefix):
+                continue
+            if target.destpath == destpath:
+                linked = True
+            if target.srcpath != srcpath and renamed is None and not os.path.lexists(target.srcpath):
+                # 同一 inode 的旧源文件已不存在，视为重命名
+                renamed = target
+        return linked, renamed
@@ -0,0 +1,108 @@
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from bonita.db.models.journal import TransferJournal
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 未完成的转移日志保留时间，超过后源文件需重新处理
+JOURNAL_RETENTION = timedelta(days=7)
+
+# 单个文件的转移步骤，记录提交即为最后一步，日志随之删除
+STEP_SCRAPED = 1
+STEP_COVER = 2
+STEP_LINKED = 3
+
+
+class JournalEntry(NamedTuple):
+    """ 已完成的步骤和结果 """
+    step: int
+    data: dict
+
+
+class TransferJournalService:
+    """转移日志服务，保存单个文件已完成的转移步骤，用于中断后续传"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def load(self, task_id: int, signatures: Dict[str, str]) -> Dict[str, JournalEntry]:
+        """读取源文件的转移日志，摘要不一致的日志忽略
+
+        Args:
+            task_id: 任务ID
+            signatures: 源路径 -> 当前摘要
+
+        Returns:
+            Dict[str, JournalEntry]: 源路径 -> 已完成的步骤
+        """
+        entries = {}
+        srcpaths = list(signatures)
+        for i in range(0, len(srcpaths), QUERY_CHUNK_SIZE):
+            chunk = srcpaths[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(
+                TransferJournal.srcpath, TransferJournal.signature, TransferJournal.step, TransferJournal.data
+            ).filter(TransferJournal.task_id == task_id, TransferJournal.srcpath.in_(chunk)).all()
+            for row in rows:
+                if row.signature != signatures[row.srcpath]:
+                    logger.debug(f"[-] journal outdated: {row.srcpath}")
+                    continue
+                try:
+                    data = json.loads(row.data or '{}')
+                except ValueError:
+                    continue
+                entries[row.srcpath] = JournalEntry(row.step, data)
+        return entries
+
+    def save(self, task_id: int, srcpath: str, signature: str, step: int, data: dict):
+        """写入已完成的步骤，需由调用方提交
+
+        Args:
+            task_id: 任务ID
+            srcpath: 源路径
+            signature: 摘要
+            step: 已完成的步骤
+            data: 截至该步骤的全部结果，需可 JSON 序列化，否则写入时抛出 TypeError
+        """
+        values = {'signature': signature, 'step': step,
+                  'data': json.dumps(data, ensure_ascii=False), 'updatetime': datetime.now()}
+        stmt = insert(TransferJournal).values(task_id=task_id, srcpath=srcpath, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=['task_id', 'srcpath'], set_=values)
+        self.session.execute(stmt)
+
+    def complete(self, task_id: int, srcpaths: Iterable[str]) -> int:
+        """删除已完成文件的日志，需与转移记录在同一事务内提交
+
+        Args:
+            task_id: 任务ID
+            srcpaths: 源路径
+
+        Returns:
+            int: 删除的日志数
+        """
+        deleted = 0
+        srcpaths: List[str] = list(srcpaths)
+        for i in range(0, len(srcpaths), QUERY_CHUNK_SIZE):
+            chunk = srcpaths[i:i + QUERY_CHUNK_SIZE]
+            deleted += self.session.query(TransferJournal).filter(
+                TransferJournal.task_id == task_id, TransferJournal.srcpath.in_(chunk)
+            ).delete(synchronize_session=False)
+        return deleted
+
+    def purge_expired(self) -> int:
+        """删除过期的转移日志
+
+        Returns:
+            int: 删除的日志数
+        """
+        expired = datetime.now() - JOURNAL_RETENTION
+        deleted = self.session.query(TransferJournal).filter(TransferJournal.updatetime < expired).delete()
+        self.session.commit()
+        if deleted:
+            logger.info(f"清理过期转移日志 {deleted} 条")
+        return deleted
@@ -0,0 +1,273 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+
+from bonita.db.models.manifest import TransferManifest
+from bonita.db.models.record import TransRecords
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+from bonita.utils.filehelper import video_type
+
+logger = logging.getLogger(__name__)
+
+# (is_dir, st_dev, st_ino, size, mtime)
+ManifestKey = Tuple[bool, int, int, int, float]
+
+
+@dataclass
+class ManifestScan:
+    """ 增量扫描结果
+    entries: 本次扫描得到的完整清单
+    changed: 顶层条目 -> 新增或变化的视频文件
+    unchanged: 未变化的视频文件
+    full_entries: 顶层条目内全部文件均需处理
+    """
+    entries: Dict[str, ManifestKey] = field(default_factory=dict)
+    changed: Dict[str, List[str]] = field(default_factory=dict)
+    unchanged: List[str] = field(default_factory=list)
+    full_entries: Set[str] = field(default_factory=set)
+
+    def batches(self, max_entries: int = 0, max_files: int = 0) -> List[List[Tuple[str, Optional[List[str]]]]]:
+        """ 将变化的顶层条目按条目数和文件数打包
+        :param max_entries: 每批最多条目数，0 表示不限制
+        :param max_files: 每批最多文件数，0 表示不限制；单个条目超出时独占一批
+        :return: [[(顶层条目, 需处理的文件或 None 表示全部), ...], ...]
+        """
+        batches = []
+        current = []
+        current_files = 0
+        for path, files in self.changed.items():
+            full = (max_entries and len(current) >= max_entries) or \
+                (max_files and current and current_files + len(files) > max_files)
+            if full:
+                batches.append(current)
+                current = []
+                current_files = 0
+            current.append((path, None if path in self.full_entries else files))
+            current_files += len(files)
+        if current:
+            batches.append(current)
+        return batches
+
+    def drop(self, source_folder: str, paths: Iterable[str]):
+        """ 从清单中移除文件及其上级目录，下次扫描时重新处理
+        """
+        root = os.path.normpath(source_folder)
+        for path in paths:
+            self.entries.pop(path, None)
+            parent = os.path.dirname(path)
+            while parent and os.path.normpath(parent) != root and parent in self.entries:
+                self.entries.pop(parent)
+                parent = os.path.dirname(parent)
+
+
+class ManifestService:
+    """转移清单服务，记录源文件 stat 信息以支持增量转移"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def load(self, task_id: int) -> Dict[str, ManifestKey]:
+        """读取任务清单
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            Dict[str, ManifestKey]: 路径 -> stat 信息
+        """
+        rows = self.session.query(
+            TransferManifest.path, TransferManifest.is_dir, TransferManifest.st_dev,
+            TransferManifest.st_ino, TransferManifest.size, TransferManifest.mtime
+        ).filter(TransferManifest.task_id == task_id).all()
+        return {row.path: (bool(row.is_dir), row.st_dev, row.st_ino, row.size, row.mtime) for row in rows}
+
+    def replace(self, task_id: int, entries: Dict[str, ManifestKey]):
+        """使用新的扫描结果替换任务清单
+
+        Args:
+            task_id: 任务ID
+            entries: 路径 -> stat 信息
+        """
+        self.session.query(TransferManifest).filter(TransferManifest.task_id == task_id).delete()
+        self.session.bulk_insert_mappings(TransferManifest, [
+            {
+                'task_id': task_id,
+                'path': path,
+                'is_dir': key[0],
+                'st_dev': key[1],
+                'st_ino': key[2],
+                'size': key[3],
+                'mtime': key[4],
+            } for path, key in entries.items()
+        ])
+        self.session.commit()
+
+    def clear(self, task_id: int) -> int:
+        """清空任务清单，下次转移时全量扫描
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            int: 删除的条目数
+        """
+        deleted = self.session.query(TransferManifest).filter(TransferManifest.task_id == task_id).delete()
+        self.session.commit()
+        return deleted
+
+    def scan(self, source_folder: str, manifest: Dict[str, ManifestKey],
+             escape_folders: Optional[Set[str]] = None, escape_literals: Optional[List[str]] = None,
+             min_size: int = 0, force: bool = False) -> ManifestScan:
+        """增量扫描源文件夹
+
+        文件夹 mtime 未变化时直接复用清单中的子项，不再列目录，但仍对其中文件 stat，
+        原地改写的文件（大小或 mtime 变化）同样视为变化；force 为 True 时忽略清单，全部视为变化
+
+        Args:
+            source_folder: 源文件夹
+            manifest: 上次的清单
+            escape_folders: 跳过的文件夹名
+            escape_literals: 文件名包含这些文字时跳过
+            min_size: 最小文件大小（字节）
+            force: 强制全量扫描
+
+        Returns:
+            ManifestScan: 扫描结果
+        """
+        scanner = _ManifestScanner(manifest, escape_folders or set(), escape_literals or [], min_size, force)
+        for entry in os.scandir(source_folder):
+            if entry.name in scanner.escape_folders:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                files, unchanged = scanner.scan_dir(entry.path)
+            elif entry.is_file():
+                files, unchanged = scanner.scan_file(entry)
+            else:
+                continue
+            if files:
+                scanner.result.changed[entry.path] = files
+                if not unchanged:
+                    scanner.result.full_entries.add(entry.path)
+        return scanner.result
+
+    def processed_paths(self, srcpaths: Iterable[str]) -> Tuple[Set[str], Dict[str, str]]:
+        """查询已处理完成的源文件
+
+        Args:
+            srcpaths: 源文件路径
+
+        Returns:
+            Tuple[Set[str], Dict[str, str]]: 已成功或已忽略的源文件, 源文件 -> 目标路径
+        """
+        done = set()
+        destpaths = {}
+        srcpaths = list(srcpaths)
+        for i in range(0, len(srcpaths), QUERY_CHUNK_SIZE):
+            chunk = srcpaths[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(
+                TransRecords.srcpath, TransRecords.destpath, TransRecords.success, TransRecords.ignored
+            ).filter(TransRecords.srcpath.in_(chunk)).all()
+            for row in rows:
+                if row.success or row.ignored:
+                    done.add(row.srcpath)
+                if row.destpath and not row.ignored:
+                    destpaths[row.srcpath] = row.destpath
+        return done, destpaths
+
+
+class _ManifestScanner:
+    """ 单次增量扫描的状态
+    """
+
+    def __init__(self, manifest: Dict[str, ManifestKey], escape_folders: Set[str],
+                 escape_literals: List[str], min_size: int, force: bool):
+        self.manifest = manifest
+        self.escape_folders = set(escape_folders) | {'@eaDir'}
+        self.escape_files = {'.DS_Store', '.drive_sync'}
+        self.escape_literals = escape_literals
+        self.min_size = min_size
+        self.force = force
+        self.result = ManifestScan()
+        # 父目录 -> 子项，用于跳过未变化的目录
+        self.children: Dict[str, List[str]] = {}
+        if not force:
+            for path in manifest:
+                self.children.setdefault(os.path.dirname(path), []).append(path)
+
+    def scan_dir(self, dirpath: str) -> Tuple[List[str], bool]:
+        """ 扫描目录，返回变化的文件及是否存在未变化的文件
+        """
+        try:
+            st = os.stat(dirpath)
+        except OSError as e:
+            logger.warning(f"[!] manifest scan failed {dirpath}: {e}")
+            return [], False
+        key = (True, st.st_dev, st.st_ino, 0, st.st_mtime)
+        self.result.entries[dirpath] = key
+
+        changed = []
+        has_unchanged = False
+        if not self.force and self.manifest.get(dirpath) == key:
+            # 目录项未变化，直接复用清单；原地改写文件不会改变目录 mtime，文件仍需 stat
+            for child in self.children.get(dirpath, []):
+                if self.manifest[child][0]:
+                    files, unchanged = self.scan_dir(child)
+                else:
+                    try:
+                        st = os.stat(child)
+                    except OSError as e:
+                        logger.warning(f"[!] manifest stat failed {child}: {e}")
+                        continue
+                    files, unchanged = self.check_file(child, st)
+                changed.extend(files)
+                has_unchanged = has_unchanged or unchanged
+            return changed, has_unchanged
+
+        try:
+            entries = list(os.scandir(dirpath))
+        except OSError as e:
+            logger.warning(f"[!] manifest scan failed {dirpath}: {e}")
+            self.result.entries.pop(dirpath, None)
+            return [], False
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in self.escape_folders:
+                    continue
+                files, unchanged = self.scan_dir(entry.path)
+            elif entry.is_file():
+                files, unchanged = self.scan_file(entry)
+            else:
+                continue
+            changed.extend(files)
+            has_unchanged = has_unchanged or unchanged
+        return changed, has_unchanged
+
+    def scan_file(self, entry: os.DirEntry) -> Tuple[List[str], bool]:
+        """ 检查单个文件，返回变化的文件及是否未变化
+        """
+        if entry.name in self.escape_files:
+            return [], False
+        if os.path.splitext(entry.name)[1].lower() not in video_type:
+            return [], False
+        if any(lit in entry.name for lit in self.escape_literals):
+            return [], False
+        try:
+            st = entry.stat()
+        except OSError as e:
+            logger.warning(f"[!] manifest stat failed {entry.path}: {e}")
+            return [], False
+        return self.check_file(entry.path, st)
+
+    def check_file(self, path: str, st: os.stat_result) -> Tuple[List[str], bool]:
+        """ 按 stat 结果与清单比较，返回变化的文件及是否未变化
+        """
+        if self.min_size and st.st_size < self.min_size:
+            return [], False
+        key = (False, st.st_dev, st.st_ino, st.st_size, st.st_mtime)
+        self.result.entries[path] = key
+        if not self.force and self.manifest.get(path) == key:
+            self.result.unchanged.append(path)
+            return [], True
+        return [path], False
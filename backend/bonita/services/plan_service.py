@@ -0,0 +1,205 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from bonita import schemas
+from bonita.db import prefix_range
+from bonita.db.models.record import TransRecords
+from bonita.modules.transfer.transfer import GroupNaming, plan_transferfile
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+from bonita.utils.fileinfo import BasicFileInfo, TargetFileInfo
+from bonita.utils.filehelper import scanVideoEntries, videoEntryOf, video_type
+
+logger = logging.getLogger(__name__)
+
+# 预览结果保留时间（秒）和数量
+PLAN_TTL = 600
+MAX_PLANS = 4
+
+# 预览状态
+PLAN_NEW = 'new'
+PLAN_CHANGED = 'changed'
+PLAN_UNCHANGED = 'unchanged'
+PLAN_IGNORED = 'ignored'
+PLAN_SCRAPING = 'scraping'
+PLAN_REMOVED = 'removed'
+
+
+def scan_group_files(task_info: schemas.TransferConfigPublic, full_path: str, verbose: bool = True) -> List[BasicFileInfo]:
+    """ 扫描文件组，按任务规则排除文件
+    单次扫描，文件条目携带 stat 和同目录字幕，后续过滤、链接、字幕复制不再重复 stat/列目录
+    """
+    log = logger.info if verbose else logger.debug
+    waiting_list = []
+    if os.path.isdir(full_path):
+        escape_folders = [fo.strip() for fo in task_info.escape_folder.split(',')] if task_info.escape_folder else []
+        for entry in scanVideoEntries(full_path, escape_folders):
+            tf = BasicFileInfo(entry.path, entry)
+            tf.set_root_folder(task_info.source_folder)
+            waiting_list.append(tf)
+    else:
+        if os.path.splitext(full_path)[1].lower() not in video_type:
+            if verbose:
+                logger.warning("    ✗ 非视频文件，跳过")
+            return []
+        tf = BasicFileInfo(full_path, videoEntryOf(full_path))
+        tf.set_root_folder(task_info.source_folder)
+        waiting_list.append(tf)
+
+    # 排除文件名包含指定文字的文件
+    if task_info.escape_literals:
+        escape_lits = [lit.strip() for lit in task_info.escape_literals.split(',') if lit.strip()]
+        if escape_lits:
+            before_count = len(waiting_list)
+            waiting_list = [tf for tf in waiting_list if not any(lit in tf.filename for lit in escape_lits)]
+            log(f"    排除含指定文字的文件: {before_count - len(waiting_list)} 个 (规则: {escape_lits})")
+
+    # 排除小于指定大小的文件（单位MB，0表示不排除）
+    if task_info.escape_size and task_info.escape_size > 0:
+        min_size_bytes = task_info.escape_size * 1024 * 1024
+        before_count = len(waiting_list)
+        waiting_list = [tf for tf in waiting_list if tf.stat.st_size >= min_size_bytes]
+        log(f"    排除小于 {task_info.escape_size}MB 的文件: {before_count - len(waiting_list)} 个")
+    return waiting_list
+
+
+def plan_group_target(task_info: schemas.TransferConfigPublic, original_file: BasicFileInfo, record,
+                      naming: GroupNaming) -> TargetFileInfo:
+    """ 计算非刮削模式下的目标路径，record 中手动指定的顶层目录和剧集信息优先
+    naming 为所在文件组的命名推断，同一文件组共用
+    """
+    target_file = TargetFileInfo(task_info.output_folder)
+    if record is not None and record.top_folder:
+        target_file.force_update_top_folder(record.top_folder)
+    # 如果 record 中定义了剧集信息，则使用 record 中的信息
+    if record is not None and record.isepisode:
+        target_file.force_update_episode(record.isepisode, record.season, record.episode)
+    return plan_transferfile(original_file, target_file,
+                             optimize_name_tag=task_info.optimize_name, series_tag=task_info.content_type == 2,
+                             naming=naming)
+
+
+@dataclass
+class TransferPlan:
+    """ 转移预览结果
+    items: [{srcpath, destpath, current, status}]，destpath 为按规则计算的目标路径，current 为记录中的目标路径
+    """
+    plan_id: str
+    task_id: int
+    items: List[dict] = field(default_factory=list)
+    counts: Dict[str, int] = field(default_factory=dict)
+    createtime: float = field(default_factory=time.time)
+
+    def page(self, skip: int = 0, limit: int = 100, status: Optional[str] = None) -> schemas.TransferPlanPage:
+        items = self.items if not status else [item for item in self.items if item['status'] == status]
+        return schemas.TransferPlanPage(plan_id=self.plan_id, task_id=self.task_id, counts=self.counts,
+                                        total=len(items), data=items[skip:skip + limit])
+
+
+class TransferPlanService:
+    """ 转移预览服务
+    按任务规则扫描、解析并计算目标路径，全部在内存中完成，不修改文件和记录；
+    结果与转移记录中的目标路径对比，缓存后分页读取
+    """
+
+    _plans: Dict[str, TransferPlan] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def plan(self, task_info: schemas.TransferConfigPublic) -> TransferPlan:
+        """ 生成转移预览
+
+        刮削模式的目标路径依赖刮削结果，不在预览中计算，状态为 scraping
+
+        Args:
+            task_info: 任务配置，可为修改规则后的未保存配置
+
+        Returns:
+            TransferPlan: 预览结果
+        """
+        start = time.monotonic()
+        source = os.path.normpath(task_info.source_folder)
+        records = self._load_records(source)
+        plan = TransferPlan(plan_id=uuid.uuid4().hex, task_id=task_info.id)
+        escape_folders = {fo.strip() for fo in task_info.escape_folder.split(',')} if task_info.escape_folder else set()
+
+        seen = set()
+        with os.scandir(source) as entries:
+            groups = sorted(entry.path for entry in entries if entry.name not in escape_folders)
+        for group in groups:
+            file_list = scan_group_files(task_info, group, verbose=False)
+            naming = GroupNaming(file_list)
+            for original_file in file_list:
+                srcpath = original_file.full_path
+                seen.add(srcpath)
+                record = records.get(srcpath)
+                current = record.destpath if record is not None else ''
+                if record is not None and record.ignored:
+                    self._add(plan, srcpath, '', current, PLAN_IGNORED)
+                elif task_info.sc_enabled:
+                    self._add(plan, srcpath, current, current, PLAN_SCRAPING)
+                else:
+                    destpath = plan_group_target(task_info, original_file, record, naming).full_path
+                    if not current:
+                        status = PLAN_NEW
+                    elif current == destpath:
+                        status = PLAN_UNCHANGED
+                    else:
+                        status = PLAN_CHANGED
+                    self._add(plan, srcpath, destpath, current, status)
+
+        # 已有记录但不再被规则选中，或源文件已不存在
+        for srcpath, record in records.items():
+            if srcpath not in seen and record.destpath and not record.ignored:
+                self._add(plan, srcpath, '', record.destpath, PLAN_REMOVED)
+
+        logger.info(f"[-] transfer plan {task_info.id}: {len(plan.items)} items {plan.counts} "
+                    f"in {time.monotonic() - start:.2f}s")
+        self._store(plan)
+        return plan
+
+    @classmethod
+    def get(cls, plan_id: str) -> Optional[TransferPlan]:
+        """ 读取缓存的预览结果，过期返回 None """
+        with cls._lock:
+            cls._expire()
+            return cls._plans.get(plan_id)
+
+    @staticmethod
+    def _add(plan: TransferPlan, srcpath: str, destpath: str, current: str, status: str):
+        plan.items.append({'srcpath': srcpath, 'destpath': destpath, 'current': current, 'status': status})
+        plan.counts[status] = plan.counts.get(status, 0) + 1
+
+    def _load_records(self, source: str) -> dict:
+        """ 源文件夹下的转移记录，仅读取计算所需的列 """
+        query = self.session.query(
+            TransRecords.srcpath, TransRecords.destpath, TransRecords.ignored, TransRecords.top_folder,
+            TransRecords.isepisode, TransRecords.season, TransRecords.episode
+        ).filter(
+            prefix_range(TransRecords.srcpath, source + os.sep),
+            TransRecords.deleted.isnot(True)
+        ).yield_per(QUERY_CHUNK_SIZE)
+        return {row.srcpath: row for row in query}
+
+    @classmethod
+    def _store(cls, plan: TransferPlan):
+        with cls._lock:
+            cls._expire()
+            while len(cls._plans) >= MAX_PLANS:
+                oldest = min(cls._plans.values(), key=lambda p: p.createtime)
+                del cls._plans[oldest.plan_id]
+            cls._plans[plan.plan_id] = plan
+
+    @classmethod
+    def _expire(cls):
+        now = time.time()
+        for plan_id in [k for k, p in cls._plans.items() if now - p.createtime > PLAN_TTL]:
+            del cls._plans[plan_id]
@@ -1,17 +1,21 @@
 import os
 import logging
 from threading import Thread
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from sqlalchemy import or_, desc, asc
 
+from bonita.db import prefix_range
 from bonita.db.models.record import TransRecords
 from bonita.db.models.extrainfo import ExtraInfo
 from bonita.utils.filehelper import cleanFilebyFilter, cleanFolderWithoutSuffix, video_type
 
 logger = logging.getLogger(__name__)
 
+# SQLite 单条语句的变量数有限制，IN 查询需要分批
+QUERY_CHUNK_SIZE = 500
+
 
 class RecordService:
     """转移记录服务，提供对转移记录的业务逻辑操作"""
@@ -105,6 +109,47 @@ class RecordService:
 
         return result[0], result[1]
 
+    def get_records_by_srcpaths(self, srcpaths: List[str]) -> Dict[str, TransRecords]:
+        """批量获取源路径对应的转移记录
+
+        Args:
+            srcpaths: 源文件路径列表
+
+        Returns:
+            Dict[str, TransRecords]: 源路径 -> 记录，同一路径存在多条记录时取最早的一条
+        """
+        records = {}
+        srcpaths = list(set(srcpaths))
+        for i in range(0, len(srcpaths), QUERY_CHUNK_SIZE):
+            chunk = srcpaths[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(TransRecords).filter(
+                TransRecords.srcpath.in_(chunk)).order_by(TransRecords.id).all()
+            for record in rows:
+                records.setdefault(record.srcpath, record)
+        return records
+
+    def get_shared_destpaths(self, records: List[TransRecords]) -> set:
+        """批量获取仍被其他有效记录使用的目标路径
+
+        Args:
+            records: 转移记录列表
+
+        Returns:
+            set: 这些记录的目标路径中，同时属于其他未删除记录的路径
+        """
+        owners = {record.destpath: record.id for record in records if record.destpath}
+        destpaths = list(owners)
+        shared = set()
+        for i in range(0, len(destpaths), QUERY_CHUNK_SIZE):
+            chunk = destpaths[i:i + QUERY_CHUNK_SIZE]
+            rows = self.session.query(TransRecords.id, TransRecords.destpath).filter(
+                TransRecords.destpath.in_(chunk),
+                TransRecords.deleted.isnot(True),
+                TransRecords.srcdeleted.isnot(True)
+            ).all()
+            shared.update(row.destpath for row in rows if row.id != owners[row.destpath])
+        return shared
+
     def update_record(self, record: TransRecords, update_dict: dict) -> TransRecords:
         """更新转移记录
 
@@ -175,7 +220,7 @@ class RecordService:
 
         parent_prefix = f"{parent_srcpath}/"
         query = self.session.query(TransRecords).filter(
-            TransRecords.srcpath.like(f"{parent_prefix}%"),
+            prefix_range(TransRecords.srcpath, parent_prefix),
             ~TransRecords.srcpath.like(f"{parent_prefix}%/%"),
         )
 
@@ -232,7 +277,7 @@ class RecordService:
         query = self.session.query(TransRecords).filter(
             or_(
                 TransRecords.srcpath == old_prefix,
-                TransRecords.srcpath.startswith(f"{old_prefix}/")
+                prefix_range(TransRecords.srcpath, f"{old_prefix}/")
             )
         )
         if task_id is not None:
@@ -326,6 +371,9 @@ class RecordService:
 
             dest_path = transfer_record.destpath
             src_path = transfer_record.srcpath
+            # 重复内容的记录可能指向同一目标，仍被其他记录使用时保留目标文件
+            if self._destpath_shared(transfer_record):
+                dest_path = ''
 
             # 删除关联的额外信息
             if extra_info:
@@ -380,6 +428,17 @@ class RecordService:
 
         return success, message, deleted_count, failed_ids
 
+    def _destpath_shared(self, record: TransRecords) -> bool:
+        """目标路径是否仍被其他有效记录使用"""
+        if not record.destpath:
+            return False
+        return self.session.query(TransRecords.id).filter(
+            TransRecords.destpath == record.destpath,
+            TransRecords.id != record.id,
+            TransRecords.deleted.isnot(True),
+            TransRecords.srcdeleted.isnot(True)
+        ).first() is not None
+
     def get_trans_records(self, skip: int = 0, limit: int = 100) -> Tuple[List[TransRecords], int]:
         """获取所有转移记录
 
@@ -0,0 +1,116 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from bonita.db.models.run import TransferRun, TransferRunPath
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 运行没有活动超过该时间视为已中断，其结果可以删除
+RUN_RETENTION = timedelta(days=7)
+# 等待子任务期间记录运行活动的间隔（秒）
+RUN_HEARTBEAT_INTERVAL = 600
+
+
+class TransferRunService:
+    """转移运行结果服务，在数据库中按运行ID保存已完成的目标路径"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def touch(self, run_id: str):
+        """记录运行仍在进行，运行不存在时创建，需由调用方提交
+
+        Args:
+            run_id: 运行ID
+        """
+        now = datetime.now()
+        stmt = insert(TransferRun).values(run_id=run_id, createtime=now, updatetime=now)
+        self.session.execute(stmt.on_conflict_do_update(index_elements=['run_id'], set_={'updatetime': now}))
+
+    def add(self, run_id: str, paths: Iterable[str]) -> int:
+        """记录已完成的目标路径，重复路径忽略
+
+        Args:
+            run_id: 运行ID
+            paths: 目标路径
+
+        Returns:
+            int: 提交的路径数
+        """
+        count = 0
+        chunk = []
+        for path in paths:
+            if not path:
+                continue
+            chunk.append({'run_id': run_id, 'path': path})
+            if len(chunk) >= QUERY_CHUNK_SIZE:
+                count += self._insert(chunk)
+                chunk = []
+        if chunk:
+            count += self._insert(chunk)
+        if count:
+            self.touch(run_id)
+        return count
+
+    def _insert(self, rows: List[dict]) -> int:
+        now = datetime.now()
+        for row in rows:
+            row['createtime'] = now
+        stmt = insert(TransferRunPath).on_conflict_do_nothing(index_elements=['run_id', 'path'])
+        self.session.execute(stmt, rows)
+        return len(rows)
+
+    def iter_paths(self, run_id: str) -> Iterator[str]:
+        """按批读取运行已完成的目标路径
+
+        Args:
+            run_id: 运行ID
+
+        Returns:
+            Iterator[str]: 目标路径
+        """
+        query = self.session.query(TransferRunPath.path).filter(
+            TransferRunPath.run_id == run_id).yield_per(QUERY_CHUNK_SIZE)
+        for row in query:
+            yield row.path
+
+    def count(self, run_id: str) -> int:
+        """运行已完成的目标路径数"""
+        return self.session.query(TransferRunPath).filter(TransferRunPath.run_id == run_id).count()
+
+    def clear(self, run_id: str) -> int:
+        """删除运行及其结果
+
+        Args:
+            run_id: 运行ID
+
+        Returns:
+            int: 删除的路径数
+        """
+        deleted = self.session.query(TransferRunPath).filter(TransferRunPath.run_id == run_id).delete()
+        self.session.query(TransferRun).filter(TransferRun.run_id == run_id).delete()
+        self.session.commit()
+        return deleted
+
+    def purge_expired(self) -> int:
+        """删除已中断运行的结果，即长时间没有活动的运行遗留的数据
+        仍有活动的运行即使开始已久也不会删除，避免长时间的转移在清理前丢失已完成的路径
+
+        Returns:
+            int: 删除的路径数
+        """
+        expired = datetime.now() - RUN_RETENTION
+        active = self.session.query(TransferRun.run_id).filter(TransferRun.updatetime >= expired)
+        deleted = self.session.query(TransferRunPath).filter(
+            TransferRunPath.createtime < expired,
+            TransferRunPath.run_id.notin_(active.scalar_subquery())
+        ).delete(synchronize_session=False)
+        self.session.query(TransferRun).filter(TransferRun.updatetime < expired).delete()
+        self.session.commit()
+        if deleted:
+            logger.info(f"清理过期转移运行结果 {deleted} 条")
+        return deleted
@@ -0,0 +1,84 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from bonita.db.models.snapshot import MonitorDirectory, MonitorSnapshot
+from bonita.services.record_service import QUERY_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class MonitorSnapshotService:
+    """轮询监控快照服务，按监控文件夹保存文件快照和目录状态"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    def load(self, root: str) -> Tuple[List[Tuple[str, int, float]], Dict[str, Tuple[int, int]]]:
+        """读取保存的快照
+
+        Args:
+            root: 监控文件夹
+
+        Returns:
+            Tuple[List[Tuple[str, int, float]], Dict[str, Tuple[int, int]]]:
+                (文件路径, 大小, 修改时间), 目录路径 -> (修改时间, 列出时间)
+        """
+        files = [tuple(row) for row in self.session.query(
+            MonitorSnapshot.path, MonitorSnapshot.size, MonitorSnapshot.mtime
+        ).filter(MonitorSnapshot.root == root).yield_per(QUERY_CHUNK_SIZE)]
+        dirs = {}
+        for row in self.session.query(MonitorDirectory.path, MonitorDirectory.mtime_ns, MonitorDirectory.listed_ns).filter(
+                MonitorDirectory.root == root).yield_per(QUERY_CHUNK_SIZE):
+            dirs[row.path] = (row.mtime_ns, row.listed_ns)
+        return files, dirs
+
+    def save(self, root: str, files: Iterable[Tuple[str, int, float]], removed_files: Iterable[str],
+             dirs: Dict[str, Tuple[int, int]], removed_dirs: Iterable[str]):
+        """写入快照变化并提交
+
+        Args:
+            root: 监控文件夹
+            files: 新增或变化的文件 (路径, 大小, 修改时间)
+            removed_files: 已删除的文件路径
+            dirs: 新增或变化的目录 -> (修改时间, 列出时间)
+            removed_dirs: 已删除的目录路径
+        """
+        file_rows = [{'root': root, 'path': path, 'size': size, 'mtime': mtime}
+                     for path, size, mtime in files]
+        if file_rows:
+            stmt = insert(MonitorSnapshot)
+            stmt = stmt.on_conflict_do_update(index_elements=['root', 'path'],
+                                              set_={k: stmt.excluded[k] for k in ('size', 'mtime')})
+            self.session.execute(stmt, file_rows)
+        dir_rows = [{'root': root, 'path': path, 'mtime_ns': mtime_ns, 'listed_ns': listed_ns}
+                    for path, (mtime_ns, listed_ns) in dirs.items()]
+        if dir_rows:
+            stmt = insert(MonitorDirectory)
+            stmt = stmt.on_conflict_do_update(index_elements=['root', 'path'],
+                                              set_={k: stmt.excluded[k] for k in ('mtime_ns', 'listed_ns')})
+            self.session.execute(stmt, dir_rows)
+        self._delete(MonitorSnapshot, root, list(removed_files))
+        self._delete(MonitorDirectory, root, list(removed_dirs))
+        self.session.commit()
+
+    def delete(self, root: str) -> int:
+        """删除监控文件夹的全部快照
+
+        Returns:
+            int: 删除的文件快照数
+        """
+        deleted = self.session.query(MonitorSnapshot).filter(
+            MonitorSnapshot.root == root).delete()
+        self.session.query(MonitorDirectory).filter(
+            MonitorDirectory.root == root).delete()
+        self.session.commit()
+        return deleted
+
+    def _delete(self, model, root: str, paths: List[str]):
+        for i in range(0, len(paths), QUERY_CHUNK_SIZE):
+            chunk = paths[i:i + QUERY_CHUNK_SIZE]
+            self.session.query(model).filter(
+                model.root == root, model.path.in_(chunk)
+            ).delete(synchronize_session=False)
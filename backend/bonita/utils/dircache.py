@@ -0,0 +1,74 @@
+import os
+from threading import Lock
+from typing import Dict, List, Tuple
+
+# 目录项: (名称, 是否目录, 是否文件)
+DirItem = Tuple[str, bool, bool]
+
+
+class DirListingCache:
+    """ 运行范围内的目录列表缓存
+    同一目录只列出一次，经由缓存的写入/删除会同步更新，其他修改需调用 invalidate
+    线程安全，可在文件组的并发转移中共享
+    """
+
+    def __init__(self):
+        self._folders: Dict[str, Dict[str, Tuple[bool, bool]]] = {}
+        self._lock = Lock()
+        # 实际列出目录的次数
+        self.listings = 0
+
+    def list(self, folder: str) -> List[DirItem]:
+        """ 列出目录，目录不存在等错误与 os.scandir 一致抛出 OSError """
+        folder = os.path.normpath(folder)
+        with self._lock:
+            items = self._folders.get(folder)
+            if items is not None:
+                return [(name, is_dir, is_file) for name, (is_dir, is_file) in items.items()]
+        items = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                try:
+                    items[entry.name] = (entry.is_dir(), entry.is_file())
+                except OSError:
+                    continue
+        with self._lock:
+            self.listings += 1
+            items = self._folders.setdefault(folder, items)
+            return [(name, is_dir, is_file) for name, (is_dir, is_file) in items.items()]
+
+    def exists(self, path: str) -> bool:
+        """ 路径是否在所在目录的列表中，目录不存在时返回 False """
+        folder, name = os.path.split(os.path.normpath(path))
+        try:
+            return any(item[0] == name for item in self.list(folder))
+        except OSError:
+            return False
+
+    def added(self, path: str, is_dir: bool = False):
+        """ 记录新建的文件或目录 """
+        folder, name = os.path.split(os.path.normpath(path))
+        with self._lock:
+            items = self._folders.get(folder)
+            if items is not None:
+                items[name] = (is_dir, not is_dir)
+
+    def removed(self, path: str):
+        """ 记录删除的文件或目录，目录下的缓存一并失效 """
+        path = os.path.normpath(path)
+        folder, name = os.path.split(path)
+        with self._lock:
+            items = self._folders.get(folder)
+            if items is not None:
+                items.pop(name, None)
+            prefix = path + os.sep
+            for cached in [f for f in self._folders if f == path or f.startswith(prefix)]:
+                del self._folders[cached]
+
+    def invalidate(self, folder: str = None):
+        """ 使目录缓存失效，folder 为空时清空全部 """
+        with self._lock:
+            if folder is None:
+                self._folders.clear()
+            else:
+                self._folders.pop(os.path.normpath(folder), None)
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import errno
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 单次内核复制的字节数
+CHUNK_SIZE = 64 * 1024 * 1024
+# 每复制 N 字节 fsync 并写入断点
+CHECKPOINT_BYTES = 512 * 1024 * 1024
+# 进度回调的最小间隔（秒）
+PROGRESS_INTERVAL = 2.0
+
+PART_SUFFIX = '.bonita-part'
+CHECKPOINT_SUFFIX = '.bonita-part.json'
+# 复制未完成时留下的临时文件
+PARTIAL_SUFFIXES = (PART_SUFFIX, CHECKPOINT_SUFFIX, CHECKPOINT_SUFFIX + '.tmp')
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 内核复制不可用时回退的错误
+_FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+# 网络存储断开、IO 错误等可能是暂时的错误，重试时从断点继续；空间不足不会自行恢复，不重试
+_RETRYABLE_ERRNOS = {errno.EIO, errno.EAGAIN, errno.EINTR, errno.ETIMEDOUT, errno.ESTALE, errno.ENOTCONN,
+                     errno.ECONNRESET, errno.EHOSTDOWN, errno.EHOSTUNREACH, errno.ENETDOWN, errno.ENETUNREACH}
+
+# progress(已复制字节, 总字节, 字节/秒)
+ProgressCallback = Callable[[int, int, float], None]
+
+
+def copyFile(srcpath: str, dstpath: str, progress: Optional[ProgressCallback] = None,
+             throttle: Optional[Callable[[int], None]] = None) -> str:
+    """ 复制文件，支持断点续传
+    1. 优先尝试 reflink（btrfs/xfs 等同一文件系统内瞬间完成）
+    2. 否则依次使用 copy_file_range / sendfile / 读写，先写入临时文件
+    3. 定期 fsync 并记录断点，任务重试时从断点继续
+    4. 完成后重命名为目标文件
+    :param progress: 进度回调 (已复制字节, 总字节, 字节/秒)
+    :param throttle: 每复制一段后调用 throttle(字节数)，用于限速
+    """
+    part_path = dstpath + PART_SUFFIX
+    checkpoint_path = dstpath + CHECKPOINT_SUFFIX
+    src_stat = os.stat(srcpath)
+    total = src_stat.st_size
+    source = {'src': srcpath, 'size': total, 'mtime': src_stat.st_mtime}
+
+    offset = _load_checkpoint(checkpoint_path, part_path, source)
+    if offset:
+        logger.info(f"[-] resume copy from {offset} bytes: {dstpath}")
+    resumed = offset
+    start_time = time.monotonic()
+
+    with open(srcpath, 'rb') as fsrc, open(part_path, 'r+b' if offset else 'wb') as fdst:
+        src_fd = fsrc.fileno()
+        dst_fd = fdst.fileno()
+        if offset == 0 and _reflink(src_fd, dst_fd):
+            logger.debug(f"[-] reflink copy {srcpath}")
+            offset = total
+        else:
+            os.ftruncate(dst_fd, offset)
+            offset = _copy_range(src_fd, dst_fd, offset, total, checkpoint_path, source, progress, throttle)
+        os.fsync(dst_fd)
+
+    if offset != total:
+        raise OSError(errno.EIO, f"copy incomplete {offset}/{total}", srcpath)
+    os.replace(part_path, dstpath)
+    _remove(checkpoint_path)
+    elapsed = max(time.monotonic() - start_time, 1e-6)
+    rate = (total - resumed) / elapsed
+    logger.debug(f"[-] copied {total - resumed} bytes in {elapsed:.1f}s ({rate / 1024 / 1024:.1f} MB/s): {dstpath}")
+    if progress:
+        progress(total, total, rate)
+    return dstpath
+
+
+def isRetryableCopyError(e: BaseException) -> bool:
+    """ 复制错误是否可能是暂时的，重试时可从断点续传 """
+    return isinstance(e, OSError) and e.errno in _RETRYABLE_ERRNOS
+
+
+def _copy_range(src_fd: int, dst_fd: int, offset: int, total: int, checkpoint_path: str, source: dict,
+                progress: Optional[ProgressCallback], throttle: Optional[Callable[[int], None]] = None) -> int:
+    """ 从 offset 开始复制到结尾，返回最终偏移 """
+    methods = [_copy_file_range, _sendfile, _read_write]
+    if not hasattr(os, 'copy_file_range'):
+        methods.remove(_copy_file_range)
+    if not hasattr(os, 'sendfile'):
+        methods.remove(_sendfile)
+
+    start_time = time.monotonic()
+    start_offset = offset
+    last_report = start_time
+    last_checkpoint = offset
+    while offset < total:
+        count = min(CHUNK_SIZE, total - offset)
+        try:
+            copied = methods[0](src_fd, dst_fd, offset, count)
+        except OSError as e:
+            if e.errno in _FALLBACK_ERRNOS and len(methods) > 1:
+                logger.debug(f"[-] {methods[0].__name__} unavailable ({e}), fallback")
+                methods.pop(0)
+                continue
+            raise
+        if copied == 0:
+            if os.fstat(src_fd).st_size <= offset:
+                # 源文件在复制过程中被截断
+                break
+            if len(methods) > 1:
+                # 部分 FUSE、overlay 和网络文件系统不支持时返回 0 而不是错误
+                logger.debug(f"[-] {methods[0].__name__} returned 0 before EOF, fallback")
+                methods.pop(0)
+                continue
+            raise OSError(errno.EIO, f"{methods[0].__name__} returned 0 at {offset}/{total}")
+        offset += copied
+        if throttle:
+            throttle(copied)
+
+        if offset - last_checkpoint >= CHECKPOINT_BYTES:
+            os.fsync(dst_fd)
+            _save_checkpoint(checkpoint_path, source, offset)
+            last_checkpoint = offset
+        now = time.monotonic()
+        if progress and now - last_report >= PROGRESS_INTERVAL:
+            progress(offset, total, (offset - start_offset) / max(now - start_time, 1e-6))
+            last_report = now
+    return offset
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _read_write(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    data = os.pread(src_fd, min(count, 8 * 1024 * 1024), offset)
+    written = 0
+    while written < len(data):
+        written += os.pwrite(dst_fd, data[written:], offset + written)
+    return written
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    """ 尝试 reflink，不支持时返回 False """
+    try:
+        import fcntl
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _load_checkpoint(checkpoint_path: str, part_path: str, source: dict) -> int:
+    """ 读取断点，源文件变化或临时文件不完整时从头开始 """
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        part_size = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        _remove(checkpoint_path)
+        return 0
+    offset = checkpoint.get('offset', 0)
+    if any(checkpoint.get(k) != v for k, v in source.items()) or not 0 < offset <= part_size:
+        _remove(checkpoint_path)
+        return 0
+    return offset
+
+
+def _save_checkpoint(checkpoint_path: str, source: dict, offset: int):
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(source, offset=offset), f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -8,6 +8,10 @@ import stat
 import logging
 from enum import Enum as PyEnum
 
+from bonita.utils.dircache import DirListingCache
+from bonita.utils.filecopy import copyFile
+from bonita.utils.iosched import IOScheduler
+
 video_type = set(['.mp4', '.avi', '.rmvb', '.wmv', '.strm',
                   '.mov', '.mkv', '.flv', '.ts', '.m2ts', '.webm', '.iso'])
 subext_type = set(['.ass', '.srt', '.sub', '.ssa', '.smi', '.idx', '.sup',
@@ -30,6 +34,83 @@ class OperationMethod(PyEnum):
     COPY = 4
 
 
+class FileEntry():
+    """ 扫描得到的视频文件条目
+    stat 为扫描时的结果，subs 为同目录下的字幕文件名，同目录文件共享同一份
+    """
+    __slots__ = ('path', 'name', 'ext', 'stat', 'subs')
+
+    def __init__(self, path: str, name: str, ext: str, st: os.stat_result, subs: tuple):
+        self.path = path
+        self.name = name
+        self.ext = ext
+        self.stat = st
+        self.subs = subs
+
+
+def scanVideoEntries(root, escape_folder: list[str] = None, escape_file: list[str] = None):
+    """ 单次遍历 root 目录，逐个返回视频文件条目
+    每个目录只列出一次，每个文件只 stat 一次
+    :param root: 根目录
+    :param escape_folder: 跳过目录列表
+    :param escape_file: 跳过文件列表
+    """
+    escape_folder = set(escape_folder or []) | {'@eaDir'}
+    escape_file = set(escape_file or []) | {'.DS_Store', '.drive_sync'}
+    pending = [root]
+    while pending:
+        folder = pending.pop()
+        try:
+            entries = list(os.scandir(folder))
+        except OSError as e:
+            logger.error(f"[!] scanVideoEntries failed {folder}")
+            logger.error(e)
+            continue
+        videos = []
+        subs = []
+        subdirs = []
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    # 与 os.walk(followlinks=False) 一致，不进入指向目录的符号链接，避免循环链接重复返回
+                    if entry.name not in escape_folder and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    continue
+            except OSError:
+                continue
+            if entry.name in escape_file:
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext in video_type:
+                videos.append((entry, ext))
+            elif ext in subext_type:
+                subs.append(entry.name)
+        subs = tuple(subs)
+        for entry, ext in videos:
+            try:
+                st = entry.stat()
+            except OSError as e:
+                logger.warning(f"[!] stat failed {entry.path}: {e}")
+                continue
+            yield FileEntry(entry.path, entry.name, ext, st, subs)
+        # 保持与 os.walk 相近的顺序
+        pending.extend(reversed(subdirs))
+
+
+def videoEntryOf(filepath) -> FileEntry:
+    """ 单个视频文件的条目，列出所在目录获取字幕文件
+    """
+    folder, name = os.path.split(filepath)
+    subs = []
+    try:
+        for entry in os.scandir(folder or '.'):
+            if os.path.splitext(entry.name)[1].lower() in subext_type:
+                subs.append(entry.name)
+    except OSError as e:
+        logger.warning(f"[!] list folder failed {folder}: {e}")
+    return FileEntry(filepath, name, os.path.splitext(name)[1].lower(), os.stat(filepath), tuple(subs))
+
+
 def findAllFilesWithSuffix(root, suffix, escape_folder: list[str] = [], escape_file: list[str] = []):
     """ 查找root目录下的所有文件
     :param root: 根目录
@@ -82,22 +163,34 @@ def has_video_files(directory_path: str) -> bool:
         return True
 
 
-def cleanFilebyNameSuffix(root, basename, suffixes):
+def _listDir(root, listing: DirListingCache = None):
+    """ 列出目录 [(名称, 是否目录, 是否文件)]，提供 listing 时使用缓存
+    """
+    if listing is not None:
+        return listing.list(root)
+    with os.scandir(root) as entries:
+        return [(entry.name, entry.is_dir(), entry.is_file()) for entry in entries]
+
+
+def cleanFilebyNameSuffix(root, basename, suffixes, listing: DirListingCache = None):
     """ 删除指定目录下文件名以basename开头且后缀匹配的文件
     :param root: 根目录路径
     :param basename: 文件名前缀
     :param suffixes: 文件后缀，可以是单一字符串或字符串集合
+    :param listing: 目录列表缓存
     """
     try:
-        for file in os.scandir(root):
-            path = file.path
-            if file.is_dir():
-                cleanFilebyNameSuffix(path, basename, suffixes)
-            elif file.is_file():
-                fname, ext = os.path.splitext(file.name)
+        for name, is_dir, is_file in _listDir(root, listing):
+            path = os.path.join(root, name)
+            if is_dir:
+                cleanFilebyNameSuffix(path, basename, suffixes, listing)
+            elif is_file:
+                fname, ext = os.path.splitext(name)
                 if ext.lower() in suffixes and fname.startswith(basename):
                     logger.debug(f"Removing file: {path}")
                     os.remove(path)
+                    if listing is not None:
+                        listing.removed(path)
     except PermissionError as e:
         logger.warning(f"Permission denied: {e}")
     except OSError as e:
@@ -133,51 +226,57 @@ def cleanFolderWithoutSuffix(root, suffixes):
     return has_suffix
 
 
-def cleanFilebyFilter(root, filter):
+def cleanFilebyFilter(root, filter, listing: DirListingCache = None):
     """ 根据过滤名删除文件
 
     只当前目录,不递归删除
     未含分集标识的filter不能删除带有分集标识的文件
+    :param listing: 目录列表缓存
     """
     try:
-        dirs = os.scandir(root)
-        for file in dirs:
-            filename = file.name
-            fullpath = file.path
-            if file.is_file():
+        for filename, _, is_file in _listDir(root, listing):
+            fullpath = os.path.join(root, filename)
+            if is_file:
                 if filename.startswith(filter):
                     # 未分集到分集 重复删除分集内容
-                    if '-CD' in filename.upper():
-                        if '-CD' in filter.upper():
-                            logger.info("clean file [{}]".format(fullpath))
-                            os.remove(fullpath)
-                    else:
-                        logger.info("clean file [{}]".format(fullpath))
-                        os.remove(fullpath)
+                    if '-CD' in filename.upper() and '-CD' not in filter.upper():
+                        continue
+                    logger.info("clean file [{}]".format(fullpath))
+                    os.remove(fullpath)
+                    if listing is not None:
+                        listing.removed(fullpath)
     except Exception as e:
         logger.error(f"[-] cleanFilebyFilter failed {root} {filter}")
         logger.error(e)
 
 
-def moveSubs(srcfolder, destfolder, basename, newname, saved=True):
+def moveSubs(srcfolder, destfolder, basename, newname, saved=True, sub_files=None, listing: DirListingCache = None):
     """ 移动字幕
     :param saved    True: 复制字幕  False: 移动字幕
+    :param sub_files 扫描时得到的同目录字幕文件名，为空时重新列出 srcfolder
+    :param listing 目录列表缓存
     """
-    dirs = os.scandir(srcfolder)
-    for file in dirs:
-        filename = file.name
-        filepath = file.path
-        if file.is_dir():
-            continue
+    if sub_files is None:
+        sub_files = [name for name, is_dir, _ in _listDir(srcfolder, listing) if not is_dir]
+    for filename in sub_files:
+        filepath = os.path.join(srcfolder, filename)
         (path, ext) = os.path.splitext(filename)
         if ext.lower() in subext_type and path.startswith(basename):
             newpath = path.replace(basename, newname)
             logger.debug("[-] - copy sub  " + filepath)
             newfile = os.path.join(destfolder, newpath + ext)
-            if saved:
-                shutil.copyfile(filepath, newfile)
-            else:
-                shutil.move(filepath, newfile)
+            try:
+                if saved:
+                    shutil.copyfile(filepath, newfile)
+                else:
+                    shutil.move(filepath, newfile)
+            except FileNotFoundError:
+                logger.debug(f"[!] sub file not found {filepath}")
+                continue
+            if listing is not None:
+                listing.added(newfile)
+                if not saved:
+                    listing.removed(filepath)
             # modify permission
             os.chmod(newfile, stat.S_IRWXU | stat.S_IRGRP |
                      stat.S_IWGRP | stat.S_IROTH | stat.S_IWOTH)
@@ -222,29 +321,53 @@ def checkFileExists(filepath):
         return False
 
 
-def linkFile(srcpath, dstpath, operation: OperationMethod):
+def _sameFileExists(srcpath, dstpath, operation: OperationMethod, src_stat: os.stat_result = None):
+    """ 目标是否已经是源文件的硬链接/软链接
+    每种方式只对目标 stat 一次，源文件优先使用扫描时的 stat
+    """
+    try:
+        if operation == OperationMethod.HARD_LINK:
+            dst_stat = os.stat(dstpath)
+            src_stat = src_stat or os.stat(srcpath)
+            return os.path.samestat(src_stat, dst_stat)
+        if operation == OperationMethod.SYMLINK:
+            return stat.S_ISLNK(os.lstat(dstpath).st_mode) and os.readlink(dstpath) == srcpath
+    except OSError:
+        pass
+    return False
+
+
+def linkFile(srcpath, dstpath, operation: OperationMethod, src_stat: os.stat_result = None, progress=None):
     """ 链接文件
     params: linktype: 操作方式
+    params: src_stat: 扫描时得到的源文件 stat，避免重复 stat
+    params: progress: 复制进度回调 (已复制字节, 总字节, 字节/秒)，仅复制时使用
 
     https://stackoverflow.com/questions/41941401/how-to-find-out-if-a-folder-is-a-hard-link-and-get-its-real-path
     """
-    if os.path.exists(dstpath) and os.path.samefile(srcpath, dstpath) and operation == OperationMethod.HARD_LINK:
-        logger.debug("[!] same file already exists")
-    elif pathlib.Path(dstpath).is_symlink() and os.readlink(dstpath) == srcpath and operation == OperationMethod.SYMLINK:
-        logger.debug("[!] link file already exists")
+    if _sameFileExists(srcpath, dstpath, operation, src_stat):
+        logger.debug("[!] same file or link already exists")
     else:
         dstfolder = os.path.dirname(dstpath)
-        if not os.path.exists(dstfolder):
-            os.makedirs(dstfolder)
+        os.makedirs(dstfolder, exist_ok=True)
         logger.debug("[-] create link from [{}] to [{}]".format(srcpath, dstpath))
+        # 链接和同一设备内的移动只修改元数据，不占用设备槽位；复制按源和目标所在设备排队
         if operation == OperationMethod.SYMLINK:
             forceSymlink(srcpath, dstpath)
         elif operation == OperationMethod.HARD_LINK:
             forceHardlink(srcpath, dstpath)
         elif operation == OperationMethod.MOVE:
-            shutil.move(srcpath, dstpath)
+            src_stat = src_stat or os.stat(srcpath)
+            if src_stat.st_dev != os.stat(dstfolder).st_dev:
+                # 跨设备移动实际为复制，计入速率
+                with IOScheduler().slot(srcpath, dstpath) as throttle:
+                    throttle(src_stat.st_size)
+                    shutil.move(srcpath, dstpath)
+            else:
+                shutil.move(srcpath, dstpath)
         elif operation == OperationMethod.COPY:
-            shutil.copyfile(srcpath, dstpath)
+            with IOScheduler().slot(srcpath, dstpath) as throttle:
+                copyFile(srcpath, dstpath, progress, throttle)
 
 
 def replaceCJK(base: str):
@@ -1,6 +1,8 @@
 import os
 import logging
+from typing import Optional
 
+from bonita.utils.filehelper import FileEntry
 from bonita.utils.regex import extractEpisodeNum, matchEpisodePart, matchSeason, matchSeries
 
 logger = logging.getLogger(__name__)
@@ -9,34 +11,67 @@ logger = logging.getLogger(__name__)
 class BasicFileInfo():
     """ 基础文件信息
     包含相对root路径的中间信息，解析后不再更新
+    使用 __slots__ 减少文件组内大量实例的内存，剧集信息在首次访问时解析，电影任务不再执行剧集正则
     """
+    __slots__ = ('full_path', 'filename', 'stat', 'sub_files', 'root_folder', 'top_folder', 'second_folder',
+                 '_episode', '_flat')
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, entry: Optional[FileEntry] = None):
         """ 初始化文件信息对象
         :param filepath: 文件的完整路径
+        :param entry: 扫描得到的文件条目，携带 stat 和同目录字幕，后续步骤不再重复 stat/列目录
         """
         self.full_path = filepath
-        self.parent_folder = os.path.dirname(self.full_path)
-        self.basefolder = os.path.basename(self.parent_folder)
-        self.filename = os.path.basename(self.full_path)
-        self.basename, self.file_extension = os.path.splitext(self.filename)
+        self.filename = entry.name if entry else os.path.basename(self.full_path)
+        # 扫描时的 stat 和同目录字幕文件名，未经扫描时为 None
+        self.stat: Optional[os.stat_result] = entry.stat if entry else None
+        self.sub_files: Optional[tuple] = entry.subs if entry else None
 
         # 文件路径相关属性
         self.root_folder = ''
         self.top_folder = ''
         self.second_folder = ''
 
-        # 剧集相关属性
-        self.is_episode: bool = False
-        self.original_episode_marker: str = ''
-        self.season_number: int = -1
-        self.episode_number: int = -1
-        self.episode_special: str = ''
-        # 解析剧集信息
-        tmp_season = matchSeason(self.basefolder)
-        if tmp_season:
-            self.season_number = tmp_season
-        self.parse_episode_info()
+        # 剧集信息 (is_episode, original_episode_marker, season_number, episode_number, episode_special)，延迟解析
+        self._episode: Optional[tuple] = None
+        # 文件直接位于根目录，不视为剧集
+        self._flat = False
+
+    @property
+    def parent_folder(self) -> str:
+        return os.path.dirname(self.full_path)
+
+    @property
+    def basefolder(self) -> str:
+        return os.path.basename(os.path.dirname(self.full_path))
+
+    @property
+    def basename(self) -> str:
+        return os.path.splitext(self.filename)[0]
+
+    @property
+    def file_extension(self) -> str:
+        return os.path.splitext(self.filename)[1]
+
+    @property
+    def is_episode(self) -> bool:
+        return False if self._flat else (self._episode or self._episode_info())[0]
+
+    @property
+    def original_episode_marker(self) -> str:
+        return (self._episode or self._episode_info())[1]
+
+    @property
+    def season_number(self) -> int:
+        return (self._episode or self._episode_info())[2]
+
+    @property
+    def episode_number(self) -> int:
+        return -1 if self._flat else (self._episode or self._episode_info())[3]
+
+    @property
+    def episode_special(self) -> str:
+        return '' if self._flat else (self._episode or self._episode_info())[4]
 
     def set_root_folder(self, root_folder):
         """设置根文件夹并解析相对路径
@@ -50,31 +85,34 @@ class BasicFileInfo():
         self.top_folder = segments[0] if segments and segments[0] != '.' else ''
         self.second_folder = segments[1] if len(segments) > 1 and segments[1] != '.' else ''
         if self.top_folder == '' and self.second_folder == '':
-            self.is_episode = False
-            self.episode_number = -1
-            self.episode_special = ''
+            self._flat = True
+
+    def _episode_info(self) -> tuple:
+        if self._episode is None:
+            self.parse_episode_info()
+        return self._episode
 
     def parse_episode_info(self):
-        """解析文件名中的剧集信息"""
+        """解析文件夹和文件名中的剧集信息"""
+        season_number = -1
+        tmp_season = matchSeason(self.basefolder)
+        if tmp_season:
+            season_number = tmp_season
+        basename = self.basename
         # 尝试匹配标准剧集格式, 优先级高于 matchSeason
-        season, episode = matchSeries(self.basename)
+        season, episode = matchSeries(basename)
         if isinstance(season, int) and season > -1 and isinstance(episode, int) and episode > -1:
-            self.is_episode = True
-            self.season_number = season
-            self.episode_number = episode
-            self.original_episode_marker = 'Pass'
+            self._episode = (True, 'Pass', season, episode, '')
             return
 
         # 尝试匹配非标准剧集格式
-        episode_marker = matchEpisodePart(self.basename)
+        episode_marker = matchEpisodePart(basename)
         if episode_marker:
             episode_num, episode_modifier = extractEpisodeNum(episode_marker)
             if episode_num > -1:
-                self.is_episode = True
-                self.episode_number = episode_num
-                self.original_episode_marker = episode_marker
-                if episode_modifier:
-                    self.episode_special = episode_modifier
+                self._episode = (True, episode_marker, season_number, episode_num, episode_modifier or '')
+                return
+        self._episode = (False, '', season_number, -1, '')
 
 
 class TargetFileInfo():
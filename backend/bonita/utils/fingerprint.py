@@ -0,0 +1,38 @@
+import hashlib
+import logging
+
+from bonita.utils.iosched import IOScheduler
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# 当前使用的摘要算法，写入指纹前缀
+FINGERPRINT_ALGO = 'xxh3' if xxhash is not None else 'b2'
+
+
+def fileFingerprint(filepath: str, size: int, sample_bytes: int) -> str:
+    """ 快速内容指纹：大小 + 首尾各 sample_bytes 字节的摘要
+    文件不大于 2 * sample_bytes 时读取全部内容
+    格式: 算法:大小:摘要，不同算法的指纹不会相等
+    """
+    if xxhash is not None:
+        digest = xxhash.xxh3_128()
+    else:
+        digest = hashlib.blake2b(digest_size=16)
+    with IOScheduler().slot(filepath) as throttle, open(filepath, 'rb') as f:
+        if size <= 2 * sample_bytes:
+            data = f.read()
+            digest.update(data)
+            throttle(len(data))
+        else:
+            head = f.read(sample_bytes)
+            f.seek(size - sample_bytes)
+            tail = f.read(sample_bytes)
+            digest.update(head)
+            digest.update(tail)
+            throttle(len(head) + len(tail))
+    return f"{FINGERPRINT_ALGO}:{size}:{digest.hexdigest()}"
@@ -0,0 +1,248 @@
+"""
+按设备调度的文件 I/O
+复制、跨设备移动和指纹读取按源和目标所在设备 (st_dev) 排队，限制每个设备的并发数和字节速率，
+不同设备之间互不影响；链接、重命名和删除只修改元数据，不经过调度；worker 为线程池，单进程内共享
+"""
+import os
+import glob
+import json
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from bonita.core.config import settings
+from bonita.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+# 路径 -> 设备号缓存上限
+DEVICE_CACHE_SIZE = 4096
+# 队列快照写入间隔（秒）
+STATS_INTERVAL = 1.0
+
+
+class _Device:
+    """ 单个设备的并发槽位和速率令牌桶 """
+
+    def __init__(self, dev: int, path: str, concurrency: int, bytes_per_sec: int):
+        self.dev = dev
+        self.path = path
+        self.concurrency = max(1, concurrency)
+        self.bytes_per_sec = max(0, bytes_per_sec)
+        self.active = 0
+        self.waiting = 0
+        self.total_bytes = 0
+        self.cond = threading.Condition()
+        # 令牌桶：最多允许 1 秒的突发
+        self._tokens = float(self.bytes_per_sec)
+        self._updated = time.monotonic()
+        self._rate_lock = threading.Lock()
+
+    def acquire(self):
+        with self.cond:
+            self.waiting += 1
+            try:
+                while self.active >= self.concurrency:
+                    self.cond.wait()
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    def release(self):
+        with self.cond:
+            self.active -= 1
+            self.cond.notify()
+
+    def reserve(self, nbytes: int) -> float:
+        """ 预留字节数，返回需要等待的秒数 """
+        with self._rate_lock:
+            self.total_bytes += nbytes
+            if not self.bytes_per_sec:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(float(self.bytes_per_sec), self._tokens + (now - self._updated) * self.bytes_per_sec)
+            self._updated = now
+            self._tokens -= nbytes
+            return -self._tokens / self.bytes_per_sec if self._tokens < 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'active': self.active,
+            'waiting': self.waiting,
+            'concurrency': self.concurrency,
+            'bytes_per_sec': self.bytes_per_sec,
+            'total_bytes': self.total_bytes,
+        }
+
+
+class IOScheduler(metaclass=Singleton):
+    """ 按设备调度文件 I/O
+
+    配置:
+        IO_DEVICE_CONCURRENCY: 每个设备默认并发数
+        IO_DEVICE_BYTES_PER_SEC: 每个设备默认字节速率，0 表示不限制
+        IO_DEVICE_LIMITS: 指定路径所在设备的限制 {路径: {"concurrency": n, "bytes_per_sec": n}}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[int, _Device] = {}
+        self._dev_cache: Dict[str, int] = {}
+        self._overrides: Optional[Dict[int, dict]] = None
+        self._stats_written = 0.0
+        self._stats_busy = False
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, *paths: str) -> Iterator[Callable[[int], None]]:
+        """ 占用路径所在设备的槽位，返回按字节限速的 throttle(nbytes)
+        多个设备按设备号顺序获取，避免互相等待
+        """
+        devices = sorted({self._device_for(p) for p in paths if p}, key=lambda d: d.dev)
+        for device in devices:
+            device.acquire()
+        self._write_stats(released=False)
+        try:
+            def throttle(nbytes: int):
+                delay = max(device.reserve(nbytes) for device in devices) if devices else 0.0
+                if delay > 0:
+                    time.sleep(delay)
+            yield throttle
+        finally:
+            for device in reversed(devices):
+                device.release()
+            self._write_stats(released=True)
+
+    def stats(self) -> Dict[str, dict]:
+        """ 各设备的队列深度 {设备号: {path, active, waiting, ...}} """
+        with self._lock:
+            devices = list(self._devices.values())
+        return {str(device.dev): device.stats() for device in devices}
+
+    def _device_for(self, path: str) -> _Device:
+        dev, probe = self._stat_dev(path)
+        with self._lock:
+            device = self._devices.get(dev)
+            if device is None:
+                limits = self._limits().get(dev, {})
+                device = _Device(dev, probe,
+                                 int(limits.get('concurrency', settings.IO_DEVICE_CONCURRENCY)),
+                                 int(limits.get('bytes_per_sec', settings.IO_DEVICE_BYTES_PER_SEC)))
+                self._devices[dev] = device
+                logger.debug(f"[-] io device {dev} ({probe}): concurrency {device.concurrency}, "
+                             f"{device.bytes_per_sec} B/s")
+            return device
+
+    def _stat_dev(self, path: str):
+        """ 路径所在设备号，目标不存在时使用最近的上级目录，按目录缓存 """
+        folder = os.path.dirname(os.path.abspath(path))
+        dev = self._dev_cache.get(folder)
+        if dev is not None:
+            return dev, folder
+        probe = os.path.abspath(path)
+        while True:
+            try:
+                dev = os.stat(probe).st_dev
+                break
+            except OSError:
+                parent = os.path.dirname(probe)
+                if parent == probe:
+                    dev = 0
+                    break
+                probe = parent
+        if len(self._dev_cache) >= DEVICE_CACHE_SIZE:
+            self._dev_cache.clear()
+        self._dev_cache[folder] = dev
+        return dev, folder
+
+    def _limits(self) -> Dict[int, dict]:
+        if self._overrides is None:
+            self._overrides = {}
+            for path, limits in (settings.IO_DEVICE_LIMITS or {}).items():
+                try:
+                    self._overrides[os.stat(path).st_dev] = limits
+                except OSError as e:
+                    logger.warning(f"[!] io device limit ignored {path}: {e}")
+        return self._overrides
+
+    def _write_stats(self, released: bool):
+        """ 将队列快照写入文件，供 API 进程读取
+        最多每 STATS_INTERVAL 秒写入一次；上次写入为繁忙状态时，全部空闲后立即写入
+        """
+        if not settings.IO_STATS_LOCATION:
+            return
+        stats = self.stats()
+        busy = any(device['active'] or device['waiting'] for device in stats.values())
+        now = time.monotonic()
+        to_idle = released and self._stats_busy and not busy
+        if not to_idle and now - self._stats_written < STATS_INTERVAL:
+            return
+        if not self._stats_lock.acquire(blocking=False):
+            return
+        try:
+            self._stats_written = now
+            self._stats_busy = busy
+            stats_path = _stats_path(socket.gethostname(), os.getpid())
+            tmp_path = f"{stats_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'host': socket.gethostname(), 'pid': os.getpid(), 'time': time.time(),
+                           'devices': stats}, f)
+            os.replace(tmp_path, stats_path)
+        except OSError as e:
+            logger.debug(f"[!] write io stats failed: {e}")
+        finally:
+            self._stats_lock.release()
+
+
+def _stats_path(host: str, pid: int) -> str:
+    """ 每个 worker 进程单独的快照文件，例如 iostats.json -> iostats.host-123.json """
+    base, ext = os.path.splitext(settings.IO_STATS_LOCATION)
+    return f"{base}.{host}-{pid}{ext}"
+
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def read_io_stats() -> dict:
+    """ 读取各 worker 进程写入的设备队列快照并按设备合并
+    同一设备的队列深度、字节数和限制按进程相加；本机已退出的进程的快照删除
+    """
+    result = {'time': None, 'devices': {}, 'workers': []}
+    if not settings.IO_STATS_LOCATION:
+        return result
+    base, ext = os.path.splitext(settings.IO_STATS_LOCATION)
+    host = socket.gethostname()
+    for path in sorted(glob.glob(f"{glob.escape(base)}.*{ext}")):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            devices = snapshot['devices']
+        except (OSError, ValueError, TypeError, KeyError):
+            continue
+        if snapshot.get('host') == host and not _process_exists(snapshot.get('pid', 0)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        result['workers'].append(snapshot)
+        result['time'] = max(result['time'] or 0, snapshot.get('time', 0))
+        for dev, stats in devices.items():
+            merged = result['devices'].get(dev)
+            if merged is None:
+                result['devices'][dev] = dict(stats)
+                continue
+            for key in ('active', 'waiting', 'concurrency', 'bytes_per_sec', 'total_bytes'):
+                merged[key] = merged.get(key, 0) + stats.get(key, 0)
+    return result
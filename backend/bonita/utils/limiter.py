@@ -0,0 +1,186 @@
+"""
+分布式并发限制
+按命名池 (transfer / scraping / image) 限制整个部署内同时执行的任务数
+- 配置 Redis 时使用 Redis 有序集合保存租约，所有 worker 进程/节点共享额度
+- 未配置 Redis 或 MAX_CONCURRENCY=1 时退化为进程内信号量
+租约带过期时间，持有期间后台续期，worker 崩溃后自动释放
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from bonita.core.config import settings
+from bonita.utils.singleton import Singleton
+
+logger = logging.getLogger(__name__)
+
+# 命名池
+POOL_TRANSFER = 'transfer'
+POOL_SCRAPING = 'scraping'
+POOL_IMAGE = 'image'
+
+# 等待额度时的轮询间隔上限（秒）
+MAX_POLL_INTERVAL = 1.0
+
+# KEYS[1]: 池, ARGV: 当前时间, 过期时间, 上限, 租约ID
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[4])
+    return 1
+end
+return 0
+"""
+
+
+class _LocalBackend:
+    """ 进程内信号量 """
+
+    def __init__(self):
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, pool: str, limit: int, lease_id: str, lease_seconds: int, timeout: Optional[float]) -> bool:
+        with self._lock:
+            semaphore = self._semaphores.get(pool)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[pool] = semaphore
+        return semaphore.acquire(timeout=timeout)
+
+    def renew(self, pool: str, lease_id: str, lease_seconds: int) -> bool:
+        return True
+
+    def release(self, pool: str, lease_id: str):
+        self._semaphores[pool].release()
+
+    def usage(self, pool: str) -> int:
+        semaphore = self._semaphores.get(pool)
+        if semaphore is None:
+            return 0
+        return semaphore._initial_value - semaphore._value
+
+
+class _RedisBackend:
+    """ Redis 有序集合租约，score 为过期时间 """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._acquire = self._client.register_script(_ACQUIRE_SCRIPT)
+
+    @staticmethod
+    def _key(pool: str) -> str:
+        return f"bonita:limiter:{pool}"
+
+    def acquire(self, pool: str, limit: int, lease_id: str, lease_seconds: int, timeout: Optional[float]) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = 0.05
+        while True:
+            now = time.time()
+            if self._acquire(keys=[self._key(pool)], args=[now, now + lease_seconds, limit, lease_id]):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+    def renew(self, pool: str, lease_id: str, lease_seconds: int) -> bool:
+        # 仅更新仍存在的租约；已过期被清理时返回 False
+        return bool(self._client.zadd(self._key(pool), {lease_id: time.time() + lease_seconds}, xx=True, ch=True))
+
+    def release(self, pool: str, lease_id: str):
+        self._client.zrem(self._key(pool), lease_id)
+
+    def usage(self, pool: str) -> int:
+        key = self._key(pool)
+        self._client.zremrangebyscore(key, '-inf', time.time())
+        return self._client.zcard(key)
+
+
+class ConcurrencyLimiter(metaclass=Singleton):
+    """ 命名池并发限制
+
+    配置:
+        LIMITER_REDIS_URL: Redis 地址，为空时使用 redis:// 形式的 CELERY_BROKER_URL，均不可用时使用进程内信号量
+        LIMITER_POOLS: 各池上限 {"transfer": n, "scraping": n, "image": n}
+        LIMITER_LEASE_SECONDS: 租约有效期，持有期间每 1/3 有效期续期一次
+    """
+
+    def __init__(self):
+        self._backend = self._create_backend()
+        self._leases: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _create_backend():
+        if os.environ.get("MAX_CONCURRENCY") == "1":
+            return _LocalBackend()
+        url = settings.LIMITER_REDIS_URL
+        if not url:
+            broker = os.environ.get("CELERY_BROKER_URL", settings.CELERY_BROKER_URL)
+            if broker.startswith(("redis://", "rediss://")):
+                url = broker
+        if not url:
+            return _LocalBackend()
+        try:
+            backend = _RedisBackend(url)
+            backend._client.ping()
+            logger.info("[-] concurrency limiter uses redis")
+            return backend
+        except Exception as e:
+            logger.warning(f"[!] redis limiter unavailable, fallback to local: {e}")
+            return _LocalBackend()
+
+    def limit(self, pool: str) -> int:
+        """ 池上限，未配置的池使用 MAX_CONCURRENT_TASKS """
+        return max(1, int(settings.LIMITER_POOLS.get(pool, settings.MAX_CONCURRENT_TASKS)))
+
+    @contextmanager
+    def slot(self, pool: str, timeout: Optional[float] = None) -> Iterator[None]:
+        """ 占用池中的一个额度，超时抛出 TimeoutError """
+        lease_id = f"{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        lease_seconds = settings.LIMITER_LEASE_SECONDS
+        if not self._backend.acquire(pool, self.limit(pool), lease_id, lease_seconds, timeout):
+            raise TimeoutError(f"concurrency pool {pool} is full")
+        if not isinstance(self._backend, _LocalBackend):
+            with self._lock:
+                self._leases[lease_id] = pool
+                self._start_heartbeat()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._leases.pop(lease_id, None)
+            self._backend.release(pool, lease_id)
+
+    def usage(self) -> Dict[str, dict]:
+        """ 各池使用情况 """
+        pools = {POOL_TRANSFER, POOL_SCRAPING, POOL_IMAGE} | set(settings.LIMITER_POOLS)
+        return {pool: {'limit': self.limit(pool), 'used': self._backend.usage(pool)} for pool in sorted(pools)}
+
+    def _start_heartbeat(self):
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        self._heartbeat = threading.Thread(target=self._renew_loop, name="limiter-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(max(1, settings.LIMITER_LEASE_SECONDS // 3))
+            with self._lock:
+                leases = list(self._leases.items())
+                if not leases:
+                    self._heartbeat = None
+                    return
+            for lease_id, pool in leases:
+                try:
+                    if not self._backend.renew(pool, lease_id, settings.LIMITER_LEASE_SECONDS):
+                        logger.warning(f"[!] lease expired before renew: {pool} {lease_id}")
+                except Exception as e:
+                    logger.warning(f"[!] renew lease failed: {e}")
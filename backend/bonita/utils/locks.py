@@ -0,0 +1,21 @@
+from threading import Lock
+from typing import Dict, Hashable
+
+
+class KeyedLock:
+    """ 按键分配的锁
+    相同键的操作串行执行，不同键互不影响
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, Lock] = {}
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Lock:
+        """ 获取键对应的锁 """
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = Lock()
+                self._locks[key] = lock
+            return lock
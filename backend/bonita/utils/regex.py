@@ -1,14 +1,68 @@
 # -*- coding: utf-8 -*-
 
 import re
+from functools import lru_cache
+
+# regexMatch 使用的匹配模式
+REGEX_FLAGS = re.IGNORECASE | re.X | re.S
+# 文件夹季度解析结果缓存数量，同一文件夹下的文件共用结果
+SEASON_CACHE_SIZE = 4096
+
+# 季度范围 S01-S05 和合集，不解析季度
+_SEASON_SKIP = re.compile(r'S\d+-S\d+|COMPLETE.PACK|COMPLETE.SERIES|COMPLETE.COLLECTION', re.IGNORECASE)
+_SEASON_MARK = re.compile(r'S\d+|Season|第.季', re.IGNORECASE)
+_MOVIE_YEAR_RES = re.compile(r'(?:19|20)\d{2}.*(?:1080p|720p|480p|2160p)')
+
+# (必须包含的字符, 正则)，文件名 casefold 后不包含时跳过该正则
+_SEASON_REGEXS = (
+    ('s', re.compile(r"[Ss](\d{1,2})(?!\d)(?!\-[Ss]\d+)(?:[Ee]\d+)?", REGEX_FLAGS)),    # Match S01 or s01 but not if part of a range S01-S05
+    ('season', re.compile(r"[Ss]eason[\s._]?(\d{1,2})(?!\d)", REGEX_FLAGS)),             # Match Season 1 format
+    ('季', re.compile(r"第(\d{1,2})季", REGEX_FLAGS)),                                     # Match Chinese numeric season
+    ('季', re.compile(r"第([一二三四五六七八九十])季", REGEX_FLAGS)),                         # Match Chinese text numbers
+)
+_CHINESE_NUMS = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5,
+                 "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
+
+_SXXEXX = re.compile(r'[Ss]\d{1,2}([Ee]\d{1,3})')
+_EPISODE_REGEXS = (
+    ('[', re.compile(r"\[(\d{1,3}(?:\d+)?(?:v\d+)?(?:\(oa\)|\(video\))?)\]", REGEX_FLAGS)),
+    ('e', re.compile(r"[\[\. ]ep?[0-9\(\)videoa]*[\[\. ]", REGEX_FLAGS)),                  # 匹配空格+E+数字+空格
+    ('', re.compile(r"[\[\. ]\d{1,3}(?:\.\d|v\d)?[\(\)videoa]*[\[\. ]", REGEX_FLAGS)),    # 匹配空格+数字(可能带小数或v2等版本)+空格
+    ('e', re.compile(r"(?<=[\.\s])[Ee]\d{1,3}(?=[\.\s])", REGEX_FLAGS)),                   # 匹配独立的 E05 (前后有点或空格)
+    ('第', re.compile(r"第\d*[話话集期]", REGEX_FLAGS)),                                    # 匹配中文集数标记
+    ('e', re.compile(r"(?<=[^a-zA-Z0-9])E\d{1,3}", REGEX_FLAGS)),                          # 匹配前面非字母数字的 E05
+    ('of', re.compile(r"[\[\. ]\d+of\d+[\]\. ,]", REGEX_FLAGS)),                            # 匹配 .1of8. 格式
+    ('part', re.compile(r"[\[\. ]Part\d+[\[\. ]", REGEX_FLAGS)),                            # 匹配 .Part2. 格式
+)
+
+_EP_BRACKET = re.compile(r"(?:第|ep|e)?(\d+)\(([^)]+)\)")
+_EP_DECIMAL = re.compile(r"(?:第|ep|e)?(\d+)\.(\d+)")
+_EP_VERSION = re.compile(r"(?:第|ep|e)?(\d+)v(\d+)")
+_EP_PART = re.compile(r"(?:part|部分)(\d+)")
+_EP_OF = re.compile(r"(\d+)of\d+")
+_EP_STANDARD = re.compile(r"(?:第|ep|e)?(\d+)(?:[期集話话])?$")
+_EP_DIGITS = re.compile(r"\d+")
+
+_SERIES_REGEXS = (
+    re.compile(r"[Ss](\d{1,2})[Ee](\d{1,4})", REGEX_FLAGS),            # 标准 S01E01 格式
+    re.compile(r"[Ss]eason[\s.]?(\d{1,2})[\s.]?[Ee]p(?:isode)?[\s.]?(\d{1,4})", REGEX_FLAGS),  # Season 1 Episode 1
+    re.compile(r"第(\d{1,2})季第(\d{1,4})[集话期]", REGEX_FLAGS),        # 中文格式
+)
+
+# 均锚定在开头，合并为一个正则，按分支顺序依次尝试：
+# 数字开头后面跟分隔符和非数字内容 | EP01 或 E01 格式 | 中文集数表示
+_SIMPLE_EP = re.compile(r"^(?:(\d{1,3}) ?(?:_|-|.)? ?[^\W\d]+|[Ee][Pp]?(\d{1,3})|第(\d{1,3})[集话期])")
+
+
+@lru_cache(maxsize=256)
+def _compile(reg):
+    return re.compile(reg, REGEX_FLAGS)
 
 
 def regexMatch(basename, reg):
-    """ 正则匹配
+    """ 正则匹配，编译结果缓存
     """
-    prog = re.compile(reg, re.IGNORECASE | re.X | re.S)
-    result = prog.findall(basename)
-    return result
+    return _compile(reg).findall(basename)
 
 
 def matchSeason(filename: str):
@@ -32,34 +86,28 @@ def matchSeason(filename: str):
     >>> matchSeason("Series.2019.S01E02.1080p") 
     1
     """
-    # Skip ranges like S01-S05
-    if re.search(r'S\d+-S\d+', filename, re.IGNORECASE):
-        return None
+    return _matchSeasonCached(filename)
 
-    # Skip if it's a COMPLETE PACK or similar
-    if re.search(r'COMPLETE.PACK|COMPLETE.SERIES|COMPLETE.COLLECTION', filename, re.IGNORECASE):
+
+@lru_cache(maxsize=SEASON_CACHE_SIZE)
+def _matchSeasonCached(filename: str):
+    if _SEASON_SKIP.search(filename):
         return None
 
     # Check if it's a movie (year followed by resolution without season info)
     # But make sure it's not interfering with S01E02 type patterns
-    if not re.search(r'S\d+|Season|第.季', filename, re.IGNORECASE) and re.search(r'(?:19|20)\d{2}.*(?:1080p|720p|480p|2160p)', filename):
+    if not _SEASON_MARK.search(filename) and _MOVIE_YEAR_RES.search(filename):
         return None
 
-    regexs = [
-        r"[Ss](\d{1,2})(?!\d)(?!\-[Ss]\d+)(?:[Ee]\d+)?",    # Match S01 or s01 but not if part of a range S01-S05
-        r"[Ss]eason[\s._]?(\d{1,2})(?!\d)",                 # Match Season 1 format
-        r"第(\d{1,2})季",                                    # Match Chinese numeric season
-        r"第([一二三四五六七八九十])季",                        # Match Chinese text numbers
-    ]
-
-    for regex in regexs:
-        nameresult = regexMatch(filename, regex)
+    folded = filename.casefold()
+    for literal, prog in _SEASON_REGEXS:
+        if literal not in folded:
+            continue
+        nameresult = prog.findall(filename)
         if nameresult and len(nameresult) == 1:
             # Handle Chinese text numbers
-            if nameresult[0] in "一二三四五六七八九十":
-                chinese_nums = {"一": 1, "二": 2, "三": 3, "四": 4, "五": 5,
-                                "六": 6, "七": 7, "八": 8, "九": 9, "十": 10}
-                return chinese_nums.get(nameresult[0])
+            if nameresult[0] in _CHINESE_NUMS:
+                return _CHINESE_NUMS[nameresult[0]]
             return int(nameresult[0])
     return None
 
@@ -131,23 +179,15 @@ def matchEpisodePart(basename):
     'E05'
     """
     # 先尝试匹配S01E05格式的E05部分
-    sxxexx_match = re.search(r'[Ss]\d{1,2}([Ee]\d{1,3})', basename)
+    sxxexx_match = _SXXEXX.search(basename)
     if sxxexx_match:
         return sxxexx_match.group(1)
 
-    regexs = [
-        r"\[(\d{1,3}(?:\d+)?(?:v\d+)?(?:\(oa\)|\(video\))?)\]",
-        r"[\[\. ]ep?[0-9\(\)videoa]*[\[\. ]",                       # 匹配空格+E+数字+空格
-        r"[\[\. ]\d{1,3}(?:\.\d|v\d)?[\(\)videoa]*[\[\. ]",         # 匹配空格+数字(可能带小数或v2等版本)+空格
-        r"(?<=[\.\s])[Ee]\d{1,3}(?=[\.\s])",                        # 匹配独立的 E05 (前后有点或空格)
-        r"第\d*[話话集期]",                                         # 匹配中文集数标记
-        r"(?<=[^a-zA-Z0-9])E\d{1,3}",                               # 匹配前面非字母数字的 E05
-        r"[\[\. ]\d+of\d+[\]\. ,]",                                 # 匹配 .1of8. 格式
-        r"[\[\. ]Part\d+[\[\. ]",                                   # 匹配 .Part2. 格式
-    ]
-
-    for regex in regexs:
-        results = regexMatch(basename, regex)
+    folded = basename.casefold()
+    for literal, prog in _EPISODE_REGEXS:
+        if literal not in folded:
+            continue
+        results = prog.findall(basename)
         if results and len(results) == 1:
             return results[0]
 
@@ -183,25 +223,25 @@ def extractEpisodeNum(single: str):
         return (-1, None)
     clean_str = single.strip("'\"[]., \t").lower()
     # 处理带括号的情况，如 01(video), E02(OA)
-    if match := re.search(r"(?:第|ep|e)?(\d+)\(([^)]+)\)", clean_str):
+    if match := _EP_BRACKET.search(clean_str):
         return (int(match.group(1)), match.group(2).lower())
     # 处理带小数点的情况，如 13.5
-    if match := re.search(r"(?:第|ep|e)?(\d+)\.(\d+)", clean_str):
+    if match := _EP_DECIMAL.search(clean_str):
         return (int(match.group(1)), match.group(2))
     # 处理带v版本的情况，如 01v2
-    if match := re.search(r"(?:第|ep|e)?(\d+)v(\d+)", clean_str):
+    if match := _EP_VERSION.search(clean_str):
         return (int(match.group(1)), f"v{match.group(2)}")
     # 处理Part格式: Part2
-    if match := re.search(r"(?:part|部分)(\d+)", clean_str):
+    if match := _EP_PART.search(clean_str):
         return (int(match.group(1)), None)
     # 处理of格式: 1of8
-    if match := re.search(r"(\d+)of\d+", clean_str):
+    if match := _EP_OF.search(clean_str):
         return (int(match.group(1)), None)
     # 处理标准格式: 第01集, 第013話, EP01, 01
-    if match := re.search(r"(?:第|ep|e)?(\d+)(?:[期集話话])?$", clean_str):
+    if match := _EP_STANDARD.search(clean_str):
         return (int(match.group(1)), None)
     # 最后尝试提取任何数字
-    if match := re.search(r"\d+", clean_str):
+    if match := _EP_DIGITS.search(clean_str):
         return (int(match.group(0)), None)
     return (-1, None)
 
@@ -213,18 +253,11 @@ def matchSeries(basename):
     >>> matchSeries("Friends.S01E22.1080p.BluRay")
     (1, 22)
     """
-    regexs = [
-        r"[Ss](\d{1,2})[Ee](\d{1,4})",            # 标准 S01E01 格式
-        r"[Ss]eason[\s.]?(\d{1,2})[\s.]?[Ee]p(?:isode)?[\s.]?(\d{1,4})",  # Season 1 Episode 1
-        r"第(\d{1,2})季第(\d{1,4})[集话期]",        # 中文格式
-    ]
-
-    for regstr in regexs:
-        results = regexMatch(basename, regstr)
-        if results and len(results) > 0:
-            season = int(results[0][0])
-            ep = int(results[0][1])
-            return season, ep
+    for prog in _SERIES_REGEXS:
+        # 只取第一个匹配
+        match = prog.search(basename)
+        if match:
+            return int(match.group(1)), int(match.group(2))
     return None, None
 
 
@@ -261,23 +294,10 @@ def simpleMatchEp(basename: str):
     if basename.isdigit():
         return int(basename)
 
-    # 匹配常见的几种集数格式
-    regexs = [
-        r"^(\d{1,3}) ?(_|-|.)? ?([^\W\d]+)",  # 数字开头后面跟分隔符和非数字内容
-        r"^[Ee][Pp]?(\d{1,3})",              # EP01 或 E01 格式
-        r"^第(\d{1,3})[集话期]",               # 中文集数表示
-    ]
-
-    for regstr in regexs:
-        results = re.findall(regstr, basename)
-        if results and len(results) >= 1:
-            # 根据正则表达式的不同，提取相应位置的数字
-            if '集' in regstr or '话' in regstr or '期' in regstr or '[Ee]' in regstr:
-                epnum = int(results[0])
-            else:
-                epnum = int(results[0][0])
-            return epnum
-
+    match = _SIMPLE_EP.match(basename)
+    if match:
+        # 根据匹配的分支，提取相应位置的数字
+        return int(match.group(1) or match.group(2) or match.group(3))
     return None
 
 
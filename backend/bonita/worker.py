@@ -102,6 +102,11 @@ def create_celery():
             "schedule": 86400.0,  # 24 hours in seconds
             "args": (None, 30, 100),  # sources=None, days=30, limit=100
         },
+        # Remove abandoned partial copies daily
+        "clean-partials-daily": {
+            "task": "clean:partials",
+            "schedule": 86400.0,
+        },
     }
 
     return celery
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# 配置在导入 bonita 之前通过环境变量指向临时目录，不读写 ./data
+_DATA_DIR = tempfile.mkdtemp(prefix='bonita-test-')
+_DATABASE_LOCATION = os.path.join(_DATA_DIR, 'db.sqlite3')
+os.environ['BONITA_CONFIG'] = os.path.join(_DATA_DIR, 'config.yaml')
+os.environ['DATABASE_LOCATION'] = _DATABASE_LOCATION
+os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{_DATABASE_LOCATION}'
+os.environ['CELERY_BROKER_URL'] = 'memory://'
+os.environ['CELERY_RESULT_BACKEND'] = 'cache+memory://'
+os.environ['CACHE_LOCATION'] = os.path.join(_DATA_DIR, 'cache')
+os.environ['IO_STATS_LOCATION'] = os.path.join(_DATA_DIR, 'iostats.json')
+os.environ['LOGGING_LOCATION'] = os.path.join(_DATA_DIR, 'bonita.log')
+os.environ['MAX_CONCURRENCY'] = '1'
+
+from bonita.db import Base, SessionFactory, engine  # noqa: E402
+from bonita.db.models import *  # noqa: E402,F401,F403
+
+
+def pytest_sessionfinish(session, exitstatus):
+    engine.dispose()
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """ 每个测试使用新建的数据库表 """
+    Base.metadata.create_all(bind=engine)
+    session = SessionFactory()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def celery_eager():
+    """ 在当前进程中同步执行 Celery 任务 """
+    from bonita.worker import celery
+    celery.conf.task_always_eager = True
+    yield celery
+    celery.conf.task_always_eager = False
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """ 源文件夹和目标文件夹 """
+    src = tmp_path / 'source'
+    out = tmp_path / 'output'
+    src.mkdir()
+    out.mkdir()
+    return str(src), str(out)
@@ -0,0 +1,56 @@
+import os
+
+from bonita.db.models.record import TransRecords
+from bonita.services.clean_service import CleanService
+from bonita.services.run_service import TransferRunService
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('x')
+    return path
+
+
+def _record(db, srcpath, destpath):
+    record = TransRecords(srcname=os.path.basename(srcpath), srcpath=srcpath, srcfolder=os.path.dirname(srcpath),
+                          task_id=1, success=True, destpath=destpath)
+    db.add(record)
+    return record
+
+
+def test_clean_removes_only_files_missing_from_run(db, tmp_path):
+    out = str(tmp_path / 'output')
+    kept = _touch(os.path.join(out, 'Show', 'Season 1', 'Show.S01E01.mkv'))
+    # 同一目录下不属于本次结果的视频
+    stray = _touch(os.path.join(out, 'Show', 'Season 1', 'Show.S01E99.mkv'))
+    subtitle = _touch(os.path.join(out, 'Show', 'Season 1', 'Show.S01E01.chs.srt'))
+    # 源文件已删除的记录，所在文件夹只有这一个视频
+    removed = _touch(os.path.join(out, 'Movie (2020)', 'Movie (2020).mkv'))
+    # 本次运行未涉及的目录不检查
+    untouched = _touch(os.path.join(out, 'Other', 'Other.mkv'))
+    kept_record = _record(db, '/src/Show.S01E01.mkv', kept)
+    removed_record = _record(db, '/src/Movie.2020.mkv', removed)
+    db.commit()
+
+    run_service = TransferRunService(db)
+    run_service.add('run', [kept])
+    db.commit()
+
+    service = CleanService(db)
+    report = service.plan(out, 'run')
+    assert report.orphans == sorted([removed, stray])
+    assert report.folders == [os.path.join(out, 'Movie (2020)')]
+    assert report.records == [removed_record.id]
+    # 生成报告不修改文件
+    assert os.path.exists(removed) and os.path.exists(stray)
+
+    service.execute(report)
+    assert not os.path.exists(removed)
+    assert not os.path.exists(stray)
+    assert not os.path.exists(os.path.join(out, 'Movie (2020)'))
+    for path in (kept, subtitle, untouched):
+        assert os.path.exists(path)
+    db.expire_all()
+    assert db.get(TransRecords, removed_record.id).deleted
+    assert not db.get(TransRecords, kept_record.id).deleted
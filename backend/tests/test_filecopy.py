@@ -0,0 +1,23 @@
+import errno
+import os
+
+from bonita.utils import filecopy
+
+
+def test_copy_falls_back_when_method_returns_zero(tmp_path, monkeypatch):
+    src = tmp_path / 'src.mkv'
+    src.write_bytes(os.urandom(4096))
+    dst = tmp_path / 'dst.mkv'
+    monkeypatch.setattr(filecopy, '_reflink', lambda src_fd, dst_fd: False)
+    monkeypatch.setattr(filecopy, '_copy_file_range', lambda src_fd, dst_fd, offset, count: 0)
+
+    filecopy.copyFile(str(src), str(dst))
+
+    assert dst.read_bytes() == src.read_bytes()
+    assert not os.path.exists(str(dst) + filecopy.PART_SUFFIX)
+
+
+def test_retryable_copy_errors():
+    assert filecopy.isRetryableCopyError(OSError(errno.EIO, 'Input/output error'))
+    assert not filecopy.isRetryableCopyError(OSError(errno.ENOSPC, 'No space left on device'))
+    assert not filecopy.isRetryableCopyError(ValueError('not an OSError'))
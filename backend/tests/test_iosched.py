@@ -0,0 +1,68 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from bonita.core.config import settings
+from bonita.utils.filehelper import OperationMethod, linkFile
+from bonita.utils.iosched import IOScheduler, _stats_path, read_io_stats
+
+
+def test_link_does_not_wait_for_busy_device(tmp_path):
+    src = tmp_path / 'src.mkv'
+    src.write_bytes(b'x')
+    release = threading.Event()
+    held = threading.Barrier(settings.IO_DEVICE_CONCURRENCY + 1)
+
+    def hold_slot():
+        with IOScheduler().slot(str(src)):
+            held.wait()
+            release.wait(5)
+
+    # 占满设备槽位，模拟正在进行的大文件复制
+    holders = [threading.Thread(target=hold_slot) for _ in range(settings.IO_DEVICE_CONCURRENCY)]
+    for holder in holders:
+        holder.start()
+    held.wait()
+    try:
+        done = threading.Event()
+        worker = threading.Thread(target=lambda: (
+            linkFile(str(src), str(tmp_path / 'out' / 'hard.mkv'), OperationMethod.HARD_LINK),
+            linkFile(str(src), str(tmp_path / 'out' / 'soft.mkv'), OperationMethod.SYMLINK),
+            done.set()))
+        worker.start()
+        assert done.wait(2)
+        assert os.path.samefile(src, tmp_path / 'out' / 'hard.mkv')
+        assert os.path.islink(tmp_path / 'out' / 'soft.mkv')
+    finally:
+        release.set()
+        for holder in holders:
+            holder.join()
+
+
+def _snapshot(pid, devices):
+    with open(_stats_path(socket.gethostname(), pid), 'w', encoding='utf-8') as f:
+        json.dump({'host': socket.gethostname(), 'pid': pid, 'time': time.time(), 'devices': devices}, f)
+    return _stats_path(socket.gethostname(), pid)
+
+
+def test_io_stats_are_merged_across_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'IO_STATS_LOCATION', str(tmp_path / 'iostats.json'))
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    device = {'path': '/data', 'active': 1, 'waiting': 2, 'concurrency': 2, 'bytes_per_sec': 0, 'total_bytes': 10}
+    _snapshot(os.getpid(), {'42': device})
+    _snapshot(os.getppid(), {'42': device, '43': dict(device, path='/media')})
+    dead = _snapshot(exited.pid, {'42': device})
+
+    stats = read_io_stats()
+
+    assert len(stats['workers']) == 2
+    assert stats['devices']['42']['active'] == 2
+    assert stats['devices']['42']['waiting'] == 4
+    assert stats['devices']['42']['total_bytes'] == 20
+    assert stats['devices']['43']['path'] == '/media'
+    assert not os.path.exists(dead)
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+from bonita.db.models.run import TransferRun, TransferRunPath
+from bonita.services.run_service import RUN_RETENTION, TransferRunService
+
+
+def _age(db, run_id, age):
+    """ 将运行及其结果的时间提前 age """
+    past = datetime.now() - age
+    db.query(TransferRunPath).filter(TransferRunPath.run_id == run_id).update({TransferRunPath.createtime: past})
+    db.query(TransferRun).filter(TransferRun.run_id == run_id).update(
+        {TransferRun.createtime: past, TransferRun.updatetime: past})
+    db.commit()
+
+
+def test_purge_keeps_long_running_active_run(db):
+    service = TransferRunService(db)
+    service.add('long', ['/out/a.mkv'])
+    db.commit()
+    _age(db, 'long', RUN_RETENTION * 2)
+    # 仍在进行的运行继续写入结果
+    service.add('long', ['/out/b.mkv'])
+    db.commit()
+
+    assert service.purge_expired() == 0
+    assert sorted(service.iter_paths('long')) == ['/out/a.mkv', '/out/b.mkv']
+
+
+def test_purge_removes_abandoned_run(db):
+    service = TransferRunService(db)
+    service.add('abandoned', ['/out/a.mkv', '/out/b.mkv'])
+    service.add('current', ['/out/c.mkv'])
+    db.commit()
+    _age(db, 'abandoned', RUN_RETENTION + timedelta(hours=1))
+
+    assert service.purge_expired() == 2
+    assert list(service.iter_paths('abandoned')) == []
+    assert list(service.iter_paths('current')) == ['/out/c.mkv']
+    assert db.query(TransferRun).filter(TransferRun.run_id == 'abandoned').count() == 0
+
+
+def test_clear_removes_run(db):
+    service = TransferRunService(db)
+    service.add('done', ['/out/a.mkv'])
+    db.commit()
+
+    assert service.clear('done') == 1
+    assert service.count('done') == 0
+    assert db.query(TransferRun).count() == 0
@@ -0,0 +1,69 @@
+import os
+
+from bonita.celery_tasks import tasks
+from bonita.core.config import settings
+from bonita.db.models.record import TransRecords
+from bonita.services.fingerprint_service import DUPLICATE_LINK
+
+
+def _task(src, out):
+    return dict(id=1, name='movies', description='', source_folder=src, output_folder=out, content_type=1,
+                operation=1, clean_others=False, optimize_name=False, escape_folder='', escape_literals='',
+                escape_size=0, threads_num=2)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def _record(db, srcpath):
+    db.expire_all()
+    return db.query(TransRecords).filter(TransRecords.srcpath == srcpath).one()
+
+
+def test_duplicate_link_keeps_original_on_force_rerun(db, celery_eager, folders, monkeypatch):
+    monkeypatch.setattr(settings, 'TRANSFER_DUPLICATES', DUPLICATE_LINK)
+    src, out = folders
+    original = os.path.join(src, 'Movie.A.2020', 'Movie.A.2020.mkv')
+    duplicate = os.path.join(src, 'Movie.B.2021', 'Movie.B.2021.mkv')
+    _write(original, b'same content' * 100)
+    task = _task(src, out)
+    tasks.celery_transfer_entry.apply(args=[task]).get()
+    original_dest = _record(db, original).destpath
+    assert original_dest and os.path.exists(original_dest)
+
+    _write(duplicate, b'same content' * 100)
+    tasks.celery_transfer_entry.apply(args=[task]).get()
+    record = _record(db, duplicate)
+    assert record.success
+    assert record.destpath == ''
+    assert record.duplicate_of == original_dest
+
+    tasks.celery_transfer_entry.apply(args=[task, True]).get()
+    assert os.path.exists(original_dest)
+    assert _record(db, original).destpath == original_dest
+    assert _record(db, duplicate).duplicate_of == original_dest
+
+
+def test_shared_old_destpath_is_not_removed(db, celery_eager, folders):
+    src, out = folders
+    original = os.path.join(src, 'Movie.A.2020', 'Movie.A.2020.mkv')
+    other = os.path.join(src, 'Movie.B.2021', 'Movie.B.2021.mkv')
+    _write(original, b'original')
+    task = _task(src, out)
+    tasks.celery_transfer_entry.apply(args=[task]).get()
+    original_dest = _record(db, original).destpath
+
+    # 另一条记录指向同一目标，例如旧版本按重复内容写入的 destpath
+    _write(other, b'other')
+    db.add(TransRecords(srcname=os.path.basename(other), srcpath=other, srcfolder=os.path.dirname(other),
+                        task_id=1, success=True, destpath=original_dest))
+    db.commit()
+    # 增量运行只处理新增的文件，原目标不会被重新链接
+    tasks.celery_transfer_entry.apply(args=[task]).get()
+
+    other_dest = _record(db, other).destpath
+    assert other_dest != original_dest and os.path.exists(other_dest)
+    assert os.path.exists(original_dest)
@@ -0,0 +1,43 @@
+import os
+
+from watchdog.events import FileSystemEventHandler
+
+from bonita.modules.monitor.watcher import SharedObserver
+
+
+def test_failed_parent_watch_falls_back_to_children(tmp_path):
+    parent = tmp_path / 'media'
+    child = parent / 'tv'
+    child.mkdir(parents=True)
+    parent_path = os.path.realpath(parent)
+    child_path = os.path.realpath(child)
+
+    observer = SharedObserver()
+    observer.start()
+    try:
+        schedule = observer._observer.schedule
+
+        def failing_schedule(handler, path, recursive=False):
+            # 模拟上层路径达到 max_user_watches 等注册失败
+            if path == parent_path:
+                raise OSError(28, 'inotify watch limit reached')
+            return schedule(handler, path, recursive=recursive)
+
+        observer._observer.schedule = failing_schedule
+        handler = FileSystemEventHandler()
+        observer.subscribe(str(parent), 'parent', handler)
+        observer.subscribe(str(child), 'child', handler)
+
+        assert list(observer.watch_counts()) == [child_path]
+        status = observer.get_status()
+        assert status['unwatched'] == [{'task_id': 'parent', 'folder_path': str(parent)}]
+        assert status['watches'][0]['subscriptions'] == [{'task_id': 'child', 'folder_path': str(child)}]
+
+        # 上层路径恢复后由其覆盖，注销下层路径的监听
+        observer._observer.schedule = schedule
+        observer.unsubscribe(str(child), 'child')
+        observer.subscribe(str(child), 'child', handler)
+        assert list(observer.watch_counts()) == [parent_path]
+        assert observer.get_status()['unwatched'] == []
+    finally:
+        observer.stop()